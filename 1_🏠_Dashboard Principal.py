@@ -1,7 +1,9 @@
 # 1_🏠_Dashboard_Principal.py
-import streamlit as st
-import pandas as pd
-from modules import data_handler, visualization
+from modules.importacao_preguicosa import perfil_importacoes
+
+with perfil_importacoes("Dashboard Principal"):
+    import streamlit as st
+    from modules import data_handler, cep_handler, visualization, registro_cache, motor_sql, visoes, sketches
 from datetime import datetime
 import os
 
@@ -12,33 +14,8 @@ visualization.aplicar_css_local("style/style.css")
 st.sidebar.image(LOGO_URL, width=200)
 st.sidebar.title("Navegação")
 
-@st.cache_data(ttl=300)
-def carregar_dados():
-    df_validos, df_cancelados = data_handler.ler_dados_do_gsheets()
-    if not df_validos.empty:
-        cols_numericas = ['Itens', 'Total taxa de serviço', 'Total', 'Entrega', 'Acréscimo', 'Desconto', 'Hora', 'Ano', 'Mês']
-        for col in cols_numericas:
-            if col in df_validos.columns:
-                df_validos[col] = pd.to_numeric(df_validos[col], errors='coerce').fillna(0)
-        if 'Data' in df_validos.columns:
-            df_validos['Data'] = pd.to_datetime(df_validos['Data'], errors='coerce').dt.date
-    if not df_cancelados.empty:
-        if 'Data' in df_cancelados.columns:
-             df_cancelados['Data'] = pd.to_datetime(df_cancelados['Data'], errors='coerce').dt.date
-             df_cancelados.dropna(subset=['Data'], inplace=True)
-        if 'Hora' in df_cancelados.columns:
-            df_cancelados['Hora'] = pd.to_numeric(df_cancelados['Hora'], errors='coerce').fillna(0)
-    return df_validos, df_cancelados
-
-@st.cache_data(ttl=600)
-def carregar_cache_cep():
-    cache_path = 'data/cep_cache.csv'
-    if os.path.exists(cache_path):
-        return pd.read_csv(cache_path, dtype={'cep': str})
-    return pd.DataFrame(columns=['cep', 'lat', 'lon'])
-
-df_validos, df_cancelados = carregar_dados()
-df_cache_cep = carregar_cache_cep()
+df_validos, df_cancelados, versao_dados = data_handler.obter_dados_dashboard()
+df_cache_cep = cep_handler.obter_cache_cep()
 
 col_logo, col_titulo = st.columns([0.1, 0.9])
 with col_logo:
@@ -46,6 +23,8 @@ with col_logo:
 with col_titulo:
     st.title("Dashboard de Vendas")
 st.markdown("---")
+if data_handler.dados_dashboard_parciais():
+    st.info("Mostrando os meses mais recentes: o histórico completo está sendo carregado e aparece ao atualizar a página.")
 
 if not df_validos.empty:
     with st.expander("📅 Aplicar Filtros e Ações", expanded=True):
@@ -60,21 +39,33 @@ if not df_validos.empty:
             st.write("") 
             st.write("")
             if st.button("🔄 Atualizar Dados", use_container_width=True):
-                st.cache_data.clear()
-                st.toast("Cache limpo! Recarregando os dados...")
+                # Invalida só os dados de vendas (e o que depende deles); o cache de CEPs é mantido.
+                data_handler.obter_versao_planilha.clear()
+                registro_cache.invalidar('vendas')
+                st.toast("Atualizando os dados em segundo plano...")
                 st.rerun()
         lista_canais = df_validos['Canal de venda'].dropna().unique()
         canais_disponiveis = sorted([str(canal) for canal in lista_canais])
         canais_selecionados = st.multiselect("Canal de Venda", options=canais_disponiveis, default=canais_disponiveis)
 
-    df_filtrado = df_validos[(df_validos['Data'] >= data_inicial) & (df_validos['Data'] <= data_final) & (df_validos['Canal de venda'].isin(canais_selecionados))]
-    df_cancelados_filtrado = pd.DataFrame()
-    if not df_cancelados.empty:
-        df_cancelados_filtrado = df_cancelados[(df_cancelados['Data'] >= data_inicial) & (df_cancelados['Data'] <= data_final)]
+    # Visões sobre o snapshot compartilhado: o período é um recorte contínuo, sem cópia.
+    filtro = visoes.FiltroDashboard(versao_dados, data_inicial, data_final, tuple(canais_selecionados))
+    df_filtrado, df_cancelados_filtrado = visoes.aplicar_filtro(filtro, df_validos, df_cancelados)
+
+    # --- CHAVES DO CACHE DE GRÁFICOS ---
+    # Os gráficos de cancelados não dependem do filtro de canal.
+    chave_vendas = visualization.cache_graficos.montar_chave(versao_dados, data_inicial, data_final, canais_selecionados)
+    chave_cancelados = visualization.cache_graficos.montar_chave(versao_dados, data_inicial, data_final)
 
-    # --- SALVA OS DADOS FILTRADOS NA SESSÃO PARA O ORÁCULO USAR ---
-    st.session_state['df_filtrado_global'] = df_filtrado
-    st.session_state['df_cancelados_filtrado_global'] = df_cancelados_filtrado
+    # --- MOTOR DAS AGREGAÇÕES ---
+    # Com DuckDB instalado, os gráficos consultam o Parquet do snapshot com os filtros no WHERE;
+    # sem ele (consulta None), agregam em pandas os DataFrames filtrados acima.
+    consulta_vendas = motor_sql.consulta(versao_dados, 'validos', data_inicial, data_final, canais_selecionados)
+    consulta_cancelados = motor_sql.consulta(versao_dados, 'cancelados', data_inicial, data_final)
+
+    # --- SALVA O FILTRO NA SESSÃO PARA O ORÁCULO USAR ---
+    # Só a descrição do filtro: outras páginas montam as visões com visoes.visao_da_sessao().
+    visoes.guardar_filtro(filtro)
 
     tab_resumo, tab_delivery, tab_cancelados_aba = st.tabs(["Resumo Geral", "Análise de Delivery", "Análise de Cancelados"])
 
@@ -86,16 +77,18 @@ if not df_validos.empty:
         st.markdown("<br>", unsafe_allow_html=True)
         col_graf_1, col_graf_2 = st.columns(2)
         with col_graf_1:
-            visualization.criar_grafico_tendencia(df_filtrado)
+            visualization.criar_grafico_tendencia(df_filtrado, chave=chave_vendas, consulta=consulta_vendas)
         with col_graf_2:
-            visualization.criar_grafico_barras_horarios(df_filtrado)
+            visualization.criar_grafico_barras_horarios(df_filtrado, chave=chave_vendas, consulta=consulta_vendas)
         st.markdown("---")
-        visualization.criar_donut_e_resumo_canais(df_filtrado)
+        visualization.criar_donut_e_resumo_canais(df_filtrado, chave=chave_vendas, consulta=consulta_vendas)
         st.markdown("<br>", unsafe_allow_html=True)
         
-        visualization.criar_distplot_e_analise(df_filtrado)
+        # Quartis, percentis e histograma saem dos sketches diários gravados na carga.
+        sketch_vendas = sketches.sketch_do_filtro(filtro, df_validos)
+        visualization.criar_distplot_e_analise(df_filtrado, chave=chave_vendas, consulta=consulta_vendas, sketch=sketch_vendas)
 
-        visualization.criar_tabela_canais_com_linha_do_tempo(df_filtrado)
+        visualization.criar_tabela_canais_com_linha_do_tempo(df_filtrado, chave=chave_vendas, consulta=consulta_vendas)
         st.markdown("<br>", unsafe_allow_html=True)
 
     with tab_delivery:
@@ -123,12 +116,15 @@ if not df_validos.empty:
         else:
             visualization.criar_cards_cancelamento_resumo(df_cancelados_filtrado, df_filtrado)
             st.markdown("---")
-            visualization.criar_grafico_motivos_cancelamento(df_cancelados_filtrado)
+            visualization.criar_grafico_motivos_cancelamento(df_cancelados_filtrado, chave=chave_cancelados, consulta=consulta_cancelados)
             st.markdown("---")
             col_cancel_1, col_cancel_2 = st.columns(2)
             with col_cancel_1:
-                visualization.criar_grafico_cancelamentos_por_hora(df_cancelados_filtrado)
+                visualization.criar_grafico_cancelamentos_por_hora(df_cancelados_filtrado, chave=chave_cancelados, consulta=consulta_cancelados)
             with col_cancel_2:
-                visualization.criar_donut_cancelamentos_por_canal(df_cancelados_filtrado)
+                visualization.criar_donut_cancelamentos_por_canal(df_cancelados_filtrado, chave=chave_cancelados, consulta=consulta_cancelados)
 else:
     st.error("Não foi possível carregar os dados. Verifique a página 'Atualizar Relatório' ou a sua Planilha Google.")
+
+# Memória que esta sessão ocupa (página de desempenho).
+visoes.medir_sessao()
@@ -0,0 +1,204 @@
+# backfill.py
+"""
+Carga em massa de relatórios históricos da Saipos (.xlsx, .csv, .parquet).
+
+Cada arquivo é lido e tratado (data_handler.tratar_dados_saipos) num processo
+separado; os resultados são mesclados por Pedido (o arquivo mais recente
+vence) e, numa única execução, o comando grava:
+
+  1. as partições mensais na planilha (modo 'mesclar'), registrando cada arquivo
+     em data/uploads/registro.json para que a página de upload o reconheça;
+  2. o snapshot 'vendas' (planilha inteira + agregados), já na versão nova da planilha;
+  3. a fila de CEPs sem coordenada em data/geocode_pendentes.csv.
+
+    python backfill.py relatorios_saipos                 # pasta inteira
+    python backfill.py relatorios_saipos/2024-*.xlsx     # arquivos escolhidos
+    python backfill.py relatorios_saipos --workers 4 --geocodificar
+    python backfill.py relatorios_saipos --sem-planilha  # só snapshot local ('backfill') e fila de CEPs
+
+Arquivos já registrados são pulados (use --forcar para processá-los de novo).
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import streamlit.logger
+
+from modules import cep_handler, data_handler, registro_uploads, snapshots
+
+ARQUIVO_PENDENTES_GEOCODE = os.path.join('data', 'geocode_pendentes.csv')
+CEPS_POR_LOTE_GEOCODE = 100
+
+# --- ARQUIVOS ---
+
+def listar_arquivos(entradas):
+    """Arquivos de relatório nas pastas/padrões dados, do mais antigo ao mais novo (o mais novo vence na mescla)."""
+    caminhos = set()
+    for entrada in entradas:
+        candidatos = [os.path.join(entrada, nome) for nome in os.listdir(entrada)] if os.path.isdir(entrada) else glob.glob(entrada)
+        for caminho in candidatos:
+            if os.path.isfile(caminho) and os.path.splitext(caminho)[1].lower().lstrip('.') in registro_uploads.FORMATOS:
+                caminhos.add(os.path.normpath(caminho))
+    return sorted(caminhos, key=lambda c: (os.path.getmtime(c), c))
+
+# --- TRABALHO DE CADA PROCESSO ---
+
+def _iniciar_processo():
+    streamlit.logger.set_log_level('error')
+
+def processar_arquivo(caminho, registrados=frozenset()):
+    """
+    Lê e trata um relatório. Roda num processo do pool; devolve os DataFrames e os tempos.
+    O arquivo é lido uma vez só: se o sha256 do conteúdo está em `registrados`, ele
+    volta marcado como pulado, sem ser tratado.
+    """
+    inicio = time.perf_counter()
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+    sha256 = registro_uploads.sha256_conteudo(conteudo)
+    if sha256 in registrados:
+        return {'arquivo': caminho, 'sha256': sha256, 'bytes': len(conteudo), 'pulado': True}
+    bruto = data_handler.ler_relatorio(caminho, conteudo)
+    lido = time.perf_counter()
+    validos, cancelados = data_handler.tratar_dados_saipos(bruto)
+    fim = time.perf_counter()
+    return {
+        'arquivo': caminho,
+        'sha256': sha256,
+        'pulado': False,
+        'bytes': len(conteudo),
+        'linhas': len(bruto),
+        'validos': validos,
+        'cancelados': cancelados,
+        'leitura_s': lido - inicio,
+        'tratamento_s': fim - lido,
+        'total_s': fim - inicio,
+    }
+
+def processar_em_paralelo(caminhos, workers, registrados=frozenset()):
+    """Resultados na ordem de `caminhos` (inclusive os pulados), imprimindo a vazão de cada arquivo conforme termina."""
+    resultados = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_processo) as pool:
+        futuros = {pool.submit(processar_arquivo, caminho, registrados): caminho for caminho in caminhos}
+        for futuro in as_completed(futuros):
+            caminho = futuros[futuro]
+            try:
+                r = futuro.result()
+            except Exception as e:
+                print(f"    ERRO em '{caminho}': {e}")
+                continue
+            resultados[caminho] = r
+            if r['pulado']:
+                print(f"    {os.path.basename(caminho):<40} já carregado antes, pulado")
+                continue
+            print(f"    {os.path.basename(caminho):<40} {r['linhas']:>9,} linhas {r['bytes'] / 1e6:>8.1f} MB {r['total_s']:>7.2f} s "
+                  f"{r['linhas'] / r['total_s']:>10,.0f} linhas/s {r['bytes'] / 1e6 / r['total_s']:>7.1f} MB/s "
+                  f"(leitura {r['leitura_s']:.2f} s, tratamento {r['tratamento_s']:.2f} s)")
+    return [resultados[c] for c in caminhos if c in resultados]
+
+# --- SAÍDAS ---
+
+def gravar_fila_geocode(df_validos, caminho=ARQUIVO_PENDENTES_GEOCODE):
+    """CEPs ainda sem coordenada no cache, com o número de pedidos de cada um (mais pedidos primeiro)."""
+    pendentes = set(cep_handler.ceps_pendentes(df_validos))
+    contagem = df_validos.loc[df_validos['CEP'].isin(pendentes), 'CEP'].value_counts() if pendentes else pd.Series(dtype=int)
+    fila = contagem.rename_axis('cep').reset_index(name='pedidos')
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    fila.to_csv(caminho, index=False)
+    return fila
+
+def geocodificar_fila(fila):
+    """Busca as coordenadas da fila em lotes, salvando cada lote no cache. Retorna quantas foram salvas."""
+    salvas = 0
+    ceps = fila['cep'].tolist()
+    for i in range(0, len(ceps), CEPS_POR_LOTE_GEOCODE):
+        salvas += cep_handler.salvar_coordenadas(cep_handler.buscar_coordenadas(ceps[i:i + CEPS_POR_LOTE_GEOCODE]))
+        print(f"    geocodificação: {min(i + CEPS_POR_LOTE_GEOCODE, len(ceps)):,}/{len(ceps):,} CEPs, {salvas:,} coordenadas salvas")
+    return salvas
+
+def gravar_planilha(df_validos, df_cancelados):
+    """Partições mensais (mesclando por Pedido com o que já existe) e nova versão da planilha."""
+    def progresso(p):
+        if p.linhas_gravadas == p.total_linhas:
+            print(f"    aba '{p.aba}': {p.total_linhas:,} linhas ({p.linhas_por_s:,.0f} linhas/s)")
+    data_handler.gravar_particoes({'validos': df_validos, 'cancelados': df_cancelados}, modo='mesclar', progresso=progresso)
+    return data_handler.registrar_versao_planilha(data_handler._abrir_planilha())
+
+def gravar_snapshot(nome, df_validos, df_cancelados, versao_fonte=None):
+    """Snapshot com as tabelas tipadas e compactadas como no dashboard, mais os agregados."""
+    validos, cancelados = data_handler.compactar_dados_dashboard(*data_handler.tipar_dados_dashboard(df_validos.copy(), df_cancelados.copy()))
+    tabelas = {'validos': validos, 'cancelados': cancelados, **data_handler.calcular_agregados(validos, cancelados)}
+    metadados = {'versao_fonte': versao_fonte, 'versao_dados': data_handler.calcular_versao_dados(validos, cancelados)}
+    return snapshots.salvar_snapshot(nome, tabelas, metadados)
+
+# --- EXECUÇÃO ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carga em massa de relatórios históricos da Saipos.")
+    parser.add_argument('entradas', nargs='+', help="Pastas ou arquivos (aceita padrões como relatorios/*.csv).")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Processos em paralelo (padrão: um por núcleo).")
+    parser.add_argument('--forcar', action='store_true', help="Processa também arquivos já registrados.")
+    parser.add_argument('--sem-planilha', action='store_true', help="Não grava na planilha; o snapshot vai para 'backfill'.")
+    parser.add_argument('--geocodificar', action='store_true', help="Busca as coordenadas da fila de CEPs ao final.")
+    args = parser.parse_args(argv)
+
+    _iniciar_processo()
+    caminhos = listar_arquivos(args.entradas)
+    if not caminhos:
+        print("Nenhum relatório encontrado.")
+        return 0
+    # Cada processo confere o sha256 do arquivo que já leu: nada é lido duas vezes.
+    registrados = frozenset() if args.forcar else frozenset(registro_uploads.listar())
+
+    workers = max(1, min(args.workers, len(caminhos)))
+    print(f"Processando {len(caminhos)} arquivo(s) com {workers} processo(s)...")
+    inicio = time.perf_counter()
+    resultados = processar_em_paralelo(caminhos, workers, registrados)
+    decorrido = time.perf_counter() - inicio
+    pulados = [r for r in resultados if r['pulado']]
+    resultados = [r for r in resultados if not r['pulado']]
+    if pulados:
+        print(f"{len(pulados)} arquivo(s) já carregado(s) antes, pulado(s) (use --forcar para incluir).")
+    if not resultados:
+        if len(pulados) == len(caminhos):
+            print("Nenhum relatório novo para processar.")
+            return 0
+        print("Nenhum arquivo pôde ser processado.")
+        return 1
+    linhas = sum(r['linhas'] for r in resultados)
+    soma_s = sum(r['total_s'] for r in resultados)
+    print(f"\n{len(resultados)} arquivo(s), {linhas:,} linhas em {decorrido:.1f} s ({linhas / decorrido:,.0f} linhas/s); "
+          f"paralelismo efetivo {soma_s / decorrido:.1f}x com {workers} processo(s).")
+
+    df_validos, df_cancelados = data_handler.mesclar_relatorios([(r['validos'], r['cancelados']) for r in resultados])
+    print(f"Após mesclar por Pedido: {len(df_validos):,} vendas válidas e {len(df_cancelados):,} canceladas "
+          f"({linhas - len(df_validos) - len(df_cancelados):,} linhas repetidas ou descartadas no tratamento).")
+
+    if args.sem_planilha:
+        manifesto = gravar_snapshot('backfill', df_validos, df_cancelados)
+        print(f"\nSnapshot 'backfill' gravado ({manifesto['id']}) com as tabelas {', '.join(manifesto['tabelas'])}.")
+    else:
+        print("\nGravando as partições na planilha...")
+        versao = gravar_planilha(df_validos, df_cancelados)
+        for r in resultados:
+            registro_uploads.registrar(r['sha256'], os.path.basename(r['arquivo']), len(r['validos']), len(r['cancelados']))
+        # O snapshot do dashboard é da planilha inteira, não só dos arquivos deste backfill;
+        # com a versão da sonda, o servidor o restaura sem reler a planilha.
+        valor = data_handler.carregar_dados_dashboard()
+        data_handler._persistir_dados_dashboard(valor, f"marcador:{versao}")
+        print(f"\nSnapshot 'vendas' gravado: {len(valor[0]):,} vendas válidas e {len(valor[1]):,} canceladas na planilha.")
+
+    fila = gravar_fila_geocode(df_validos)
+    print(f"Fila de geocodificação: {len(fila):,} CEPs sem coordenada em '{ARQUIVO_PENDENTES_GEOCODE}'.")
+    if args.geocodificar and not fila.empty:
+        geocodificar_fila(fila)
+        fila = gravar_fila_geocode(df_validos)
+        print(f"Restam {len(fila):,} CEPs sem coordenada.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# modules/agregacoes.py
+import pandas as pd
+
+# --- AGREGAÇÕES DO DASHBOARD (PANDAS) ---
+# Implementação de referência de cada agregação dos gráficos. Nenhuma função
+# altera o DataFrame recebido: ele pode ser o snapshot compartilhado entre sessões.
+# O motor SQL (modules/motor_sql.py) devolve as mesmas tabelas, com as mesmas colunas.
+
+HORAS_DO_DIA = pd.DataFrame({'Hora': range(24)})
+
+def faturamento_diario(df):
+    """Data (datetime) | Total, em ordem de data."""
+    return df.groupby(pd.to_datetime(df['Data']))['Total'].sum().reset_index().sort_values(by='Data', ignore_index=True)
+
+def resumo_por_hora(df):
+    """As 24 horas do dia com Num_Pedidos, Faturamento_Total e Ticket_Medio (zero nas horas sem pedido)."""
+    resumo = df.groupby('Hora').agg(Num_Pedidos=('Pedido', 'count'), Faturamento_Total=('Total', 'sum')).reset_index()
+    resumo = pd.merge(HORAS_DO_DIA, resumo, on='Hora', how='left').fillna(0)
+    resumo['Ticket_Medio'] = (resumo['Faturamento_Total'] / resumo['Num_Pedidos'].where(resumo['Num_Pedidos'] > 0)).fillna(0)
+    return resumo
+
+def resumo_por_canal(df):
+    """Canal de venda | Faturamento | Pedidos | Ticket Medio, em ordem de canal."""
+    resumo = df.groupby('Canal de venda', observed=True).agg(Faturamento=('Total', 'sum'), Pedidos=('Pedido', 'count')).reset_index()
+    resumo['Ticket Medio'] = (resumo['Faturamento'] / resumo['Pedidos'].where(resumo['Pedidos'] > 0)).fillna(0)
+    return resumo
+
+def limite_outliers(df):
+    """Limite superior de Tukey para o valor dos pedidos: Q3 + 1,5 × IQR."""
+    q1, q3 = df['Total'].quantile(0.25), df['Total'].quantile(0.75)
+    return float(q3 + 1.5 * (q3 - q1))
+
+def outliers_por_dia(df, limite):
+    """Data (datetime) | Total dos pedidos acima do limite, somado por dia."""
+    acima = df[df['Total'] > limite]
+    return acima.groupby(pd.to_datetime(acima['Data']))['Total'].sum().reset_index().sort_values(by='Data', ignore_index=True)
+
+def maiores_outliers(df, limite, quantidade=5):
+    """Os `quantidade` pedidos de maior valor acima do limite: Total | Data | Canal de venda."""
+    acima = df.loc[df['Total'] > limite, ['Total', 'Data', 'Canal de venda']]
+    return acima.sort_values(by='Total', ascending=False).head(quantidade).reset_index(drop=True)
+
+def canais_por_dia(df):
+    """Canal de venda | Data | Total, em ordem de canal e data."""
+    return df.groupby(['Canal de venda', 'Data'], observed=True)['Total'].sum().reset_index()
+
+def cancelamentos_por_hora(df_cancelados):
+    """As 24 horas do dia com a Contagem de cancelamentos."""
+    horas = pd.to_numeric(df_cancelados['Hora'], errors='coerce')
+    contagem = df_cancelados.groupby(horas).size().reset_index(name='Contagem')
+    return pd.merge(HORAS_DO_DIA, contagem, on='Hora', how='left').fillna(0)
+
+def contagem_por(df, coluna, nome):
+    """`nome` | Contagem por valor de `coluna`, do mais frequente ao menos frequente."""
+    contagem = df[coluna].value_counts()
+    # Em colunas categóricas, value_counts também lista as categorias sem ocorrência.
+    contagem = contagem[contagem > 0].reset_index()
+    contagem.columns = [nome, 'Contagem']
+    return contagem
+
+AGREGACOES = {
+    'faturamento_diario': faturamento_diario,
+    'resumo_por_hora': resumo_por_hora,
+    'resumo_por_canal': resumo_por_canal,
+    'limite_outliers': limite_outliers,
+    'outliers_por_dia': outliers_por_dia,
+    'maiores_outliers': maiores_outliers,
+    'canais_por_dia': canais_por_dia,
+    'cancelamentos_por_hora': cancelamentos_por_hora,
+    'contagem_por': contagem_por,
+}
@@ -0,0 +1,23 @@
+# modules/autenticacao.py
+import streamlit as st
+
+# Verificação de senha
+def check_password(segredo="update_password"):
+    """Verifica se o usuário digitou a senha correta (a do segredo `segredo`)."""
+    chave_sessao = 'password_correct' if segredo == "update_password" else f"password_correct_{segredo}"
+    if chave_sessao not in st.session_state:
+        st.session_state[chave_sessao] = False
+
+    if not st.session_state[chave_sessao]:
+        password_placeholder = st.empty()
+        password = password_placeholder.text_input("Digite a senha para acessar:", type="password")
+
+        if password:
+            if password == st.secrets[segredo]:
+                st.session_state[chave_sessao] = True
+                password_placeholder.empty()  # Remove o input de senha após acertar
+            else:
+                st.error("Senha incorreta. Tente novamente.")
+                st.stop()
+
+    return st.session_state[chave_sessao]
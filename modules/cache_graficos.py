@@ -0,0 +1,114 @@
+# modules/cache_graficos.py
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+
+import streamlit as st
+
+from . import telemetria
+
+LIMITE_CACHE_MB = 64
+
+# --- CACHE LRU DE ESPECIFICAÇÕES DE GRÁFICOS ---
+
+class CacheGraficos:
+    """
+    Guarda a especificação serializada (JSON) de cada gráfico, indexada por
+    (widget, versão dos dados, filtros normalizados). O espaço é limitado em MB
+    e os itens menos usados recentemente são descartados primeiro.
+    """
+
+    def __init__(self, limite_mb=LIMITE_CACHE_MB):
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self._itens = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.remocoes = 0
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[0]
+
+    def guardar(self, chave, spec):
+        tamanho = len(spec.encode('utf-8'))
+        if tamanho > self.limite_bytes:
+            return
+        with self._lock:
+            antigo = self._itens.pop(chave, None)
+            if antigo is not None:
+                self._bytes -= antigo[1]
+            self._itens[chave] = (spec, tamanho)
+            self._bytes += tamanho
+            while self._bytes > self.limite_bytes:
+                _, (_, tamanho_removido) = self._itens.popitem(last=False)
+                self._bytes -= tamanho_removido
+                self.remocoes += 1
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'itens': len(self._itens),
+                'tamanho_mb': round(self._bytes / (1024 * 1024), 3),
+                'limite_mb': round(self.limite_bytes / (1024 * 1024), 3),
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'remocoes': self.remocoes,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+            }
+
+@st.cache_resource
+def obter_cache():
+    """Instância única do cache, compartilhada por todas as sessões."""
+    return CacheGraficos()
+
+# --- CHAVES ---
+
+def _normalizar_valor(valor):
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        itens = [_normalizar_valor(v) for v in valor]
+        if not isinstance(valor, tuple):
+            itens = sorted(itens, key=str)
+        return tuple(itens)
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+def montar_chave(versao_dados, *filtros):
+    """Monta a parte da chave que depende dos dados: (versão, filtros normalizados)."""
+    return (versao_dados, _normalizar_valor(tuple(filtros)))
+
+def em_cache(widget, chave, construir):
+    """
+    Devolve a especificação do widget a partir do cache ou a constrói com
+    `construir()` (que deve retornar um objeto serializável em JSON).
+    Sem `chave`, o cache é ignorado.
+    """
+    if chave is None:
+        return construir()
+    cache = obter_cache()
+    chave_completa = (widget,) + tuple(chave)
+    spec = cache.obter(chave_completa)
+    if spec is not None:
+        telemetria.registrar_payload(f"grafico.{widget}", len(spec))
+        return json.loads(spec)
+    payload = construir()
+    if payload is not None:
+        spec = json.dumps(payload)
+        telemetria.registrar_payload(f"grafico.{widget}", len(spec))
+        cache.guardar(chave_completa, spec)
+    return payload
@@ -0,0 +1,147 @@
+# modules/cache_respostas.py
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import streamlit as st
+
+ARQUIVO_CACHE = os.path.join('data', 'cache_respostas.json')
+MAX_RESPOSTAS = 500
+VALIDADE_HORAS = 12
+
+# --- NORMALIZAÇÃO DA PERGUNTA ---
+
+def normalizar_pergunta(texto):
+    """'Qual o MELHOR dia?!' e 'qual o melhor dia' viram a mesma chave."""
+    texto = unicodedata.normalize('NFKD', str(texto or '').lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r'[^\w\s]', ' ', texto)
+    return ' '.join(texto.split())
+
+def _ultima_pergunta(historico_chat):
+    for mensagem in reversed(historico_chat or []):
+        if mensagem.get('role') == 'user':
+            return normalizar_pergunta(mensagem.get('content'))
+    return ''
+
+# --- CACHE LRU + TTL, PERSISTIDO EM DISCO ---
+
+class CacheRespostas:
+    """
+    Respostas do Oráculo indexadas por (pergunta normalizada, pergunta anterior,
+    versão dos dados, filtros). Itens expiram após `validade_horas` e, acima de
+    `max_itens`, os menos usados recentemente saem primeiro. Quando a versão do
+    dataset muda, as respostas das versões anteriores são descartadas; respostas
+    guardadas sem versão (chaveadas pela impressão digital do recorte) só saem
+    por validade ou pelo limite de itens.
+    """
+
+    def __init__(self, arquivo=ARQUIVO_CACHE, max_itens=MAX_RESPOSTAS, validade_horas=VALIDADE_HORAS):
+        self.arquivo = arquivo
+        self.max_itens = max_itens
+        self.validade_s = validade_horas * 3600
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.versao_atual = None
+        self.acertos = 0
+        self.falhas = 0
+        self.expiradas = 0
+        self.remocoes = 0
+        self.invalidadas = 0
+        self._carregar()
+
+    @staticmethod
+    def montar_chave(pergunta, historico_chat, versao_dados, filtros=None):
+        return json.dumps([normalizar_pergunta(pergunta), _ultima_pergunta(historico_chat), versao_dados, filtros], default=str, ensure_ascii=False)
+
+    def obter(self, chave, versao_dados):
+        with self._lock:
+            self._sincronizar_versao(versao_dados)
+            item = self._itens.get(chave)
+            if item is not None and time.time() - item['criado_em'] > self.validade_s:
+                del self._itens[chave]
+                self.expiradas += 1
+                item = None
+            if item is None:
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item['resposta']
+
+    def guardar(self, chave, versao_dados, resposta):
+        with self._lock:
+            self._sincronizar_versao(versao_dados)
+            self._itens[chave] = {'resposta': resposta, 'versao': versao_dados, 'criado_em': time.time()}
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.remocoes += 1
+            self._salvar()
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._salvar()
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'itens': len(self._itens),
+                'versao_dados': self.versao_atual,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'expiradas': self.expiradas,
+                'remocoes': self.remocoes,
+                'invalidadas_por_versao': self.invalidadas,
+            }
+
+    # --- INTERNOS (chamados com o lock adquirido) ---
+
+    def _sincronizar_versao(self, versao_dados):
+        # A impressão digital de um recorte não diz nada sobre os outros: só a versão do dataset invalida.
+        if versao_dados is None or versao_dados == self.versao_atual:
+            return
+        antigas = [c for c, item in self._itens.items() if item['versao'] is not None and item['versao'] != versao_dados]
+        for chave in antigas:
+            del self._itens[chave]
+        self.invalidadas += len(antigas)
+        self.versao_atual = versao_dados
+        if antigas:
+            self._salvar()
+
+    def _carregar(self):
+        try:
+            with open(self.arquivo, 'r', encoding='utf-8') as f:
+                itens = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Aviso: cache de respostas ignorado ({e}).")
+            return
+        agora = time.time()
+        for chave, item in itens:
+            if agora - item.get('criado_em', 0) <= self.validade_s:
+                self._itens[chave] = item
+
+    def _salvar(self):
+        # Grava num arquivo temporário e troca de uma vez, para não deixar JSON pela metade.
+        try:
+            os.makedirs(os.path.dirname(self.arquivo) or '.', exist_ok=True)
+            temporario = f"{self.arquivo}.tmp"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(list(self._itens.items()), f, ensure_ascii=False)
+            os.replace(temporario, self.arquivo)
+        except OSError as e:
+            print(f"Erro ao salvar o cache de respostas: {e}")
+
+@st.cache_resource
+def obter_cache_respostas():
+    """Instância única do cache de respostas, compartilhada por todas as sessões."""
+    return CacheRespostas()
@@ -0,0 +1,116 @@
+# modules/campanhas.py
+from dataclasses import dataclass, replace
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# --- DEFINIÇÃO DECLARATIVA DAS CAMPANHAS ---
+
+@dataclass(frozen=True)
+class Campanha:
+    """Janela de uma campanha: período, faixa de horas (inclusiva) e canais (vazio = todos)."""
+    chave: str
+    nome: str
+    data_inicial: date
+    data_final: date
+    hora_inicial: int = 0
+    hora_final: int = 23
+    canais: tuple = ()
+
+    def no_ano(self, ano):
+        """A mesma janela deslocada para outro ano (para comparações ano a ano)."""
+        return replace(self, data_inicial=self.data_inicial.replace(year=ano), data_final=self.data_final.replace(year=ano))
+
+    @property
+    def rotulo_periodo(self):
+        return f"{self.data_inicial.strftime('%d/%m')} a {self.data_final.strftime('%d/%m')}"
+
+CAMPANHAS = {
+    'sao_joao_2025': Campanha(
+        chave='sao_joao_2025',
+        nome='Madrugada Junina',
+        data_inicial=date(2025, 5, 28),
+        data_final=date(2025, 6, 30),
+        hora_inicial=0,
+        hora_final=4,
+    ),
+}
+
+# --- FATIAS SOBRE O DATASET COMPARTILHADO ---
+
+def _indices_da_janela(df, campanha, data_inicial=None, data_final=None):
+    """
+    Avalia os predicados da campanha em ordem de seletividade, cada um só sobre
+    as linhas que passaram no anterior, e devolve as posições selecionadas.
+    """
+    if df.empty:
+        return np.array([], dtype=np.intp)
+    inicio = max(data_inicial or campanha.data_inicial, campanha.data_inicial)
+    fim = min(data_final or campanha.data_final, campanha.data_final)
+    datas = df['Data'].to_numpy()
+    idx = np.flatnonzero(pd.notna(datas))
+    idx = idx[(datas[idx] >= inicio) & (datas[idx] <= fim)]
+    if 'Hora' in df.columns and (campanha.hora_inicial, campanha.hora_final) != (0, 23):
+        # Pedidos sem hora ficam fora de qualquer janela de horário (NaN não passa na comparação).
+        horas = pd.to_numeric(df['Hora'].iloc[idx], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        idx = idx[(horas >= campanha.hora_inicial) & (horas <= campanha.hora_final)]
+    if campanha.canais and 'Canal de venda' in df.columns:
+        idx = idx[df['Canal de venda'].iloc[idx].isin(campanha.canais).to_numpy()]
+    return idx
+
+def fatiar(df, campanha, data_inicial=None, data_final=None, colunas=None):
+    """Linhas do DataFrame dentro da janela da campanha, sem tocar no DataFrame original."""
+    idx = _indices_da_janela(df, campanha, data_inicial, data_final)
+    fatia = df.iloc[idx] if colunas is None else df.iloc[idx][[c for c in colunas if c in df.columns]]
+    return fatia
+
+# --- ROLLUPS MATERIALIZADOS POR VERSÃO DOS DADOS ---
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def materializar_rollups(versao_dados, _df_validos, _df_cancelados):
+    """
+    Faturamento e pedidos por (Data, Hora, Canal), válidos e cancelados, calculados
+    uma única vez por versão dos dados. Os DataFrames devem ser os da mesma
+    `versao_dados` (a chave do cache). KPIs e comparações ano a ano saem daqui.
+    """
+    rollups = {}
+    for nome, df in (('validos', _df_validos), ('cancelados', _df_cancelados)):
+        if df.empty:
+            rollups[nome] = pd.DataFrame(columns=['Data', 'Hora', 'Canal de venda', 'Faturamento', 'Pedidos'])
+            continue
+        base = df[['Data', 'Hora', 'Canal de venda']].copy()
+        base['Total'] = pd.to_numeric(df['Total'], errors='coerce').fillna(0)
+        base['Hora'] = pd.to_numeric(base['Hora'], errors='coerce')
+        rollups[nome] = (
+            base.dropna(subset=['Data', 'Hora'])
+            .groupby(['Data', 'Hora', 'Canal de venda'], dropna=False, observed=True)
+            .agg(Faturamento=('Total', 'sum'), Pedidos=('Total', 'size'))
+            .reset_index()
+        )
+    return rollups
+
+def kpis(rollups, campanha, data_inicial=None, data_final=None):
+    """KPIs da campanha calculados a partir do rollup (sem varrer os pedidos)."""
+    validos = fatiar(rollups['validos'], campanha, data_inicial, data_final)
+    cancelados = fatiar(rollups['cancelados'], campanha, data_inicial, data_final)
+    faturamento = float(validos['Faturamento'].sum())
+    pedidos = int(validos['Pedidos'].sum())
+    return {
+        'faturamento': faturamento,
+        'pedidos': pedidos,
+        'ticket_medio': faturamento / pedidos if pedidos else 0.0,
+        'dias_com_venda': int(validos['Data'].nunique()),
+        'cancelados': int(cancelados['Pedidos'].sum()),
+        'valor_cancelado': float(cancelados['Faturamento'].sum()),
+    }
+
+def comparativo_anual(rollups, campanha):
+    """KPIs da mesma janela em cada ano presente nos dados."""
+    datas = rollups['validos']['Data'].dropna()
+    if datas.empty:
+        return pd.DataFrame()
+    anos = sorted({d.year for d in datas})
+    linhas = [{'Ano': ano, **kpis(rollups, campanha.no_ano(ano))} for ano in anos]
+    return pd.DataFrame(linhas)
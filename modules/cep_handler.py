@@ -7,9 +7,11 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
 from tqdm import tqdm
 import os
+from . import registro_cache, telemetria
 
 CACHE_FILE = 'data/cep_cache.csv'
 
+@telemetria.cronometrar('geocode.buscar_cep')
 def _fetch_coordinate(cep):
     """
     Busca a coordenada para um único CEP. Função privada.
@@ -29,6 +31,41 @@ def _fetch_coordinate(cep):
         pass
     return None
 
+def ceps_pendentes(df_pedidos_validos):
+    """CEPs dos pedidos que ainda não estão no arquivo de cache, em ordem."""
+    if 'CEP' not in df_pedidos_validos.columns:
+        return []
+    ceps_in_report = set(df_pedidos_validos['CEP'].dropna().unique())
+    return sorted(ceps_in_report - set(carregar_cache_cep()['cep']))
+
+def buscar_coordenadas(ceps, ao_concluir=None):
+    """Busca as coordenadas dos CEPs em paralelo. `ao_concluir(feitos, total)` é chamado a cada CEP."""
+    new_coords = []
+    with ThreadPoolExecutor(max_workers=15) as executor:
+        futures = {executor.submit(_fetch_coordinate, cep): cep for cep in ceps}
+        for i, future in enumerate(as_completed(futures)):
+            result = future.result()
+            if result:
+                new_coords.append(result)
+            if ao_concluir is not None:
+                ao_concluir(i + 1, len(ceps))
+    return new_coords
+
+def salvar_coordenadas(new_coords):
+    """Acrescenta as coordenadas ao arquivo de cache (a última de cada CEP vale). Retorna quantas foram salvas."""
+    if not new_coords:
+        return 0
+    # Garante que o diretório 'data' exista
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    df_cache_updated = pd.concat([carregar_cache_cep(), pd.DataFrame(new_coords)], ignore_index=True)
+    df_cache_updated.drop_duplicates(subset=['cep'], keep='last', inplace=True)
+    # Grava ao lado e troca de uma vez: uma gravação interrompida não corrompe o cache.
+    temporario = f"{CACHE_FILE}.tmp"
+    df_cache_updated.to_csv(temporario, index=False)
+    os.replace(temporario, CACHE_FILE)
+    return len(new_coords)
+
+@telemetria.cronometrar('geocode.atualizar_cache')
 def atualizar_cache_cep(df_pedidos_validos):
     """
     Verifica os CEPs em um DataFrame de pedidos, busca os que não estão no cache
@@ -39,46 +76,38 @@ def atualizar_cache_cep(df_pedidos_validos):
         st.warning("Coluna 'CEP' não encontrada nos pedidos. Puxando a geolocalização.")
         return
 
-    ceps_in_report = set(df_pedidos_validos['CEP'].dropna().unique())
-
-    # Garante que o diretório 'data' exista
-    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
-
-    if os.path.exists(CACHE_FILE):
-        df_cache = pd.read_csv(CACHE_FILE, dtype={'cep': str})
-        ceps_in_cache = set(df_cache['cep'])
-    else:
-        df_cache = pd.DataFrame(columns=['cep', 'lat', 'lon'])
-        ceps_in_cache = set()
-
-    ceps_to_fetch = list(ceps_in_report - ceps_in_cache)
+    ceps_to_fetch = ceps_pendentes(df_pedidos_validos)
 
     if not ceps_to_fetch:
         st.write("Cache de CEPs já está 100% atualizado.")
         return
 
     st.write(f"Encontrados {len(ceps_to_fetch)} novos CEPs para geocodificar...")
-    new_coords = []
     
     # Usando uma barra de progresso do Streamlit
     progress_bar = st.progress(0)
-    total_ceps = len(ceps_to_fetch)
-
-    with ThreadPoolExecutor(max_workers=15) as executor:
-        futures = {executor.submit(_fetch_coordinate, cep): cep for cep in ceps_to_fetch}
-        for i, future in enumerate(as_completed(futures)):
-            result = future.result()
-            if result:
-                new_coords.append(result)
-            progress_bar.progress((i + 1) / total_ceps)
-
+    new_coords = buscar_coordenadas(ceps_to_fetch, ao_concluir=lambda feitos, total: progress_bar.progress(feitos / total))
     progress_bar.empty() # Limpa a barra de progresso
 
-    if new_coords:
-        df_new = pd.DataFrame(new_coords)
-        df_cache_updated = pd.concat([df_cache, df_new], ignore_index=True)
-        df_cache_updated.drop_duplicates(subset=['cep'], keep='last', inplace=True)
-        df_cache_updated.to_csv(CACHE_FILE, index=False)
+    if salvar_coordenadas(new_coords):
         st.write(f"Cache atualizado! {len(new_coords)} novas coordenadas foram salvas em '{CACHE_FILE}'.")
     else:
         st.write("Nenhuma nova coordenada foi encontrada para os CEPs buscados.")
+
+
+# --- LEITURA DO CACHE PARA O DASHBOARD ---
+
+def carregar_cache_cep():
+    """Lê o arquivo de cache de CEPs (cep, lat, lon)."""
+    if os.path.exists(CACHE_FILE):
+        return pd.read_csv(CACHE_FILE, dtype={'cep': str})
+    return pd.DataFrame(columns=['cep', 'lat', 'lon'])
+
+def _versao_arquivo_cache():
+    return os.path.getmtime(CACHE_FILE) if os.path.exists(CACHE_FILE) else None
+
+def obter_cache_cep():
+    """Snapshot compartilhado do cache de CEPs; recarregado quando o arquivo muda."""
+    return registro_cache.obter('cep')
+
+registro_cache.registrar('cep', carregar_cache_cep, tags=('cep',), sonda=_versao_arquivo_cache)
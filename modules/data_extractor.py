@@ -5,16 +5,8 @@ import pandas as pd
 from datetime import datetime
 import unicodedata
 import pytz
-import gspread
-from gspread_dataframe import get_as_dataframe, set_with_dataframe
-import numpy as np
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from . import sheets_gateway
+from .data_handler import gravar_particoes, registrar_versao_planilha
 
 # --- Funções de Apoio (copiadas para autossuficiência) ---
 
@@ -74,53 +66,14 @@ def tratar_dados_saipos(df_bruto):
             
     return df_validos, df_cancelados
 
-def get_google_sheets_client():
-    """Autentica no Google Sheets."""
-    if "google_credentials" in st.secrets:
-        return gspread.service_account_from_dict(st.secrets.get("google_credentials"))
-    else:
-        credentials_file = "google_credentials.json"
-        if os.path.exists(credentials_file):
-            return gspread.service_account(filename=credentials_file)
-    st.error("ERRO: Credenciais do Google não encontradas.")
-    return None
-
-def update_target_sheet(spreadsheet, worksheet_index, df_new):
-    """Atualiza uma aba específica com lógica de não duplicação."""
-    worksheet = spreadsheet.get_worksheet(worksheet_index)
-    worksheet_name = worksheet.title
-    df_existing = get_as_dataframe(worksheet, evaluate_formulas=False, header=0)
-    df_existing.dropna(how='all', axis=1, inplace=True)
-    df_new_cleaned = df_new.astype(object).replace(np.nan, '')
-
-    if df_existing.empty:
-        print(f"Aba '{worksheet_name}' vazia. Escrevendo {len(df_new_cleaned)} linhas.")
-        set_with_dataframe(worksheet, df_new_cleaned)
-        return len(df_new_cleaned)
-    else:
-        df_existing['Pedido'] = df_existing['Pedido'].astype(str)
-        df_new_cleaned['Pedido'] = df_new_cleaned['Pedido'].astype(str)
-        
-        linhas_novas = df_new_cleaned[~df_new_cleaned['Pedido'].isin(df_existing['Pedido'])]
-        num_new_rows = len(linhas_novas)
-
-        if num_new_rows > 0:
-            print(f"Adicionando {num_new_rows} novas linhas à aba '{worksheet_name}'...")
-            worksheet.append_rows(linhas_novas.values.tolist(), value_input_option='USER_ENTERED')
-        else:
-            print(f"Nenhuma linha nova para adicionar em '{worksheet_name}'.")
-        return num_new_rows
-
 def sync_with_google_sheets(df_validos, df_cancelados):
     """Orquestra a atualização das planilhas."""
-    gc = get_google_sheets_client()
-    if gc is None: return
-    sheet_name = st.secrets.get("GOOGLE_SHEET_NAME") or os.getenv("GOOGLE_SHEET_NAME")
-    if not sheet_name: return
     try:
-        spreadsheet = gc.open(sheet_name)
-        update_target_sheet(spreadsheet, 0, df_validos)
-        update_target_sheet(spreadsheet, 1, df_cancelados)
+        # Gateway compartilhado: credenciais dos segredos ou de google_credentials.json, planilha por chave ou nome.
+        spreadsheet = sheets_gateway.obter_gateway().planilha()
+        # Partições mensais: só os pedidos que ainda não estão no mês são acrescentados.
+        gravar_particoes({'validos': df_validos, 'cancelados': df_cancelados}, modo='acrescentar')
+        registrar_versao_planilha(spreadsheet)
     except Exception as e:
         print(f"ERRO ao sincronizar com o Google Sheets: {e}")
 
@@ -128,6 +81,14 @@ def sync_with_google_sheets(df_validos, df_cancelados):
 
 def run_extraction():
     """Função que executa o ciclo ETL: Extrai, Transforma e Carrega."""
+    # O selenium só é importado quando o robô roda, não em cada página que importa este módulo.
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
     
     SAIPOS_LOGIN_URL = 'https://conta.saipos.com/#/access/login'
     REPORT_URL = 'https://conta.saipos.com/#/app/report/sales-by-period'
@@ -2,24 +2,65 @@
 import streamlit as st
 import pandas as pd
 import gspread
-from gspread_dataframe import set_with_dataframe, get_as_dataframe
 import numpy as np
 import unicodedata
 import pytz
 from datetime import datetime
+from . import escrita_sheets, particoes, registro_cache, registro_uploads, sheets_gateway, sketches, snapshots, telemetria
+import hashlib
+import io
 import textwrap
+import time
+import uuid
+
+ABA_METADADOS = "Metadados"
+ABA_VALIDOS = "Página1"
+ABA_CANCELADOS = "Cancelados"
+TTL_SONDA_VERSAO = 30
 
 # --- FUNÇÕES DE AUTENTICAÇÃO E CONEXÃO ---
 
-def _get_google_sheets_client():
+def _abrir_planilha():
+    """Planilha aberta pelo gateway compartilhado (autenticação e abertura feitas uma vez por processo)."""
+    return sheets_gateway.obter_gateway().planilha()
+
+# --- CONTROLE DE VERSÃO DA PLANILHA ---
+
+def registrar_versao_planilha(spreadsheet):
+    """Grava na aba de metadados um marcador de revisão novo. Chamado ao fim de cada carga."""
+    versao = f"{datetime.now(pytz.timezone('America/Maceio')).strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
     try:
-        return gspread.service_account_from_dict(st.secrets["google_credentials"])
+        worksheet = spreadsheet.worksheet(ABA_METADADOS)
+    except gspread.WorksheetNotFound:
+        worksheet = spreadsheet.add_worksheet(title=ABA_METADADOS, rows=2, cols=2)
+    worksheet.update([["versao", versao]], "A1:B1")
+    return versao
+
+@st.cache_data(ttl=TTL_SONDA_VERSAO, show_spinner=False)
+def obter_versao_planilha():
+    """
+    Sonda barata da versão dos dados: lê o marcador da aba de metadados e, se ele
+    não existir, usa o `modifiedTime` do Drive. Se a sonda falhar, cai para uma
+    janela de 5 minutos, equivalente ao antigo TTL.
+    """
+    try:
+        spreadsheet = _abrir_planilha()
+        try:
+            valores = spreadsheet.values_get(f"'{ABA_METADADOS}'!B1").get('values', [])
+            if valores and valores[0]:
+                return f"marcador:{valores[0][0]}"
+        except gspread.exceptions.APIError:
+            pass
+        return f"drive:{spreadsheet.get_lastUpdateTime()}"
     except Exception as e:
-        print(f"Erro ao autenticar com o Google Sheets: {e}")
-        return None
+        print(f"Erro ao consultar a versão da planilha: {e}")
+    return f"janela:{int(time.time() // 300)}"
 
 # --- FUNÇÕES DE DADOS ---
 
+DIAS_DA_SEMANA = {0: '1. Segunda', 1: '2. Terça', 2: '3. Quarta', 3: '4. Quinta', 4: '5. Sexta', 5: '6. Sábado', 6: '7. Domingo'}
+
+@telemetria.cronometrar('saipos.tratar_dados')
 def tratar_dados_saipos(df_bruto):
     if df_bruto is None or df_bruto.empty:
         return pd.DataFrame(), pd.DataFrame()
@@ -36,7 +77,6 @@ def tratar_dados_saipos(df_bruto):
     df_cancelados = df[df['Esta cancelado'] == 'S'].copy()
     df_validos = df[df['Esta cancelado'] == 'N'].copy()
     fuso_horario = pytz.timezone('America/Maceio')
-    day_map = {0: '1. Segunda', 1: '2. Terça', 2: '3. Quarta', 3: '4. Quinta', 4: '5. Sexta', 5: '6. Sábado', 6: '7. Domingo'}
     for temp_df in [df_validos, df_cancelados]:
         if not temp_df.empty and 'Data da venda' in temp_df.columns:
             temp_df['Data da venda'] = pd.to_datetime(temp_df['Data da venda'], dayfirst=True, errors='coerce')
@@ -49,7 +89,7 @@ def tratar_dados_saipos(df_bruto):
             temp_df['Hora'] = temp_df['Data da venda'].dt.hour
             temp_df['Ano'] = temp_df['Data da venda'].dt.year
             temp_df['Mês'] = temp_df['Data da venda'].dt.month
-            temp_df['Dia da Semana'] = temp_df['Data da venda'].dt.weekday.map(day_map)
+            temp_df['Dia da Semana'] = temp_df['Data da venda'].dt.weekday.map(DIAS_DA_SEMANA)
     if not df_validos.empty:
         cols_numericas = ['Itens', 'Total taxa de serviço', 'Total', 'Entrega', 'Acréscimo', 'Desconto']
         for col in cols_numericas:
@@ -69,55 +109,516 @@ def tratar_dados_saipos(df_bruto):
             temp_df['Data'] = temp_df['Data'].astype(str)
     return df_validos, df_cancelados
 
+# --- LEITURA E MESCLA DE RELATÓRIOS ---
+
+def _ler_csv(conteudo):
+    """CSV do export: separador ';' (com vírgula decimal) ou ','; UTF-8 ou Latin-1."""
+    try:
+        texto = conteudo.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        texto = conteudo.decode('latin-1')
+    cabecalho = texto.split('\n', 1)[0]
+    separador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+    return pd.read_csv(io.StringIO(texto), sep=separador, decimal=',' if separador == ';' else '.', dtype={'Pedido': str, 'CEP': str})
+
+def ler_relatorio(nome, conteudo):
+    """Relatório bruto da Saipos (.xlsx, .csv ou .parquet, pela extensão de `nome`) a partir dos bytes do arquivo."""
+    formato = registro_uploads.formato_arquivo(nome)
+    if formato == 'csv':
+        return _ler_csv(conteudo)
+    if formato == 'parquet':
+        return pd.read_parquet(io.BytesIO(conteudo))
+    # Como texto: no Excel, CEP numérico vira float ('49037804.0') e perderia o formato.
+    return pd.read_excel(io.BytesIO(conteudo), dtype={'Pedido': str, 'CEP': str})
+
+def mesclar_relatorios(tratados):
+    """
+    Junta vários (validos, cancelados) de relatórios que se sobrepõem: cada Pedido
+    fica uma vez só, com a versão do último relatório da lista (inclusive se ele
+    mudou de válido para cancelado).
+    """
+    tabelas = [df for par in tratados for df in par]
+    if len(tabelas) <= 2:
+        return tuple(tratados[0]) if tratados else (pd.DataFrame(), pd.DataFrame())
+    chaves = pd.concat([pd.DataFrame({'Pedido': df['Pedido'].astype(str).to_numpy(), 'tabela': i, 'linha': np.arange(len(df))}) for i, df in enumerate(tabelas) if not df.empty], ignore_index=True)
+    vencedores = chaves.drop_duplicates('Pedido', keep='last')
+    linhas = {i: grupo['linha'].sort_values().to_numpy() for i, grupo in vencedores.groupby('tabela')}
+    validos = [tabelas[i].iloc[linhas[i]] for i in range(0, len(tabelas), 2) if i in linhas]
+    cancelados = [tabelas[i].iloc[linhas[i]] for i in range(1, len(tabelas), 2) if i in linhas]
+    return (pd.concat(validos, ignore_index=True) if validos else pd.DataFrame(),
+            pd.concat(cancelados, ignore_index=True) if cancelados else pd.DataFrame())
+
+# Relatórios enviados na página de atualização, tratados uma vez e compartilhados.
+# A sessão guarda só os sha256 dos arquivos; os DataFrames ficam aqui e não devem ser alterados.
+@st.cache_resource(max_entries=4, show_spinner=False)
+def tratar_relatorios_enviados(arquivos, _conteudos):
+    """
+    `arquivos`: tupla de (sha256, nome) na ordem de envio; `_conteudos`: os bytes na mesma ordem.
+    Retorna (validos, cancelados, linhas_por_arquivo) com os relatórios mesclados por Pedido.
+    """
+    tratados = [tratar_dados_saipos(ler_relatorio(nome, conteudo)) for (_, nome), conteudo in zip(arquivos, _conteudos)]
+    linhas = {sha256: (len(v), len(c)) for (sha256, _), (v, c) in zip(arquivos, tratados)}
+    return (*mesclar_relatorios(tratados), linhas)
+
+def calcular_versao_dados(*dfs):
+    """Impressão digital curta do conteúdo dos DataFrames, usada como versão dos dados."""
+    h = hashlib.sha1()
+    for df in dfs:
+        if df is None or df.empty:
+            h.update(b'vazio')
+            continue
+        h.update(','.join(map(str, df.columns)).encode('utf-8'))
+        h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()[:16]
+
 def _padronizar_texto(texto):
     if not isinstance(texto, str): return texto
     return ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn').strip().upper()
 
-def carregar_dados_para_gsheets(df_novos_validos, df_novos_cancelados):
-    gc = _get_google_sheets_client()
-    if gc is None: return
-    sheet_name = st.secrets.get("GOOGLE_SHEET_NAME")
-    if not sheet_name: return
+def carregar_dados_para_gsheets(df_novos_validos, df_novos_cancelados, progresso=None):
+    """
+    Grava o relatório nas partições mensais: cada mês presente no relatório
+    substitui a partição correspondente (meses sem mudança não são regravados).
+    `progresso(ProgressoEscrita)`, opcional, recebe o andamento de cada bloco.
+    """
     try:
-        spreadsheet = gc.open(sheet_name)
-        # Usa a nova função simplificada para ambas as abas
-        _atualizar_aba_robusta(spreadsheet, "Página1", df_novos_validos)
-        _atualizar_aba_robusta(spreadsheet, "Cancelados", df_novos_cancelados)
+        spreadsheet = _abrir_planilha()
+        gravar_particoes({'validos': df_novos_validos, 'cancelados': df_novos_cancelados}, progresso=progresso)
+        registrar_versao_planilha(spreadsheet)
         st.success("Planilhas atualizadas com sucesso!")
     except Exception as e:
         st.error(f"Ocorreu um erro ao carregar os dados para o Google Sheets: {e}")
 
-# --- FUNÇÃO DE ATUALIZAÇÃO SIMPLIFICADA ---
-def _atualizar_aba_robusta(spreadsheet, nome_aba, df_novos):
+# --- ATUALIZAÇÃO DAS ABAS EM BLOCOS ---
+def _atualizar_aba_robusta(spreadsheet, nome_aba, df_novos, progresso=None):
     """
-    Limpa completamente uma aba e insere os novos dados do relatório.
-    Esta é a forma mais segura de evitar duplicatas.
+    Substitui o conteúdo da aba pelos dados do relatório (evita duplicatas).
+    A gravação é feita em blocos numa aba temporária, com checkpoint, e só
+    troca de lugar com a original no fim: uma falha no meio não apaga a aba.
     """
-    st.write(f"Atualizando a aba '{nome_aba}'...")
-    try:
-        worksheet = spreadsheet.worksheet(nome_aba)
-        st.write(f"Limpando dados antigos da aba '{nome_aba}'...")
-        worksheet.clear() 
-    except gspread.WorksheetNotFound:
-        st.write(f"Aba '{nome_aba}' não encontrada. Criando uma nova...")
-        worksheet = spreadsheet.add_worksheet(title=nome_aba, rows="1", cols=len(df_novos.columns) if not df_novos.empty else 20)
-    
-    st.write(f"Inserindo {len(df_novos)} linhas na aba '{nome_aba}'...")
-    # Converte tudo para string para máxima compatibilidade com o Google Sheets
-    set_with_dataframe(worksheet, df_novos.astype(str), include_index=False, resize=True)
+    st.write(f"Gravando {len(df_novos)} linhas na aba '{nome_aba}'...")
+    escrita_sheets.gravar_aba(spreadsheet, nome_aba, df_novos, progresso=progresso)
     st.success(f"Aba '{nome_aba}' sincronizada!")
 
-def ler_dados_do_gsheets():
-    """Lê os dados do Google Sheets. Retorna dataframes vazios em caso de erro."""
+# --- PARTIÇÕES MENSAIS ---
+
+def _linhas_para_dataframe(valores):
+    """Linhas devolvidas pela API (cabeçalho na primeira) -> DataFrame de texto."""
+    if not valores:
+        return pd.DataFrame()
+    cabecalho = [str(c) for c in valores[0]]
+    largura = len(cabecalho)
+    linhas = [(list(linha) + [''] * (largura - len(linha)))[:largura] for linha in valores[1:]]
+    return pd.DataFrame(linhas, columns=cabecalho)
+
+def _tipar_particao(df):
+    """
+    Colunas do ESQUEMA no tipo do esquema (números sempre float, datas sem hora
+    como date) e as demais como texto. O relatório e a partição lida da planilha passam por aqui antes de
+    serem juntados: o mesmo pedido e as mesmas datas ficam iguais dos dois lados
+    e a versão da partição não depende de onde cada linha veio.
+    """
+    tipado = {}
+    for coluna in df.columns:
+        tipo = ESQUEMA.get(coluna, 'texto')
+        serie = df[coluna].reset_index(drop=True)
+        if not (tipo in ('data', 'datahora') and pd.api.types.is_datetime64_any_dtype(serie)):
+            serie = _converter_coluna(serie.astype(object).where(serie.notna(), None).tolist(), tipo)
+        if tipo == 'data':
+            serie = serie.dt.date  # Gravada como '2025-06-01', sem a hora.
+        elif tipo == 'numero':
+            serie = serie.astype('float64')
+        tipado[coluna] = serie
+    return pd.DataFrame(tipado, columns=list(df.columns))
+
+def _ler_particao(gateway, aba):
+    """Partição gravada, lida sem formatação (como no dashboard) e tipada por _tipar_particao."""
+    return _tipar_particao(_linhas_para_dataframe(gateway.ler_abas(aba, **PARAMETROS_LEITURA)[aba]))
+
+def _mesclar_por_pedido(existente, novos, excluir_pedidos=None):
+    """
+    Partição existente com os pedidos do relatório: pedido repetido fica com a
+    versão nova e `excluir_pedidos` (ex.: que passaram a cancelados) sai.
+    Ordenada por data e pedido, para que o mesmo conteúdo dê sempre a mesma versão.
+    """
+    novos = _tipar_particao(novos)
+    if not existente.empty:
+        remover = set(novos['Pedido'].dropna()) | set(_texto_pedido(excluir_pedidos or ()).dropna())
+        existente = existente[~existente['Pedido'].isin(remover)]
+    mesclado = pd.concat([existente, novos], ignore_index=True) if not existente.empty else novos
+    ordem = [c for c in ('Data da venda', 'Pedido') if c in mesclado.columns]
+    return mesclado.sort_values(ordem, kind='stable', ignore_index=True) if ordem else mesclado
+
+def _acrescentar_novos(existente, novos):
+    """Mantém o que já está na partição e acrescenta só os pedidos que ainda não existem."""
+    novos = _tipar_particao(novos)
+    if existente.empty:
+        return novos
+    novos = novos[~novos['Pedido'].isin(set(existente['Pedido'].dropna()))]
+    return pd.concat([existente, novos], ignore_index=True)
+
+def _migrar_abas_legadas(gateway, progresso=None):
+    """Primeira carga particionada: copia 'Página1' e 'Cancelados' para as partições (as abas antigas ficam como backup)."""
+    planilha = gateway.planilha()
+    nomes = {aba.title for aba in planilha.worksheets()}
+    legadas = {tabela: aba for tabela, aba in (('validos', ABA_VALIDOS), ('cancelados', ABA_CANCELADOS)) if aba in nomes}
+    if not legadas:
+        return []
+    st.write("Migrando as abas antigas para partições mensais...")
+    valores = gateway.ler_abas(*legadas.values())
+    descritas = []
+    for tabela, aba in legadas.items():
+        for mes, parte in particoes.dividir_por_mes(_linhas_para_dataframe(valores[aba])).items():
+            _atualizar_aba_robusta(planilha, particoes.nome_aba(tabela, mes), parte, progresso)
+            descritas.append(particoes.descrever(tabela, mes, parte))
+    return descritas
+
+def abrir_manifesto_para_escrita(gateway, progresso=None):
+    """
+    Partições atuais {aba: Particao} e se o manifesto precisa ser gravado mesmo
+    sem partições novas (primeira carga: as abas antigas são migradas aqui).
+    """
+    manifesto = particoes.ler_manifesto(gateway)
+    if manifesto is None:
+        return {p.aba: p for p in _migrar_abas_legadas(gateway, progresso)}, True
+    return {p.aba: p for p in manifesto}, False
+
+def gravar_particao(gateway, atuais, tabela, mes, parte, modo='substituir', progresso=None, escrever=_atualizar_aba_robusta, excluir_pedidos=None):
+    """
+    Grava a partição de `tabela` do mês, se o conteúdo mudou em relação a `atuais`.
+    Retorna a descrição nova, ou None se a aba já estava igual. `escrever` recebe
+    (planilha, aba, df, progresso); fora da thread da página, use escrita_sheets.gravar_aba.
+    modo='mesclar' junta por Pedido com o que já está na aba (ver _mesclar_por_pedido).
+    modo='acrescentar' só lê a coluna Pedido da aba e acrescenta os pedidos novos no fim.
+    """
+    aba = particoes.nome_aba(tabela, mes)
+    if modo == 'acrescentar' and aba in atuais:
+        cabecalhos = gateway.cabecalhos([aba])
+        if 'Pedido' in cabecalhos[aba] and set(parte.columns) <= set(cabecalhos[aba]):
+            existentes = gateway.ler_colunas([aba], {'Pedido'}, cabecalhos=cabecalhos, **PARAMETROS_LEITURA)[aba].get('Pedido', [])
+            novos = parte[~_texto_pedido(parte['Pedido']).isin(set(_texto_pedido(existentes).dropna()))]
+            if novos.empty:
+                return None
+            escrita_sheets.acrescentar_linhas(gateway.planilha(), aba, novos.reindex(columns=cabecalhos[aba]))
+            return particoes.descrever_acrescimo(atuais[aba], novos)
+        # O relatório trouxe colunas que a aba não tem: o mês é regravado inteiro.
+        parte = _acrescentar_novos(_ler_particao(gateway, aba), parte)
+    elif modo == 'mesclar':
+        existente = _ler_particao(gateway, aba) if aba in atuais else pd.DataFrame()
+        parte = _mesclar_por_pedido(existente, parte, excluir_pedidos)
+    descricao = particoes.descrever(tabela, mes, parte)
+    if aba in atuais and atuais[aba].versao == descricao.versao:
+        return None
+    escrever(gateway.planilha(), aba, parte, progresso=progresso)
+    return descricao
+
+def pedidos_das_outras_tabelas(tabelas, tabela):
+    """Pedidos que o relatório põe em outra tabela (ex.: válido que foi cancelado) e devem sair desta."""
+    return set().union(*(set(df['Pedido'].astype(str)) for nome, df in tabelas.items() if nome != tabela and not df.empty))
+
+def gravar_particoes(tabelas, modo='substituir', progresso=None):
+    """
+    Grava {'validos': df, 'cancelados': df} nas partições mensais e atualiza o manifesto.
+    modo='substituir': o mês do relatório substitui a partição (upload manual).
+    modo='acrescentar': só pedidos novos entram na partição existente (robô).
+    modo='mesclar': pedidos do relatório substituem os de mesmo número na partição (uploads que se sobrepõem).
+    Partições cuja versão não mudou não são regravadas.
+    """
+    gateway = sheets_gateway.obter_gateway()
+    atuais, alterado = abrir_manifesto_para_escrita(gateway, progresso)
+    for tabela, df in tabelas.items():
+        excluir = pedidos_das_outras_tabelas(tabelas, tabela) if modo == 'mesclar' else None
+        for mes, parte in particoes.dividir_por_mes(df).items():
+            descricao = gravar_particao(gateway, atuais, tabela, mes, parte, modo, progresso, excluir_pedidos=excluir)
+            if descricao is not None:
+                atuais[descricao.aba] = descricao
+                alterado = True
+    if alterado:
+        particoes.gravar_manifesto(gateway.planilha(), list(atuais.values()))
+    return list(atuais.values())
+
+@st.cache_resource
+def _cache_particoes():
+    """Partições já lidas, por aba: {aba: (versão, DataFrame)}. Só o que mudou no manifesto é relido."""
+    return {}
+
+def _ler_particoes(gateway, manifesto, data_inicial=None, data_final=None):
+    cache = _cache_particoes()
+    ativas = {p.aba for p in manifesto}
+    for aba in [a for a in cache if a not in ativas]:
+        cache.pop(aba, None)
+    selecionadas = {tabela: particoes.selecionar(manifesto, tabela, data_inicial, data_final) for tabela in particoes.PREFIXOS}
+    pendentes = [p for grupo in selecionadas.values() for p in grupo if cache.get(p.aba, (None,))[0] != p.versao]
+    if pendentes:
+        # Uma única leitura (em lotes paralelos) para todas as partições novas ou alteradas.
+        lidas = _ler_colunas_dashboard(gateway, [p.aba for p in pendentes])
+        for p in pendentes:
+            cache[p.aba] = (p.versao, lidas[p.aba])
+    resultado = []
+    for tabela in ('validos', 'cancelados'):
+        partes = [cache[p.aba][1] for p in selecionadas[tabela] if not cache[p.aba][1].empty]
+        resultado.append(pd.concat(partes, ignore_index=True) if partes else pd.DataFrame())
+    return tuple(resultado)
+
+# Tipo de cada coluna conhecida do relatório: tipa as partições antes de mesclar
+# (_tipar_particao) e as colunas lidas para o dashboard (COLUNAS_DASHBOARD).
+ESQUEMA = {
+    'Pedido': 'texto',
+    'Data da venda': 'datahora',
+    'Data': 'data',
+    'Hora': 'numero',
+    'Ano': 'numero',
+    'Mês': 'numero',
+    'Dia da Semana': 'texto',
+    'Canal de venda': 'texto',
+    'Tipo de Canal': 'texto',
+    'Consumidor': 'texto',
+    'Bairro': 'texto',
+    'CEP': 'texto',
+    'Itens': 'numero',
+    'Total': 'numero',
+    'Total taxa de serviço': 'numero',
+    'Entrega': 'numero',
+    'Acréscimo': 'numero',
+    'Desconto': 'numero',
+    'Motivo de cancelamento': 'texto',
+}
+# Datas vêm como número de série do Sheets (dias desde 30/12/1899) quando a célula foi
+# reconhecida como data; texto que não virou data é interpretado normalmente.
+PARAMETROS_LEITURA = {'valueRenderOption': 'UNFORMATTED_VALUE', 'dateTimeRenderOption': 'SERIAL_NUMBER'}
+
+def _converter_coluna(valores, tipo):
+    serie = pd.Series(valores, dtype=object).replace('', None)
+    if tipo == 'numero':
+        return pd.to_numeric(serie, errors='coerce')
+    if tipo in ('data', 'datahora'):
+        numeros = pd.to_numeric(serie, errors='coerce')
+        datas = pd.to_datetime(numeros, unit='D', origin='1899-12-30', errors='coerce')
+        textos = serie[numeros.isna() & serie.notna()]
+        if not textos.empty:
+            datas.loc[textos.index] = pd.to_datetime(textos.astype(str), format='mixed', errors='coerce')
+        return datas.dt.normalize() if tipo == 'data' else datas
+    # Texto: números inteiros lidos sem formatação (ex.: Pedido 123.0) voltam a ser '123'.
+    return serie.map(lambda v: str(int(v)) if isinstance(v, float) and v.is_integer() else (v if v is None or isinstance(v, str) else str(v)))
+
+def _texto_pedido(valores):
+    """Número do pedido como texto, venha ele do relatório ou lido sem formatação (123.0 -> '123')."""
+    return _converter_coluna(list(valores), 'texto')
+
+def _colunas_para_dataframe(colunas, esquema=ESQUEMA):
+    """Monta o DataFrame direto das colunas lidas, já com os tipos do esquema."""
+    if not colunas:
+        return pd.DataFrame()
+    tamanho = max(len(v) for v in colunas.values())
+    dados = {nome: _converter_coluna(list(valores) + [None] * (tamanho - len(valores)), esquema[nome]) for nome, valores in colunas.items()}
+    return pd.DataFrame(dados).dropna(how='all')
+
+def _derivar_datas(df):
+    """Completa Data, Hora, Ano, Mês e Dia da Semana a partir de 'Data da venda', que sai do DataFrame."""
+    if 'Data da venda' not in df.columns:
+        return df
+    instantes = df.pop('Data da venda')
+    derivadas = {
+        'Data': instantes.dt.normalize(),
+        'Hora': instantes.dt.hour.astype('float64'),
+        'Ano': instantes.dt.year.astype('float64'),
+        'Mês': instantes.dt.month.astype('float64'),
+        'Dia da Semana': instantes.dt.weekday.map(DIAS_DA_SEMANA),
+    }
+    for coluna, valores in derivadas.items():
+        if coluna not in df.columns:
+            df[coluna] = valores
+    return df
+
+def _ler_colunas_dashboard(gateway, abas):
+    """
+    Só as colunas de COLUNAS_DASHBOARD de cada aba, tipadas: {aba: DataFrame}.
+    'Data da venda' é baixada apenas das abas sem 'Data' ou 'Hora' (abas antigas),
+    para derivá-las dela.
+    """
+    cabecalhos = gateway.cabecalhos(abas)
+    colunas = gateway.ler_colunas(abas, COLUNAS_DASHBOARD, cabecalhos=cabecalhos, **PARAMETROS_LEITURA)
+    sem_data = [aba for aba in abas if not {'Data', 'Hora'} <= set(cabecalhos[aba]) and 'Data da venda' in cabecalhos[aba]]
+    if sem_data:
+        instantes = gateway.ler_colunas(sem_data, {'Data da venda'}, cabecalhos=cabecalhos, **PARAMETROS_LEITURA)
+        for aba in sem_data:
+            colunas[aba].update(instantes[aba])
+    return {aba: _derivar_datas(_colunas_para_dataframe(colunas[aba])) for aba in abas}
+
+def ler_dados_do_gsheets(data_inicial=None, data_final=None, meses_recentes=None):
+    """
+    Lê os dados do Google Sheets. Com o manifesto, só as partições que cruzam o
+    período pedido são consideradas, e só as alteradas desde a última leitura são
+    baixadas; `meses_recentes` troca o início do período pelo dos últimos N meses
+    com dados. Sem manifesto, lê as abas antigas. Retorna dataframes vazios em caso de erro.
+    """
+    with telemetria.span('sheets.ler_dados') as medicao:
+        df_validos, df_cancelados = _ler_dados_do_gsheets(data_inicial, data_final, meses_recentes)
+        medicao.bytes = telemetria.tamanho_dataframe(df_validos) + telemetria.tamanho_dataframe(df_cancelados)
+    return df_validos, df_cancelados
+
+def _ler_dados_do_gsheets(data_inicial, data_final, meses_recentes=None):
     try:
-        gc = _get_google_sheets_client()
-        if gc is None: print("Falha na conexão com o Google Sheets."); return pd.DataFrame(), pd.DataFrame()
-        sheet_name = st.secrets.get("GOOGLE_SHEET_NAME");
-        if not sheet_name: print("Nome da planilha não configurado nos segredos."); return pd.DataFrame(), pd.DataFrame()
-        spreadsheet = gc.open(sheet_name)
-        df_validos = get_as_dataframe(spreadsheet.worksheet("Página1"), evaluate_formulas=False).dropna(how='all')
-        df_cancelados = get_as_dataframe(spreadsheet.worksheet("Cancelados"), evaluate_formulas=False).dropna(how='all')
-        return df_validos, df_cancelados
+        gateway = sheets_gateway.obter_gateway()
+        manifesto = particoes.ler_manifesto(gateway)
+        if manifesto is not None:
+            if meses_recentes:
+                data_inicial = particoes.inicio_meses_recentes(manifesto, meses_recentes) or data_inicial
+            return _ler_particoes(gateway, manifesto, data_inicial, data_final)
+        lidas = _ler_colunas_dashboard(gateway, [ABA_VALIDOS, ABA_CANCELADOS])
+        return lidas[ABA_VALIDOS], lidas[ABA_CANCELADOS]
     except Exception as e:
         print(f"Ocorreu um erro ao ler os dados do Google Sheets: {e}")
         return pd.DataFrame(), pd.DataFrame()
+
+# --- DADOS DO DASHBOARD (CACHE COMPARTILHADO) ---
+
+# Sem snapshot em disco, o dashboard abre com os meses mais recentes; o histórico
+# completo é lido em seguida, em segundo plano (registro_cache, carregador_inicial).
+MESES_CARGA_INICIAL = 2
+
+def carregar_dados_dashboard(meses_recentes=None):
+    """Lê as planilhas e tipa as colunas usadas pelo dashboard. Retorna (validos, cancelados, versao)."""
+    df_validos, df_cancelados = tipar_dados_dashboard(*ler_dados_do_gsheets(meses_recentes=meses_recentes))
+    df_validos, df_cancelados = compactar_dados_dashboard(df_validos, df_cancelados)
+    versao_dados = calcular_versao_dados(df_validos, df_cancelados)
+    return df_validos, df_cancelados, versao_dados
+
+def tipar_dados_dashboard(df_validos, df_cancelados):
+    """Converte, no lugar, as colunas usadas pelo dashboard (números, Data como date). Retorna os mesmos DataFrames."""
+    if not df_validos.empty:
+        cols_numericas = ['Itens', 'Total taxa de serviço', 'Total', 'Entrega', 'Acréscimo', 'Desconto', 'Ano', 'Mês']
+        for col in cols_numericas:
+            if col in df_validos.columns:
+                df_validos[col] = pd.to_numeric(df_validos[col], errors='coerce').fillna(0)
+        # Hora desconhecida fica nula: como 0, cairia nas janelas da madrugada (ver campanhas.fatiar).
+        if 'Hora' in df_validos.columns:
+            df_validos['Hora'] = pd.to_numeric(df_validos['Hora'], errors='coerce')
+        if 'Data' in df_validos.columns:
+            df_validos['Data'] = pd.to_datetime(df_validos['Data'], errors='coerce').dt.date
+    if not df_cancelados.empty:
+        if 'Data' in df_cancelados.columns:
+             df_cancelados['Data'] = pd.to_datetime(df_cancelados['Data'], errors='coerce').dt.date
+             df_cancelados.dropna(subset=['Data'], inplace=True)
+        if 'Hora' in df_cancelados.columns:
+            df_cancelados['Hora'] = pd.to_numeric(df_cancelados['Hora'], errors='coerce')
+        if 'Total' in df_cancelados.columns:
+            df_cancelados['Total'] = pd.to_numeric(df_cancelados['Total'], errors='coerce')
+    return df_validos, df_cancelados
+
+# Tipos do DataFrame que fica em memória durante a vida do servidor. Colunas fora
+# daqui não são lidas por nenhuma página e são descartadas. None mantém o tipo.
+# Dinheiro continua float64: float32 perde centavos em somas acima de ~R$ 100 mil.
+# Hora é inteiro com nulo (Int8): hora desconhecida não pode virar 0h.
+ESQUEMA_MEMORIA = {
+    'Pedido': None,
+    'Data': None,
+    'Hora': 'Int8',
+    'Ano': 'int16',
+    'Mês': 'int8',
+    'Dia da Semana': 'category',
+    'Canal de venda': 'category',
+    'Tipo de Canal': 'category',
+    'Consumidor': 'category',
+    'Bairro': 'category',
+    'CEP': 'uint32',
+    'Total': 'float64',
+    'Total taxa de serviço': 'float64',
+    'Entrega': 'float64',
+    'Motivo de cancelamento': None,
+}
+# Colunas baixadas da planilha para o dashboard: só as que ficam em memória.
+COLUNAS_DASHBOARD = {coluna: ESQUEMA[coluna] for coluna in ESQUEMA_MEMORIA}
+
+def _compactar_coluna(serie, tipo):
+    if tipo is None or serie.dtype == tipo:
+        return serie
+    if tipo == 'category':
+        return serie.astype('category')
+    if tipo == 'uint32':
+        # CEP como número (8 dígitos cabem em 32 bits); vazio ou inválido vira 0. Para exibir: str(cep).zfill(8).
+        numeros = pd.to_numeric(serie.astype(str).str.replace(r'\D', '', regex=True), errors='coerce')
+        return numeros.where(numeros.between(0, 2**32 - 1)).fillna(0).astype('uint32')
+    if tipo.startswith('int'):
+        return pd.to_numeric(serie, errors='coerce').fillna(0).astype(tipo)
+    return pd.to_numeric(serie, errors='coerce').astype(tipo)
+
+def _memoria_mb(df):
+    return df.memory_usage(index=True, deep=True).sum() / (1024 * 1024)
+
+def compactar_dados_dashboard(df_validos, df_cancelados, esquema=ESQUEMA_MEMORIA):
+    """
+    Descarta as colunas que o dashboard não lê e converte as restantes para os
+    tipos de `esquema` (categorias, inteiros pequenos, CEP numérico). Informa a
+    memória antes e depois. Retorna novos DataFrames, ordenados por Data para que
+    os filtros de período sejam recortes contínuos (ver visoes.fatia_por_data).
+    """
+    resultado, relatorio = [], {}
+    for nome, df in (('validos', df_validos), ('cancelados', df_cancelados)):
+        if df.empty:
+            resultado.append(df)
+            continue
+        antes = _memoria_mb(df)
+        descartadas = [c for c in df.columns if c not in esquema]
+        compacto = pd.DataFrame({c: _compactar_coluna(df[c], esquema[c]) for c in df.columns if c in esquema}, index=df.index)
+        if 'Data' in compacto.columns:
+            compacto = compacto.sort_values('Data', kind='stable', na_position='last', ignore_index=True)
+            compacto.attrs['ordenado_por'] = 'Data'
+        depois = _memoria_mb(compacto)
+        relatorio[nome] = {'linhas': len(df), 'antes_mb': round(float(antes), 2), 'depois_mb': round(float(depois), 2), 'colunas_descartadas': descartadas}
+        print(f"Memória dos dados '{nome}': {antes:.1f} MB -> {depois:.1f} MB ({len(df)} linhas; descartadas: {', '.join(descartadas) or 'nenhuma'})")
+        resultado.append(compacto)
+    telemetria.anotar('memoria_dados_dashboard', relatorio)
+    return tuple(resultado)
+
+def carregar_dados_recentes_dashboard():
+    return carregar_dados_dashboard(meses_recentes=MESES_CARGA_INICIAL)
+
+def obter_dados_dashboard():
+    """Snapshot compartilhado de (validos, cancelados, versao). Atualizado em segundo plano quando a planilha muda."""
+    return registro_cache.obter('vendas')
+
+def dados_dashboard_parciais():
+    """Os dados em memória ainda são só os meses recentes (o histórico está sendo lido)?"""
+    return registro_cache.parcial('vendas')
+
+def calcular_agregados(df_validos, df_cancelados):
+    """Agregados pré-calculados gravados junto ao snapshot (faturamento/pedidos por dia, canal e hora; sketches do valor dos pedidos)."""
+    agregados = {}
+    if not df_validos.empty:
+        agregados['agg_diario_canal'] = df_validos.groupby(['Data', 'Canal de venda'], dropna=False, observed=True).agg(Faturamento=('Total', 'sum'), Pedidos=('Pedido', 'count')).reset_index()
+        agregados['agg_diario_hora'] = df_validos.groupby(['Data', 'Hora'], dropna=False).agg(Faturamento=('Total', 'sum'), Pedidos=('Pedido', 'count')).reset_index()
+        agregados['agg_sketch_total'] = sketches.tabela_sketches(df_validos)
+    if not df_cancelados.empty and 'Total' in df_cancelados.columns:
+        agregados['agg_cancelados_diario'] = df_cancelados.assign(Total=pd.to_numeric(df_cancelados['Total'], errors='coerce')).groupby('Data').agg(Valor=('Total', 'sum'), Pedidos=('Pedido', 'count')).reset_index()
+    return agregados
+
+def _persistir_dados_dashboard(valor, versao_fonte):
+    df_validos, df_cancelados, versao_dados = valor
+    if df_validos.empty:
+        return  # Não sobrescreve um snapshot bom com o resultado de uma leitura que falhou.
+    tabelas = {'validos': df_validos, 'cancelados': df_cancelados, **calcular_agregados(df_validos, df_cancelados)}
+    snapshots.salvar_snapshot('vendas', tabelas, {'versao_fonte': versao_fonte, 'versao_dados': versao_dados})
+
+def _restaurar_dados_dashboard():
+    dfs, manifesto = snapshots.carregar_snapshot('vendas', tabelas=['validos', 'cancelados'])
+    if dfs is None:
+        return None
+    # Snapshots gravados antes da compactação voltam com os tipos antigos.
+    df_validos, df_cancelados = compactar_dados_dashboard(dfs['validos'], dfs['cancelados'])
+    return (df_validos, df_cancelados, manifesto['versao_dados']), manifesto.get('versao_fonte')
+
+def carregar_agregados():
+    """Agregados do snapshot em disco mais recente (dict vazio se não houver)."""
+    manifesto = snapshots.ler_manifesto('vendas')
+    if manifesto is None:
+        return {}
+    tabelas = [t for t in manifesto['tabelas'] if t.startswith('agg_')]
+    dfs, _ = snapshots.carregar_snapshot('vendas', tabelas=tabelas)
+    return dfs or {}
+
+registro_cache.registrar(
+    'vendas', carregar_dados_dashboard, tags=('vendas',), sonda=obter_versao_planilha,
+    restaurar=_restaurar_dados_dashboard, persistir=_persistir_dados_dashboard,
+    carregador_inicial=carregar_dados_recentes_dashboard,
+)
@@ -0,0 +1,222 @@
+# modules/escrita_sheets.py
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import gspread
+import streamlit as st
+
+from . import telemetria
+
+DIR_CHECKPOINTS = os.path.join('data', 'cargas')
+SUFIXO_ABA_TEMPORARIA = '__carga'
+
+# Limites por pedido: bem abaixo do tamanho máximo de payload da API e leves o
+# bastante para não estourar o tempo limite em conexões lentas.
+MAX_CELULAS_POR_BLOCO = 40_000
+MAX_BYTES_POR_BLOCO = 2 * 1024 * 1024
+MAX_LINHAS_POR_BLOCO = 10_000
+
+# Cota do Sheets: 60 pedidos de escrita por minuto por usuário. O balde libera
+# 1 pedido/s, com rajadas de até 10.
+PEDIDOS_POR_SEGUNDO = 1.0
+RAJADA_MAXIMA = 10
+MAX_TENTATIVAS = 5
+
+# --- RITMO DOS PEDIDOS ---
+
+class BaldeTokens:
+    """Token bucket: `consumir()` bloqueia até haver um token disponível."""
+
+    def __init__(self, taxa_por_s=PEDIDOS_POR_SEGUNDO, capacidade=RAJADA_MAXIMA):
+        self.taxa_por_s = taxa_por_s
+        self.capacidade = capacidade
+        self._tokens = float(capacidade)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+        self.espera_total_s = 0.0
+
+    def consumir(self, quantidade=1):
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa_por_s)
+                self._ultimo = agora
+                if self._tokens >= quantidade:
+                    self._tokens -= quantidade
+                    return
+                espera = (quantidade - self._tokens) / self.taxa_por_s
+            self.espera_total_s += espera
+            time.sleep(espera)
+
+@st.cache_resource
+def obter_balde_escrita():
+    """Balde único do processo: a cota de escrita é compartilhada por todas as cargas."""
+    return BaldeTokens()
+
+def _status_http(erro):
+    resposta = getattr(erro, 'response', None)
+    return getattr(resposta, 'status_code', None) or getattr(erro, 'code', None)
+
+def _executar(balde, pedido):
+    """
+    Executa um pedido de escrita respeitando o balde; 429 e 5xx são repetidos com
+    espera crescente. Cada tentativa é uma amostra do span 'sheets.escrita' (as
+    que falham contam como erro) e a última repetição fica anotada na telemetria.
+    """
+    for tentativa in range(MAX_TENTATIVAS):
+        balde.consumir()
+        try:
+            with telemetria.span('sheets.escrita'):
+                return pedido()
+        except gspread.exceptions.APIError as e:
+            status = _status_http(e)
+            if tentativa == MAX_TENTATIVAS - 1 or not (status == 429 or (status or 0) >= 500):
+                raise
+            espera = min(2 ** tentativa * 2, 64)
+            telemetria.anotar('sheets.escrita.repeticao', {'status': status, 'tentativa': tentativa + 1, 'espera_s': espera})
+            time.sleep(espera)
+
+# --- CHECKPOINTS ---
+
+def _caminho_checkpoint(nome_aba, dir_checkpoints):
+    seguro = ''.join(c if c.isalnum() else '_' for c in nome_aba)
+    return os.path.join(dir_checkpoints, f"{seguro}.json")
+
+def _ler_checkpoint(caminho):
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _salvar_checkpoint(caminho, checkpoint):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(temporario, caminho)
+
+# --- ESCRITA EM BLOCOS ---
+
+@dataclass
+class ProgressoEscrita:
+    aba: str
+    linhas_gravadas: int
+    total_linhas: int
+    blocos_gravados: int
+    total_blocos: int
+    linhas_por_s: float
+    retomada: bool = False
+
+    @property
+    def fracao(self):
+        return self.linhas_gravadas / self.total_linhas if self.total_linhas else 1.0
+
+def _para_valores(df):
+    """Mesmo conteúdo que ia antes como `df.astype(str)`, mas com células vazias em vez de 'nan'."""
+    texto = df.astype(str).where(df.notna(), '')
+    return [str(c) for c in df.columns], texto.values.tolist()
+
+def _linhas_por_bloco(cabecalho, linhas):
+    colunas = max(len(cabecalho), 1)
+    amostra = linhas[:200]
+    bytes_por_linha = max(sum(len(v) + 4 for linha in amostra for v in linha) / max(len(amostra), 1), 1)
+    return max(1, min(MAX_LINHAS_POR_BLOCO, MAX_CELULAS_POR_BLOCO // colunas, int(MAX_BYTES_POR_BLOCO / bytes_por_linha)))
+
+def _trocar_abas(planilha, nome_aba, temporaria, balde):
+    """Apaga a aba antiga e dá o nome dela à temporária num único batchUpdate (atômico na API)."""
+    try:
+        antiga = planilha.worksheet(nome_aba)
+    except gspread.WorksheetNotFound:
+        antiga = None
+    pedidos = []
+    propriedades, campos = {'sheetId': temporaria.id, 'title': nome_aba}, 'title'
+    if antiga is not None:
+        pedidos.append({'deleteSheet': {'sheetId': antiga.id}})
+        propriedades['index'], campos = antiga.index, 'title,index'
+    pedidos.append({'updateSheetProperties': {'properties': propriedades, 'fields': campos}})
+    _executar(balde, lambda: planilha.batch_update({'requests': pedidos}))
+
+def gravar_aba(planilha, nome_aba, df, progresso=None, balde=None, dir_checkpoints=DIR_CHECKPOINTS):
+    """
+    Substitui o conteúdo de `nome_aba` pelo DataFrame sem deixar a aba pela metade:
+    os blocos de linhas vão para uma aba temporária, cada bloco gravado é anotado
+    num checkpoint local e, no fim, a temporária toma o lugar da original. Se a
+    mesma carga for interrompida, a próxima chamada continua do último bloco.
+    `progresso(ProgressoEscrita)` é chamado após cada bloco.
+    """
+    balde = balde or obter_balde_escrita()
+    cabecalho, linhas = _para_valores(df)
+    impressao = hashlib.sha1(json.dumps([cabecalho, linhas], ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+    nome_temporaria = f"{nome_aba}{SUFIXO_ABA_TEMPORARIA}"
+    intervalo_temporaria = "'{}'".format(nome_temporaria.replace("'", "''"))
+    caminho = _caminho_checkpoint(nome_aba, dir_checkpoints)
+    tamanho_bloco = _linhas_por_bloco(cabecalho, linhas)
+    total_blocos = -(-len(linhas) // tamanho_bloco)
+
+    temporaria, inicio = None, 0
+    checkpoint = _ler_checkpoint(caminho)
+    if checkpoint and checkpoint.get('impressao') == impressao:
+        try:
+            temporaria = planilha.worksheet(nome_temporaria)
+            inicio = checkpoint['linhas_gravadas']
+        except gspread.WorksheetNotFound:
+            temporaria = None
+    retomada = temporaria is not None
+    if temporaria is None:
+        try:
+            # Sobra de outra carga (com outros dados): descarta.
+            _executar(balde, lambda: planilha.del_worksheet(planilha.worksheet(nome_temporaria)))
+        except gspread.WorksheetNotFound:
+            pass
+        temporaria = _executar(balde, lambda: planilha.add_worksheet(title=nome_temporaria, rows=len(linhas) + 1, cols=max(len(cabecalho), 1)))
+        _executar(balde, lambda: planilha.values_update(f"{intervalo_temporaria}!A1", params={'valueInputOption': 'USER_ENTERED'}, body={'values': [cabecalho]}))
+        checkpoint = {'aba': nome_aba, 'impressao': impressao, 'total_linhas': len(linhas), 'linhas_gravadas': 0}
+        _salvar_checkpoint(caminho, checkpoint)
+
+    comeco = time.perf_counter()
+    gravadas_nesta_execucao = 0
+    for posicao in range(inicio, len(linhas), tamanho_bloco):
+        bloco = linhas[posicao:posicao + tamanho_bloco]
+        # Intervalo explícito: regravar um bloco após uma falha não duplica linhas.
+        _executar(balde, lambda: planilha.values_update(f"{intervalo_temporaria}!A{posicao + 2}", params={'valueInputOption': 'USER_ENTERED'}, body={'values': bloco}))
+        checkpoint['linhas_gravadas'] = posicao + len(bloco)
+        _salvar_checkpoint(caminho, checkpoint)
+        gravadas_nesta_execucao += len(bloco)
+        if progresso is not None:
+            decorrido = time.perf_counter() - comeco
+            progresso(ProgressoEscrita(
+                aba=nome_aba,
+                linhas_gravadas=checkpoint['linhas_gravadas'],
+                total_linhas=len(linhas),
+                blocos_gravados=-(-checkpoint['linhas_gravadas'] // tamanho_bloco),
+                total_blocos=total_blocos,
+                linhas_por_s=gravadas_nesta_execucao / decorrido if decorrido > 0 else 0.0,
+                retomada=retomada,
+            ))
+
+    _trocar_abas(planilha, nome_aba, temporaria, balde)
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+    return len(linhas)
+
+def acrescentar_linhas(planilha, nome_aba, df, balde=None):
+    """
+    Acrescenta as linhas de `df` ao fim de `nome_aba` (append_rows), em blocos
+    com os limites de `gravar_aba`. As colunas de `df` precisam estar na ordem
+    do cabeçalho da aba. Retorna quantas linhas foram acrescentadas.
+    """
+    balde = balde or obter_balde_escrita()
+    cabecalho, linhas = _para_valores(df)
+    aba = planilha.worksheet(nome_aba)
+    tamanho_bloco = _linhas_por_bloco(cabecalho, linhas)
+    for posicao in range(0, len(linhas), tamanho_bloco):
+        bloco = linhas[posicao:posicao + tamanho_bloco]
+        _executar(balde, lambda: aba.append_rows(bloco, value_input_option='USER_ENTERED'))
+    return len(linhas)
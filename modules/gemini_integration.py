@@ -1,11 +1,14 @@
-import google.generativeai as genai
 import streamlit as st
 import pandas as pd
+import time
 from datetime import datetime
+from . import llm_client
+from .oraculo_handler import MetricasResposta, cancelamento_solicitado, impressao_digital_dados
 
 class OracleLaBrasa:
     def __init__(self):
-        self.model = None
+        self.cliente = None
+        self._analises = {}
         self._setup_canais()
         self._initialize_ai()
     
@@ -20,31 +23,32 @@ class OracleLaBrasa:
         }
     
     def _initialize_ai(self):
-        """Inicialização robusta da IA"""
+        """Inicialização robusta da IA (cliente compartilhado, com timeout e limite de concorrência)"""
         try:
-            if "GEMINI_API_KEY" not in st.secrets:
-                st.error("Chave API não configurada")
-                return
-            
-            genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-            
+            self.cliente = llm_client.obter_cliente()
+        except llm_client.ErroLLM:
+            st.error("Chave API não configurada")
         except Exception as e:
             st.error(f"Erro técnico ao iniciar (Cod: OR{hash(str(e))%1000:03d})")
 
     def _analisar_dados(self, df):
-        """Prepara análise segura dos dados"""
+        """Prepara análise segura dos dados (em cache pela impressão digital; não altera o DataFrame)"""
         try:
-            # Processamento seguro
-            df['Canal'] = df['Canal de venda'].replace(self.canais)
+            chave = impressao_digital_dados(df)
+            if chave in self._analises:
+                return self._analises[chave]
+
+            canais = df['Canal de venda'].astype(object).replace(self.canais)
             
-            return {
+            dados = {
                 "periodo": f"{df['Data'].min().strftime('%d/%m/%Y')} a {df['Data'].max().strftime('%d/%m/%Y')}",
                 "faturamento_total": f"R$ {df['Total'].sum():,.2f}",
                 "ticket_medio": f"R$ {df['Total'].mean():,.2f}",
-                "top_canais": df['Canal'].value_counts().head(3).to_dict(),
-                "melhor_dia": df.groupby('Dia da Semana')['Total'].sum().idxmax()
+                "top_canais": canais.value_counts().head(3).to_dict(),
+                "melhor_dia": df.groupby('Dia da Semana', observed=True)['Total'].sum().idxmax()
             }
+            self._analises = {chave: dados}
+            return dados
         except Exception as e:
             st.error(f"Erro nos dados (Cod: DT{hash(str(e))%1000:03d})")
             return None
@@ -60,10 +64,19 @@ class OracleLaBrasa:
                 return "📊 Análise temporariamente indisponível"
             
             # Modo fallback se a API falhar
-            if not self.model:
+            if not self.cliente:
                 return self._resposta_fallback(dados, pergunta)
             
-            prompt = f"""
+            prompt = self._montar_prompt(dados, pergunta)
+            
+            return self.cliente.gerar(prompt)
+            
+        except Exception:
+            # Inclui ErroLLM: tempo esgotado, fila cheia ou falha da API
+            return self._resposta_fallback(dados, pergunta)
+
+    def _montar_prompt(self, dados, pergunta):
+        return f"""
             CONTEXTO RESTAURANTE (NUNCA MOSTRE AO CLIENTE):
             {dados}
 
@@ -81,12 +94,48 @@ class OracleLaBrasa:
                - Estruturas de dados
                - Erros técnicos
             """
-            
-            response = self.model.generate_content(prompt)
-            return response.text
-            
+
+    def responder_stream(self, df, pergunta, cancelar=None, metricas=None):
+        """Como `responder`, mas gera o texto em pedaços à medida que o modelo responde"""
+        metricas = metricas if metricas is not None else MetricasResposta()
+        metricas.inicio = time.perf_counter()
+        dados = None
+        try:
+            if not isinstance(df, pd.DataFrame) or df.empty:
+                yield "🔍 Dados não disponíveis para análise"
+                return
+
+            dados = self._analisar_dados(df)
+            if not dados:
+                yield "📊 Análise temporariamente indisponível"
+                return
+
+            if not self.cliente:
+                yield self._resposta_fallback(dados, pergunta)
+                return
+
+            pedacos = self.cliente.gerar_stream(self._montar_prompt(dados, pergunta))
+            for texto in pedacos:
+                if cancelamento_solicitado(cancelar):
+                    metricas.cancelada = True
+                    pedacos.close()
+                    break
+                if not texto:
+                    continue
+                if metricas.primeiro_pedaco_s is None:
+                    metricas.primeiro_pedaco_s = time.perf_counter() - metricas.inicio
+                metricas.pedacos += 1
+                metricas.caracteres += len(texto)
+                yield texto
+        except GeneratorExit:
+            metricas.cancelada = True
+            raise
         except Exception:
-            return self._resposta_fallback(dados, pergunta)
+            # Só recorre ao fallback se nada foi entregue ainda
+            if metricas.pedacos == 0:
+                yield self._resposta_fallback(dados, pergunta)
+        finally:
+            metricas.total_s = time.perf_counter() - metricas.inicio
 
     def _resposta_fallback(self, dados, pergunta):
         """Respostas pré-definidas para falhas"""
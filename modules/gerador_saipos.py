@@ -0,0 +1,137 @@
+# modules/gerador_saipos.py
+import numpy as np
+import pandas as pd
+
+# --- RELATÓRIOS SINTÉTICOS NO FORMATO DA SAIPOS ---
+# Gera relatórios com as colunas do export da Saipos (como lidos pelo robô, com
+# 'Data da venda' em texto) para medir desempenho sem dados reais. A mesma
+# semente sempre produz o mesmo relatório.
+
+COLUNAS = [
+    'Pedido', 'Data da venda', 'Canal de venda', 'Esta cancelado', 'Total', 'Total taxa de serviço',
+    'Entrega', 'Itens', 'Acréscimo', 'Desconto', 'Bairro', 'CEP', 'Consumidor', 'Motivo de cancelamento',
+]
+
+# Canal: (peso, é delivery, valor médio do pedido, chance de cancelamento)
+CANAIS = {
+    'IFOOD': (0.42, True, 62.0, 0.06),
+    'SITE DELIVERY (SAIPOS)': (0.14, True, 58.0, 0.04),
+    'BRENDI': (0.09, True, 55.0, 0.05),
+    'BALCÃO': (0.18, False, 41.0, 0.01),
+    'SALÃO': (0.12, False, 74.0, 0.01),
+    'TELEFONE': (0.05, False, 52.0, 0.03),
+}
+
+# Bairros de Aracaju com o prefixo de CEP de cada um; o peso segue uma lei de Zipf.
+BAIRROS = {
+    'Atalaia': '49037', 'Jardins': '49025', 'Grageru': '49027', 'Farolândia': '49032',
+    'Coroa do Meio': '49035', 'Inácio Barbosa': '49040', 'Luzia': '49048', 'Treze de Julho': '49020',
+    'São José': '49015', 'Salgado Filho': '49020', 'Suíssa': '49050', 'Ponto Novo': '49097',
+    'Centro': '49010', 'Siqueira Campos': '49075', 'Aruana': '49039', 'São Conrado': '49042',
+    'Getúlio Vargas': '49055', 'Pereira Lobo': '49052', 'América': '49080', 'Industrial': '49065',
+}
+CEPS_POR_BAIRRO = 12
+
+MOTIVOS_CANCELAMENTO = {
+    'Cliente desistiu': 0.34, 'Endereço não encontrado': 0.14, 'Demora na entrega': 0.18,
+    'Pedido duplicado': 0.12, 'Item em falta': 0.10, 'Pagamento recusado': 0.07, '': 0.05,
+}
+
+# Pedidos por hora do dia: almoço fraco e pico à noite (hamburgueria).
+PESO_HORAS = np.array([3, 1, 0.5, 0, 0, 0, 0, 0, 0, 0, 0.5, 2, 4, 3.5, 1.5, 1, 1.5, 3, 7, 10, 11, 9, 6, 4], dtype=float)
+# Segunda a domingo.
+PESO_DIAS_SEMANA = np.array([0.8, 0.85, 0.9, 1.0, 1.3, 1.45, 1.35])
+
+NOMES = ['Ana', 'Bruno', 'Carla', 'Davi', 'Eduarda', 'Felipe', 'Gabriela', 'Heitor', 'Isabela', 'João', 'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Tiago', 'Vitória', 'Wesley']
+SOBRENOMES = ['Santos', 'Oliveira', 'Souza', 'Lima', 'Costa', 'Almeida', 'Barreto', 'Menezes', 'Rocha', 'Teles', 'Prado', 'Fontes', 'Andrade', 'Carvalho', 'Dantas']
+
+def _pesos(pesos):
+    pesos = np.asarray(pesos, dtype=float)
+    return pesos / pesos.sum()
+
+def _clientes(rng, quantidade):
+    """Nomes únicos 'Nome Sobrenome N' para a base de clientes."""
+    nomes = rng.choice(NOMES, quantidade)
+    sobrenomes = rng.choice(SOBRENOMES, quantidade)
+    return np.array([f"{n} {s} {i}" for i, (n, s) in enumerate(zip(nomes, sobrenomes), start=1)])
+
+def _ceps(rng):
+    """CEPs fixos por bairro: o prefixo do bairro e um sufixo sorteado."""
+    return {bairro: np.array([f"{prefixo}{rng.integers(0, 1000):03d}" for _ in range(CEPS_POR_BAIRRO)]) for bairro, prefixo in BAIRROS.items()}
+
+def _formatar_instantes(instantes):
+    """'dd/mm/aaaa hh:mm' como no export; cada minuto distinto é formatado uma vez só."""
+    unicos, posicoes = np.unique(instantes, return_inverse=True)
+    return pd.DatetimeIndex(unicos).strftime('%d/%m/%Y %H:%M').values[posicoes]
+
+def gerar_relatorio(linhas, semente=0, data_inicial='2025-01-01', dias=None, pedido_inicial=100_000):
+    """
+    Relatório sintético com `linhas` pedidos (válidos e cancelados), em ordem de
+    horário. Sem `dias`, o período cresce com o tamanho (~300 pedidos por dia,
+    entre 7 e 730 dias).
+    """
+    rng = np.random.default_rng(semente)
+    dias = dias or int(min(max(linhas // 300, 7), 730))
+
+    # Dia (ponderado pelo dia da semana), hora (curva do dia) e minuto.
+    calendario = pd.date_range(data_inicial, periods=dias, freq='D')
+    dia = rng.choice(dias, linhas, p=_pesos(PESO_DIAS_SEMANA[calendario.weekday]))
+    hora = rng.choice(24, linhas, p=_pesos(PESO_HORAS))
+    minuto = rng.integers(0, 60, linhas)
+    instantes = np.sort(calendario.values[dia] + (hora * 60 + minuto).astype('timedelta64[m]'))
+
+    nomes_canais = np.array(list(CANAIS))
+    peso_canal, eh_delivery, valor_medio, chance_cancelamento = (np.array(v) for v in zip(*CANAIS.values()))
+    canal = rng.choice(len(nomes_canais), linhas, p=_pesos(peso_canal))
+    delivery = eh_delivery[canal].astype(bool)
+
+    # Valor do pedido: lognormal em torno da média do canal; itens crescem com o valor.
+    total = np.round(rng.lognormal(np.log(valor_medio[canal]) - 0.18, 0.6), 2)
+    itens = np.maximum(1, np.round(total / 28 + rng.normal(0, 0.6, linhas))).astype(int)
+    entrega = np.where(delivery, rng.choice([0.0, 5.0, 6.0, 7.0, 8.0, 10.0], linhas, p=[0.15, 0.25, 0.2, 0.2, 0.12, 0.08]), 0.0)
+    taxa_servico = np.where(nomes_canais[canal] == 'SALÃO', np.round(total * 0.1, 2), 0.0)
+    desconto = np.where(rng.random(linhas) < 0.1, np.round(total * rng.choice([0.05, 0.1, 0.15], linhas), 2), 0.0)
+    acrescimo = np.where(rng.random(linhas) < 0.02, 2.0, 0.0)
+
+    # Bairro e CEP só nos pedidos de delivery.
+    nomes_bairros = np.array(list(BAIRROS))
+    bairro = rng.choice(len(nomes_bairros), linhas, p=_pesos(1 / np.arange(1, len(nomes_bairros) + 1)))
+    ceps = _ceps(rng)
+    cep = np.array([ceps[b] for b in nomes_bairros])[bairro, rng.integers(0, CEPS_POR_BAIRRO, linhas)]
+
+    # Clientes recorrentes: poucos clientes fazem muitos pedidos (peso 1/√posição).
+    base_clientes = _clientes(rng, max(linhas // 8, 50))
+    cliente = rng.choice(len(base_clientes), linhas, p=_pesos(1 / np.sqrt(np.arange(1, len(base_clientes) + 1))))
+
+    cancelado = rng.random(linhas) < chance_cancelamento[canal]
+    motivos = np.array(list(MOTIVOS_CANCELAMENTO))
+    motivo = np.where(cancelado, motivos[rng.choice(len(motivos), linhas, p=_pesos(list(MOTIVOS_CANCELAMENTO.values())))], '')
+
+    return pd.DataFrame({
+        'Pedido': (pedido_inicial + np.arange(linhas)).astype(str),
+        'Data da venda': _formatar_instantes(instantes),
+        'Canal de venda': nomes_canais[canal],
+        'Esta cancelado': np.where(cancelado, 'S', 'N'),
+        'Total': total,
+        'Total taxa de serviço': taxa_servico,
+        'Entrega': entrega,
+        'Itens': itens,
+        'Acréscimo': acrescimo,
+        'Desconto': desconto,
+        'Bairro': np.where(delivery, nomes_bairros[bairro], ''),
+        'CEP': np.where(delivery, cep, ''),
+        'Consumidor': np.where(delivery | (rng.random(linhas) < 0.3), base_clientes[cliente], ''),
+        'Motivo de cancelamento': motivo,
+    }, columns=COLUNAS)
+
+def gerar_cache_cep(df_relatorio, cobertura=0.9, semente=0):
+    """Cache de CEPs (cep, lat, lon) em volta de Aracaju, com `cobertura` dos CEPs do relatório."""
+    rng = np.random.default_rng(semente)
+    ceps = pd.Series(df_relatorio['CEP'].unique())
+    ceps = ceps[ceps != ''].sort_values(ignore_index=True)
+    ceps = ceps[rng.random(len(ceps)) < cobertura].reset_index(drop=True)
+    return pd.DataFrame({
+        'cep': ceps,
+        'lat': np.round(-10.95 + rng.normal(0, 0.03, len(ceps)), 6),
+        'lon': np.round(-37.07 + rng.normal(0, 0.03, len(ceps)), 6),
+    })
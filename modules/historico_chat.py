@@ -0,0 +1,85 @@
+# modules/historico_chat.py
+import math
+import re
+from dataclasses import dataclass, field
+
+ORCAMENTO_TOKENS_HISTORICO = 1200
+TURNOS_LITERAIS = 4
+MAX_CARACTERES_RESUMO_POR_TURNO = 160
+
+# Bloco de contexto que `_montar_prompt` coloca em volta da pergunta; nunca deve ir para o histórico.
+_BLOCO_CONTEXTO = re.compile(r'Use os seguintes dados.*?Pergunta:\s*"(?P<pergunta>.*)"', re.DOTALL)
+
+def estimar_tokens(texto):
+    """Estimativa simples (~4 caracteres por token), suficiente para controlar o tamanho do prompt."""
+    return math.ceil(len(texto) / 4) if texto else 0
+
+@dataclass
+class HistoricoCompactado:
+    """Histórico pronto para a API: resumo das trocas antigas + últimos turnos literais."""
+    mensagens: list = field(default_factory=list)
+    resumo: str = ''
+    turnos_resumidos: int = 0
+    turnos_literais: int = 0
+
+    @property
+    def tokens(self):
+        return estimar_tokens(self.resumo) + sum(estimar_tokens(m['content']) for m in self.mensagens)
+
+def sem_contexto(texto):
+    """Se uma mensagem carregar o prompt completo (contexto + pergunta), fica só a pergunta."""
+    encontrado = _BLOCO_CONTEXTO.search(texto or '')
+    return encontrado.group('pergunta').strip() if encontrado else (texto or '')
+
+def _agrupar_turnos(historico_chat):
+    """Agrupa as mensagens em turnos (pergunta do usuário + respostas seguintes)."""
+    turnos = []
+    for mensagem in historico_chat:
+        conteudo = sem_contexto(mensagem['content'])
+        if mensagem['role'] == 'user' or not turnos:
+            turnos.append([])
+        turnos[-1].append({'role': mensagem['role'], 'content': conteudo})
+    return turnos
+
+def _primeira_frase(texto):
+    texto = ' '.join(texto.split())
+    frase = re.split(r'(?<=[.!?])\s', texto, maxsplit=1)[0]
+    if len(frase) > MAX_CARACTERES_RESUMO_POR_TURNO:
+        frase = frase[:MAX_CARACTERES_RESUMO_POR_TURNO - 1].rstrip() + '…'
+    return frase
+
+def _linha_resumo(turno):
+    pergunta = next((m['content'] for m in turno if m['role'] == 'user'), '')
+    resposta = next((m['content'] for m in turno if m['role'] != 'user'), '')
+    linha = f"- Perguntou: {_primeira_frase(pergunta)}"
+    if resposta:
+        linha += f" | Resposta: {_primeira_frase(resposta)}"
+    return linha
+
+def compactar_historico(historico_chat, orcamento_tokens=ORCAMENTO_TOKENS_HISTORICO, turnos_literais=TURNOS_LITERAIS):
+    """
+    Mantém os últimos `turnos_literais` turnos como estão e dobra os anteriores
+    num resumo extrativo (pergunta + primeira frase da resposta). Se o total
+    passar do orçamento, turnos literais viram resumo e, por fim, as linhas
+    mais antigas do resumo são descartadas.
+    """
+    turnos = _agrupar_turnos(historico_chat or [])
+    antigos, literais = turnos[:-turnos_literais] if turnos_literais else turnos, turnos[-turnos_literais:] if turnos_literais else []
+
+    def tokens_de(grupo):
+        return sum(estimar_tokens(m['content']) for turno in grupo for m in turno)
+
+    while len(literais) > 1 and tokens_de(literais) > orcamento_tokens:
+        antigos.append(literais.pop(0))
+
+    linhas = [_linha_resumo(turno) for turno in antigos]
+    disponivel = orcamento_tokens - tokens_de(literais)
+    while linhas and estimar_tokens('\n'.join(linhas)) > disponivel:
+        linhas.pop(0)
+
+    return HistoricoCompactado(
+        mensagens=[m for turno in literais for m in turno],
+        resumo='\n'.join(linhas),
+        turnos_resumidos=len(antigos),
+        turnos_literais=len(literais),
+    )
@@ -0,0 +1,173 @@
+# modules/importacao_preguicosa.py
+import importlib
+import importlib.abc
+import os
+import sys
+import threading
+import time
+import types
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage, o perfil sai sem a memória residente.
+    resource = None
+
+# --- MÓDULOS CARREGADOS SOB DEMANDA ---
+
+class ModuloPreguicoso(types.ModuleType):
+    """
+    Substituto de um módulo pesado: o import real só acontece no primeiro
+    acesso a um atributo (ex.: `alt.Chart`). O tempo gasto é registrado.
+    """
+
+    def __init__(self, nome):
+        super().__init__(nome)
+        self.__dict__['_nome_real'] = nome
+        self.__dict__['_modulo'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _carregar(self):
+        modulo = self.__dict__['_modulo']
+        if modulo is None:
+            with self.__dict__['_lock']:
+                modulo = self.__dict__['_modulo']
+                if modulo is None:
+                    inicio = time.perf_counter()
+                    modulo = importlib.import_module(self.__dict__['_nome_real'])
+                    _IMPORTS_SOB_DEMANDA[self.__dict__['_nome_real']] = time.perf_counter() - inicio
+                    self.__dict__['_modulo'] = modulo
+        return modulo
+
+    def __getattr__(self, atributo):
+        return getattr(self._carregar(), atributo)
+
+    def __dir__(self):
+        return dir(self._carregar())
+
+    def __repr__(self):
+        estado = 'carregado' if self.__dict__['_modulo'] is not None else 'não carregado'
+        return f"<módulo preguiçoso '{self.__dict__['_nome_real']}' ({estado})>"
+
+_IMPORTS_SOB_DEMANDA = {}
+
+def modulo(nome):
+    """Devolve o módulo se já estiver importado; senão, um `ModuloPreguicoso`."""
+    return sys.modules.get(nome) or ModuloPreguicoso(nome)
+
+# --- PERFIL DE IMPORTAÇÃO POR PÁGINA ---
+
+PERFIL_ATIVO = os.getenv("DASHBRASA_PERFIL_IMPORTACOES", "0") == "1"
+
+class _LoaderCronometrado(importlib.abc.Loader):
+    def __init__(self, loader, cronometro):
+        self._loader = loader
+        self._cronometro = cronometro
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, modulo):
+        self._cronometro.entrar()
+        inicio = time.perf_counter()
+        try:
+            self._loader.exec_module(modulo)
+        finally:
+            self._cronometro.sair(modulo.__name__, time.perf_counter() - inicio)
+            # Devolve o loader original para quem inspeciona __loader__/__spec__ depois.
+            modulo.__loader__ = self._loader
+            if getattr(modulo, '__spec__', None) is not None:
+                modulo.__spec__.loader = self._loader
+
+    def __getattr__(self, atributo):
+        return getattr(self._loader, atributo)
+
+class _CronometroImportacao(importlib.abc.MetaPathFinder):
+    """Mede o tempo acumulado e o tempo próprio (sem submódulos) de cada módulo importado."""
+
+    def __init__(self):
+        self.tempos = {}
+        self._local = threading.local()
+
+    @property
+    def _pilha(self):
+        # Uma pilha por thread: imports simultâneos em outras threads não se misturam.
+        pilha = getattr(self._local, 'pilha', None)
+        if pilha is None:
+            pilha = self._local.pilha = []
+        return pilha
+
+    def find_spec(self, nome, caminho, alvo=None):
+        if getattr(self._local, 'buscando', False):
+            return None
+        self._local.buscando = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(nome, caminho, alvo)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                        spec.loader = _LoaderCronometrado(spec.loader, self)
+                    return spec
+            return None
+        finally:
+            self._local.buscando = False
+
+    def entrar(self):
+        self._pilha.append(0.0)
+
+    def sair(self, nome, duracao):
+        filhos = self._pilha.pop()
+        if self._pilha:
+            self._pilha[-1] += duracao
+        self.tempos[nome] = {'acumulado_s': duracao, 'proprio_s': duracao - filhos}
+
+_PERFIS = {}
+
+def _memoria_residente_mb():
+    """Pico de memória residente do processo em MB, ou None onde não há `resource`."""
+    if resource is None:
+        return None
+    # ru_maxrss vem em KB no Linux e em bytes no macOS.
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+@contextmanager
+def perfil_importacoes(pagina, ativo=None):
+    """
+    Envolve o bloco de imports de uma página e registra, para os módulos
+    importados pela primeira vez ali, o custo de importação e a memória.
+    Ativado pela variável de ambiente DASHBRASA_PERFIL_IMPORTACOES=1.
+    """
+    ativo = PERFIL_ATIVO if ativo is None else ativo
+    if not ativo or pagina in _PERFIS:
+        yield
+        return
+    cronometro = _CronometroImportacao()
+    memoria_antes = _memoria_residente_mb()
+    inicio = time.perf_counter()
+    sys.meta_path.insert(0, cronometro)
+    try:
+        yield
+    finally:
+        sys.meta_path.remove(cronometro)
+        _PERFIS[pagina] = {
+            'total_s': time.perf_counter() - inicio,
+            'memoria_residente_mb': {'antes': memoria_antes, 'depois': _memoria_residente_mb()},
+            'modulos': dict(sorted(cronometro.tempos.items(), key=lambda item: -item[1]['acumulado_s'])),
+        }
+        _imprimir_resumo(pagina)
+
+def _imprimir_resumo(pagina, limite=10):
+    perfil = _PERFIS[pagina]
+    memoria = perfil['memoria_residente_mb']
+    texto_memoria = f", memória {memoria['antes']:.0f} -> {memoria['depois']:.0f} MB" if memoria['antes'] is not None else ''
+    print(f"[perfil de importação] {pagina}: {perfil['total_s']*1000:.0f} ms{texto_memoria}")
+    topo = [(nome, t) for nome, t in perfil['modulos'].items() if '.' not in nome][:limite]
+    for nome, t in topo:
+        print(f"    {nome:<30} {t['acumulado_s']*1000:8.1f} ms")
+
+def relatorio():
+    """Perfis registrados por página e os imports feitos sob demanda."""
+    return {'paginas': dict(_PERFIS), 'sob_demanda_s': dict(_IMPORTS_SOB_DEMANDA)}
@@ -0,0 +1,250 @@
+# modules/llm_client.py
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+from . import telemetria
+from .importacao_preguicosa import modulo
+from .modelo_falso import ModeloFalso
+
+genai = modulo('google.generativeai')
+openai = modulo('openai')
+
+TIMEOUT_PADRAO_S = 30
+MAX_CHAMADAS_SIMULTANEAS = 4
+ESPERA_MAXIMA_FILA_S = 10
+JANELA_LATENCIAS = 500
+
+MODELO_GEMINI_PADRAO = 'gemini-1.5-flash'
+MODELO_OPENAI_PADRAO = 'gpt-4o-mini'
+
+class ErroLLM(Exception):
+    """Falha ao consultar o modelo (configuração, fila cheia, tempo esgotado ou erro da API)."""
+
+    def __init__(self, mensagem, tempo_esgotado=False):
+        super().__init__(mensagem)
+        self.tempo_esgotado = tempo_esgotado
+
+def _segredo(nome, padrao=None):
+    try:
+        return st.secrets.get(nome, os.getenv(nome, padrao))
+    except Exception:
+        # Sem secrets.toml (ex.: execução local fora do Streamlit Cloud).
+        return os.getenv(nome, padrao)
+
+def _eh_tempo_esgotado(erro):
+    nome = type(erro).__name__.lower()
+    return isinstance(erro, TimeoutError) or 'timeout' in nome or 'deadline' in nome
+
+# --- PROVEDORES ---
+# Todos recebem o histórico no formato do chat da página:
+# [{'role': 'user' | 'assistant', 'content': texto}, ...]
+
+def historico_gemini(historico):
+    """Histórico do chat no formato de `start_chat(history=...)` do Gemini."""
+    return [{'role': 'user' if m['role'] == 'user' else 'model', 'parts': [m['content']]} for m in historico or []]
+
+class ProvedorGemini:
+    nome = 'gemini'
+
+    def __init__(self, api_key, modelo=MODELO_GEMINI_PADRAO, instrucao_sistema=None, ferramentas=()):
+        genai.configure(api_key=api_key)
+        # O GenerativeModel mantém o canal gRPC; uma instância por processo reaproveita a conexão.
+        self.modelo_nativo = genai.GenerativeModel(model_name=modelo, system_instruction=instrucao_sistema, tools=list(ferramentas) or None)
+
+    def opcoes_chamada(self, timeout):
+        return {'request_options': {'timeout': timeout}}
+
+    def gerar(self, prompt, historico, timeout):
+        conversa = self.modelo_nativo.start_chat(history=historico_gemini(historico))
+        return conversa.send_message(prompt, **self.opcoes_chamada(timeout)).text
+
+    def gerar_stream(self, prompt, historico, timeout):
+        conversa = self.modelo_nativo.start_chat(history=historico_gemini(historico))
+        resposta = conversa.send_message(prompt, stream=True, **self.opcoes_chamada(timeout))
+        try:
+            for pedaco in resposta:
+                yield getattr(pedaco, 'text', '') or ''
+        finally:
+            fechar = getattr(resposta, 'close', None)
+            if callable(fechar):
+                fechar()
+
+class ProvedorFalso(ProvedorGemini):
+    """Modelo local (sem rede), com a mesma interface de chat do Gemini."""
+    nome = 'falso'
+
+    def __init__(self, modelo_falso=None):
+        self.modelo_nativo = modelo_falso or ModeloFalso(atraso_inicial=0.5, atraso_entre_pedacos=0.05)
+
+    def opcoes_chamada(self, timeout):
+        return {}
+
+class ProvedorOpenAI:
+    nome = 'openai'
+    modelo_nativo = None
+
+    def __init__(self, api_key, modelo=MODELO_OPENAI_PADRAO, instrucao_sistema=None):
+        # O cliente guarda o pool de conexões HTTP; é criado uma vez e reaproveitado.
+        self._cliente = openai.OpenAI(api_key=api_key, max_retries=1)
+        self._modelo = modelo
+        self._instrucao_sistema = instrucao_sistema
+
+    def _mensagens(self, prompt, historico):
+        mensagens = [{'role': 'system', 'content': self._instrucao_sistema}] if self._instrucao_sistema else []
+        mensagens += [{'role': 'user' if m['role'] == 'user' else 'assistant', 'content': m['content']} for m in historico or []]
+        mensagens.append({'role': 'user', 'content': prompt})
+        return mensagens
+
+    def gerar(self, prompt, historico, timeout):
+        resposta = self._cliente.chat.completions.create(model=self._modelo, messages=self._mensagens(prompt, historico), timeout=timeout)
+        return resposta.choices[0].message.content or ''
+
+    def gerar_stream(self, prompt, historico, timeout):
+        resposta = self._cliente.chat.completions.create(model=self._modelo, messages=self._mensagens(prompt, historico), timeout=timeout, stream=True)
+        try:
+            for pedaco in resposta:
+                if pedaco.choices:
+                    yield pedaco.choices[0].delta.content or ''
+        finally:
+            resposta.close()
+
+# --- MÉTRICAS E LIMITE DE CONCORRÊNCIA ---
+
+class _Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.chamadas = 0
+        self.erros = 0
+        self.tempos_esgotados = 0
+        self.rejeitadas = 0
+        self.em_andamento = 0
+        self.latencias = deque(maxlen=JANELA_LATENCIAS)
+
+    def registrar(self, **incrementos):
+        with self._lock:
+            for nome, valor in incrementos.items():
+                setattr(self, nome, getattr(self, nome) + valor)
+
+    def registrar_latencia(self, segundos):
+        with self._lock:
+            self.latencias.append(segundos)
+
+    def resumo(self):
+        with self._lock:
+            latencias = sorted(self.latencias)
+            percentil = lambda p: latencias[min(int(p * len(latencias)), len(latencias) - 1)] if latencias else None
+            return {
+                'chamadas': self.chamadas,
+                'erros': self.erros,
+                'tempos_esgotados': self.tempos_esgotados,
+                'rejeitadas_fila_cheia': self.rejeitadas,
+                'em_andamento': self.em_andamento,
+                'latencia_p50_s': percentil(0.50),
+                'latencia_p95_s': percentil(0.95),
+            }
+
+@st.cache_resource
+def _semaforo_global():
+    """Limite de chamadas simultâneas ao modelo, somando todas as sessões do processo."""
+    return threading.BoundedSemaphore(int(_segredo('LLM_MAX_CHAMADAS', MAX_CHAMADAS_SIMULTANEAS)))
+
+@st.cache_resource
+def _metricas_globais():
+    return {}
+
+# --- CLIENTE ---
+
+class ClienteLLM:
+    """Fachada única para os provedores, com timeout por chamada, limite de concorrência e métricas."""
+
+    def __init__(self, provedor, timeout=TIMEOUT_PADRAO_S):
+        self.provedor = provedor
+        self.timeout = timeout
+        self.metricas = _metricas_globais().setdefault(provedor.nome, _Metricas())
+
+    @property
+    def nome(self):
+        return self.provedor.nome
+
+    @property
+    def modelo_nativo(self):
+        """Modelo do SDK (Gemini ou falso), para fluxos que precisam do chat nativo, como as ferramentas."""
+        return self.provedor.modelo_nativo
+
+    def opcoes_chamada(self, timeout=None):
+        return self.provedor.opcoes_chamada(timeout or self.timeout) if hasattr(self.provedor, 'opcoes_chamada') else {}
+
+    @contextmanager
+    def chamada(self, bytes_prompt=None):
+        """Ocupa uma vaga do semáforo global e mede a chamada; erros viram ErroLLM."""
+        if not _semaforo_global().acquire(timeout=ESPERA_MAXIMA_FILA_S):
+            self.metricas.registrar(rejeitadas=1)
+            raise ErroLLM("Muitas consultas ao modelo em andamento. Tente novamente em instantes.")
+        self.metricas.registrar(chamadas=1, em_andamento=1)
+        inicio = time.perf_counter()
+        erro = False
+        try:
+            yield
+        except ErroLLM:
+            erro = True
+            self.metricas.registrar(erros=1)
+            raise
+        except GeneratorExit:
+            raise
+        except Exception as e:
+            erro = True
+            esgotado = _eh_tempo_esgotado(e)
+            self.metricas.registrar(erros=1, tempos_esgotados=int(esgotado))
+            raise ErroLLM(f"Tempo esgotado ao consultar o modelo ({self.timeout} s)." if esgotado else str(e), tempo_esgotado=esgotado) from e
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.metricas.registrar_latencia(duracao)
+            telemetria.obter_telemetria().registrar(f"llm.{self.nome}", duracao, bytes_prompt, erro)
+            self.metricas.registrar(em_andamento=-1)
+            _semaforo_global().release()
+
+    def gerar(self, prompt, historico=None, timeout=None):
+        with self.chamada(len(prompt.encode('utf-8'))):
+            return self.provedor.gerar(prompt, historico, timeout or self.timeout)
+
+    def gerar_stream(self, prompt, historico=None, timeout=None):
+        """Gera os pedaços de texto; a vaga no semáforo fica ocupada até o fim (ou o fechamento) do gerador."""
+        with self.chamada(len(prompt.encode('utf-8'))):
+            yield from self.provedor.gerar_stream(prompt, historico, timeout or self.timeout)
+
+    def estatisticas(self):
+        return {'provedor': self.nome, 'timeout_s': self.timeout, **self.metricas.resumo()}
+
+@st.cache_resource
+def obter_cliente(instrucao_sistema=None, ferramentas_chave=(), _ferramentas=()):
+    """
+    Cliente compartilhado por todas as sessões. O provedor vem de
+    DASHBRASA_MODELO_FALSO=1 (modelo local) ou do segredo LLM_PROVEDOR
+    ('gemini', padrão, ou 'openai'). Levanta ErroLLM se faltar a chave.
+    As funções em `_ferramentas` não entram na chave do cache; seus nomes,
+    em `ferramentas_chave`, sim (um cliente por conjunto de ferramentas).
+    """
+    if tuple(ferramentas_chave) != tuple(f.__name__ for f in _ferramentas):
+        raise ValueError("ferramentas_chave deve trazer os nomes das _ferramentas, na mesma ordem.")
+    timeout = float(_segredo('LLM_TIMEOUT_S', TIMEOUT_PADRAO_S))
+    if os.getenv("DASHBRASA_MODELO_FALSO") == "1":
+        return ClienteLLM(ProvedorFalso(), timeout)
+    provedor = str(_segredo('LLM_PROVEDOR', 'gemini')).lower()
+    if provedor == 'openai':
+        api_key = _segredo('OPENAI_API_KEY')
+        if not api_key:
+            raise ErroLLM("Chave da API da OpenAI não encontrada.")
+        return ClienteLLM(ProvedorOpenAI(api_key, _segredo('OPENAI_MODELO', MODELO_OPENAI_PADRAO), instrucao_sistema), timeout)
+    api_key = _segredo('GEMINI_API_KEY')
+    if not api_key:
+        raise ErroLLM("Chave da API do Gemini não encontrada.")
+    return ClienteLLM(ProvedorGemini(api_key, _segredo("GEMINI_MODELO", MODELO_GEMINI_PADRAO), instrucao_sistema, _ferramentas), timeout)
+
+def estatisticas():
+    """Métricas acumuladas por provedor (chamadas, erros, tempos esgotados, latências)."""
+    return {nome: metricas.resumo() for nome, metricas in _metricas_globais().items()}
@@ -0,0 +1,105 @@
+# modules/modelo_falso.py
+import time
+
+# --- MODELO LOCAL FALSO (SEM REDE) ---
+# Imita a interface usada do `google.generativeai.GenerativeModel`
+# (generate_content / start_chat / send_message, com e sem stream) para
+# desenvolvimento local e para medir o caminho de streaming sem chave de API.
+
+class ChamadaFerramenta:
+    """Passo de roteiro em que o modelo falso pede a execução de uma ferramenta."""
+
+    def __init__(self, name, args=None):
+        self.name = name
+        self.args = dict(args or {})
+
+class _Parte:
+    def __init__(self, text='', function_call=None):
+        self.text = text
+        self.function_call = function_call
+
+class _Conteudo:
+    def __init__(self, parts):
+        self.parts = parts
+
+class _Candidato:
+    def __init__(self, parts):
+        self.content = _Conteudo(parts)
+
+class _Resposta:
+    def __init__(self, texto, chamadas=()):
+        self.text = texto
+        partes = [_Parte(function_call=c) for c in chamadas] or [_Parte(text=texto)]
+        self.candidates = [_Candidato(partes)]
+
+class _RespostaStream:
+    """Iterável de pedaços com `.text`; os atrasos simulam o tempo de geração do modelo."""
+
+    def __init__(self, texto, tamanho_pedaco, atraso_inicial, atraso_entre_pedacos):
+        self._pedacos = [texto[i:i + tamanho_pedaco] for i in range(0, len(texto), tamanho_pedaco)] or ['']
+        self._atraso_inicial = atraso_inicial
+        self._atraso_entre_pedacos = atraso_entre_pedacos
+        self.entregues = 0
+        self.fechada = False
+
+    def __iter__(self):
+        try:
+            for i, pedaco in enumerate(self._pedacos):
+                time.sleep(self._atraso_inicial if i == 0 else self._atraso_entre_pedacos)
+                self.entregues += 1
+                yield _Resposta(pedaco)
+        finally:
+            self.fechada = True
+
+    @property
+    def text(self):
+        return ''.join(self._pedacos)
+
+class _ChatFalso:
+    def __init__(self, modelo, history=None):
+        self._modelo = modelo
+        self.history = list(history or [])
+
+    def send_message(self, conteudo, stream=False, **kwargs):
+        self.history.append({'role': 'user', 'parts': [conteudo]})
+        resposta = self._modelo.generate_content(conteudo, stream=stream, **kwargs)
+        self.history.append({'role': 'model', 'parts': [resposta.text]})
+        return resposta
+
+class ModeloFalso:
+    """
+    `respostas` pode ser um texto fixo, uma lista (consumida em ordem, repetindo
+    a última) ou uma função prompt -> texto. Itens do roteiro também podem ser
+    `ChamadaFerramenta` (ou listas delas) para simular chamadas de ferramenta.
+    Os atrasos são em segundos.
+    """
+
+    def __init__(self, respostas="Resposta do modelo local.", atraso_inicial=0.0, atraso_entre_pedacos=0.0, tamanho_pedaco=16):
+        self.respostas = respostas
+        self.atraso_inicial = atraso_inicial
+        self.atraso_entre_pedacos = atraso_entre_pedacos
+        self.tamanho_pedaco = tamanho_pedaco
+        self.prompts = []
+
+    def _texto_para(self, prompt):
+        if callable(self.respostas):
+            return self.respostas(prompt)
+        if isinstance(self.respostas, list):
+            indice = min(len(self.prompts) - 1, len(self.respostas) - 1)
+            return self.respostas[indice]
+        return self.respostas
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.prompts.append(prompt)
+        texto = self._texto_para(prompt)
+        if isinstance(texto, ChamadaFerramenta):
+            texto = [texto]
+        if isinstance(texto, list):
+            return _Resposta('', chamadas=texto)
+        if stream:
+            return _RespostaStream(texto, self.tamanho_pedaco, self.atraso_inicial, self.atraso_entre_pedacos)
+        time.sleep(self.atraso_inicial + self.atraso_entre_pedacos * max(len(texto) // self.tamanho_pedaco - 1, 0))
+        return _Resposta(texto)
+
+    def start_chat(self, history=None):
+        return _ChatFalso(self, history)
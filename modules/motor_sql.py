@@ -0,0 +1,306 @@
+# modules/motor_sql.py
+import importlib.util
+import os
+import tempfile
+import time
+
+import pandas as pd
+import streamlit as st
+
+from . import agregacoes, snapshots
+from .importacao_preguicosa import modulo
+
+# DuckDB é opcional: sem ele (ou sem snapshot em disco da versão exibida), as
+# agregações continuam em pandas sobre o DataFrame já filtrado.
+duckdb = modulo('duckdb')
+
+MOTOR_PADRAO = 'auto'  # 'auto' (DuckDB se instalado), 'duckdb' ou 'pandas'
+COLUNAS_AGREGADAS = {
+    'validos': ['Data', 'Hora', 'Pedido', 'Total', 'Canal de venda'],
+    'cancelados': ['Data', 'Hora', 'Pedido', 'Total', 'Canal de venda', 'Motivo de cancelamento'],
+}
+
+def _segredo(nome, padrao=None):
+    try:
+        return st.secrets.get(nome, os.getenv(nome, padrao))
+    except Exception:
+        return os.getenv(nome, padrao)
+
+def duckdb_disponivel():
+    return importlib.util.find_spec('duckdb') is not None
+
+def _identificador(coluna):
+    return '"{}"'.format(str(coluna).replace('"', '""'))
+
+def _literal(texto):
+    return "'{}'".format(str(texto).replace("'", "''"))
+
+# --- CONSULTAS SQL ---
+# Cada agregação de `agregacoes.AGREGACOES` tem aqui a versão SQL com as mesmas
+# colunas de saída. `v` é a tabela já filtrada (ver ConsultaDuckDB._origem).
+
+def _sql_faturamento_diario():
+    return 'SELECT CAST("Data" AS TIMESTAMP) AS "Data", COALESCE(SUM("Total"), 0) AS "Total" FROM v WHERE "Data" IS NOT NULL GROUP BY 1 ORDER BY 1', []
+
+def _sql_resumo_por_hora():
+    return '''
+        SELECT h.Hora AS "Hora",
+               COUNT(v."Pedido") AS "Num_Pedidos",
+               COALESCE(SUM(v."Total"), 0) AS "Faturamento_Total",
+               CASE WHEN COUNT(v."Pedido") > 0 THEN COALESCE(SUM(v."Total"), 0) / COUNT(v."Pedido") ELSE 0 END AS "Ticket_Medio"
+        FROM range(24) h(Hora) LEFT JOIN v ON v."Hora" = h.Hora
+        GROUP BY h.Hora ORDER BY h.Hora''', []
+
+def _sql_resumo_por_canal():
+    return '''
+        SELECT "Canal de venda",
+               COALESCE(SUM("Total"), 0) AS "Faturamento",
+               COUNT("Pedido") AS "Pedidos",
+               CASE WHEN COUNT("Pedido") > 0 THEN COALESCE(SUM("Total"), 0) / COUNT("Pedido") ELSE 0 END AS "Ticket Medio"
+        FROM v WHERE "Canal de venda" IS NOT NULL
+        GROUP BY 1 ORDER BY 1''', []
+
+def _sql_limite_outliers():
+    return 'SELECT q3 + 1.5 * (q3 - q1) FROM (SELECT quantile_cont("Total", 0.25) AS q1, quantile_cont("Total", 0.75) AS q3 FROM v)', []
+
+def _sql_outliers_por_dia(limite):
+    return 'SELECT CAST("Data" AS TIMESTAMP) AS "Data", SUM("Total") AS "Total" FROM v WHERE "Total" > ? AND "Data" IS NOT NULL GROUP BY 1 ORDER BY 1', [limite]
+
+def _sql_maiores_outliers(limite, quantidade=5):
+    return 'SELECT "Total", "Data", "Canal de venda" FROM v WHERE "Total" > ? ORDER BY "Total" DESC LIMIT ?', [limite, int(quantidade)]
+
+def _sql_canais_por_dia():
+    return 'SELECT "Canal de venda", "Data", SUM("Total") AS "Total" FROM v WHERE "Canal de venda" IS NOT NULL AND "Data" IS NOT NULL GROUP BY 1, 2 ORDER BY 1, 2', []
+
+def _sql_cancelamentos_por_hora():
+    return '''
+        SELECT h.Hora AS "Hora", COUNT(v."Hora") AS "Contagem"
+        FROM range(24) h(Hora) LEFT JOIN v ON TRY_CAST(v."Hora" AS DOUBLE) = h.Hora
+        GROUP BY h.Hora ORDER BY h.Hora''', []
+
+def _sql_contagem_por(coluna, nome):
+    coluna, nome = _identificador(coluna), _identificador(nome)
+    return f'SELECT {coluna} AS {nome}, COUNT(*) AS "Contagem" FROM v WHERE {coluna} IS NOT NULL GROUP BY 1 ORDER BY 2 DESC, 1', []
+
+SQL_AGREGACOES = {
+    'faturamento_diario': _sql_faturamento_diario,
+    'resumo_por_hora': _sql_resumo_por_hora,
+    'resumo_por_canal': _sql_resumo_por_canal,
+    'limite_outliers': _sql_limite_outliers,
+    'outliers_por_dia': _sql_outliers_por_dia,
+    'maiores_outliers': _sql_maiores_outliers,
+    'canais_por_dia': _sql_canais_por_dia,
+    'cancelamentos_por_hora': _sql_cancelamentos_por_hora,
+    'contagem_por': _sql_contagem_por,
+}
+ESCALARES = {'limite_outliers'}
+
+# --- MOTORES ---
+
+class ConsultaPandas:
+    """Agregações em pandas sobre um DataFrame já filtrado (comportamento original do dashboard)."""
+    nome = 'pandas'
+
+    def __init__(self, df):
+        self.df = df
+
+    def executar(self, agregacao, *args):
+        return agregacoes.AGREGACOES[agregacao](self.df, *args)
+
+@st.cache_resource
+def _conexao():
+    """Banco DuckDB em memória do processo; cada consulta usa um cursor próprio (seguro entre threads)."""
+    return duckdb.connect(database=':memory:')
+
+class ConsultaDuckDB:
+    """
+    Agregações como consultas vetorizadas sobre o Parquet do snapshot. Os filtros
+    de data e canal vão no WHERE da leitura do arquivo, então o DuckDB descarta
+    grupos de linhas pelas estatísticas do Parquet e só lê as colunas usadas.
+    """
+    nome = 'duckdb'
+
+    def __init__(self, arquivo, data_inicial=None, data_final=None, canais=None, conexao=None):
+        self.arquivo = arquivo
+        self.data_inicial = data_inicial
+        self.data_final = data_final
+        self.canais = None if canais is None else [str(c) for c in canais]
+        self._conexao = conexao
+
+    def _origem(self):
+        condicoes, parametros = [], []
+        if self.data_inicial is not None:
+            condicoes.append('"Data" >= ?'); parametros.append(self.data_inicial)
+        if self.data_final is not None:
+            condicoes.append('"Data" <= ?'); parametros.append(self.data_final)
+        if self.canais is not None:
+            if self.canais:
+                condicoes.append('"Canal de venda" IN ({})'.format(', '.join('?' * len(self.canais)))); parametros.extend(self.canais)
+            else:
+                condicoes.append('FALSE')
+        onde = f" WHERE {' AND '.join(condicoes)}" if condicoes else ''
+        return f"WITH v AS (SELECT * FROM read_parquet({_literal(self.arquivo)}){onde}) ", parametros
+
+    def executar(self, agregacao, *args):
+        sql, parametros_sql = SQL_AGREGACOES[agregacao](*args)
+        origem, parametros = self._origem()
+        cursor = (self._conexao or _conexao()).cursor()
+        try:
+            resultado = cursor.execute(origem + sql, parametros + parametros_sql)
+            if agregacao in ESCALARES:
+                valor = resultado.fetchone()[0]
+                return float(valor) if valor is not None else float('nan')
+            return resultado.df()
+        finally:
+            cursor.close()
+
+def consulta(versao_dados, tabela, data_inicial=None, data_final=None, canais=None):
+    """
+    ConsultaDuckDB ligada aos filtros da página, ou None para seguir em pandas:
+    motor desligado (MOTOR_AGREGACOES=pandas), DuckDB não instalado ou snapshot
+    em disco de outra versão dos dados.
+    """
+    motor = str(_segredo('MOTOR_AGREGACOES', MOTOR_PADRAO)).lower()
+    if motor == 'pandas' or not duckdb_disponivel():
+        return None
+    arquivo, manifesto = snapshots.caminho_tabela('vendas', tabela)
+    if arquivo is None or manifesto.get('versao_dados') != versao_dados:
+        return None
+    return ConsultaDuckDB(arquivo, data_inicial, data_final, canais)
+
+# --- CONFERÊNCIA E COMPARAÇÃO DOS MOTORES ---
+
+CASOS_VALIDOS = [
+    ('faturamento_diario', ()), ('resumo_por_hora', ()), ('resumo_por_canal', ()), ('limite_outliers', ()),
+    ('outliers_por_dia', ('limite',)), ('maiores_outliers', ('limite',)), ('canais_por_dia', ()),
+]
+CASOS_CANCELADOS = [
+    ('cancelamentos_por_hora', ()),
+    ('contagem_por', ('Motivo de cancelamento', 'Motivo')),
+    ('contagem_por', ('Canal de venda', 'Canal')),
+]
+
+def _filtrar_pandas(df, data_inicial, data_final, canais):
+    mascara = pd.Series(True, index=df.index)
+    if data_inicial is not None:
+        mascara &= df['Data'] >= data_inicial
+    if data_final is not None:
+        mascara &= df['Data'] <= data_final
+    if canais is not None:
+        mascara &= df['Canal de venda'].isin(canais)
+    return df[mascara]
+
+def _normalizar(resultado, agregacao):
+    if not isinstance(resultado, pd.DataFrame):
+        return resultado
+    resultado = resultado.copy()
+    # Colunas categóricas (dados compactados) saem do pandas como categoria e do DuckDB como texto.
+    for coluna in resultado.select_dtypes('category').columns:
+        resultado[coluna] = resultado[coluna].astype(object)
+    if 'Data' in resultado.columns:
+        resultado['Data'] = pd.to_datetime(resultado['Data']).astype('datetime64[ns]')
+    if agregacao in ('contagem_por', 'maiores_outliers'):
+        # Empates podem sair em ordens diferentes nos dois motores.
+        resultado = resultado.sort_values(list(resultado.columns), ignore_index=True)
+    return resultado.reset_index(drop=True)
+
+def _argumentos(argumentos, limite):
+    return tuple(limite if a == 'limite' else a for a in argumentos)
+
+def _executar_casos(consultas, limite=None):
+    resultados = {}
+    for tabela, casos in (('validos', CASOS_VALIDOS), ('cancelados', CASOS_CANCELADOS)):
+        consulta_tabela = consultas.get(tabela)
+        if consulta_tabela is None:
+            continue
+        for agregacao, argumentos in casos:
+            chave = f"{agregacao}({', '.join(map(str, argumentos))})" if argumentos else agregacao
+            resultados[chave] = (agregacao, consulta_tabela.executar(agregacao, *_argumentos(argumentos, limite)))
+            if agregacao == 'limite_outliers':
+                limite = resultados[chave][1]
+    return resultados
+
+def _gravar_parquets(pasta, df_validos, df_cancelados):
+    arquivos = {}
+    for tabela, df in (('validos', df_validos), ('cancelados', df_cancelados)):
+        if df is None or df.empty:
+            continue
+        colunas = [c for c in COLUNAS_AGREGADAS[tabela] if c in df.columns]
+        arquivos[tabela] = os.path.join(pasta, f"{tabela}.parquet")
+        snapshots._preparar_para_parquet(df[colunas]).to_parquet(arquivos[tabela], index=False)
+    return arquivos
+
+def verificar_equivalencia(df_validos, df_cancelados, data_inicial=None, data_final=None, canais=None):
+    """
+    Roda cada agregação nos dois motores com os mesmos filtros e compara as
+    tabelas. Devolve {agregação: None se iguais, ou a diferença encontrada}.
+    """
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivos = _gravar_parquets(pasta, df_validos, df_cancelados)
+        conexao = duckdb.connect(database=':memory:')
+        filtros = {'validos': (data_inicial, data_final, canais), 'cancelados': (data_inicial, data_final, None)}
+        originais = {'validos': df_validos, 'cancelados': df_cancelados}
+        pandas_ = _executar_casos({t: ConsultaPandas(_filtrar_pandas(originais[t], *filtros[t])) for t in arquivos})
+        sql = _executar_casos({t: ConsultaDuckDB(arquivos[t], *filtros[t], conexao=conexao) for t in arquivos})
+        conexao.close()
+    diferencas = {}
+    for chave, (agregacao, esperado) in pandas_.items():
+        obtido = sql[chave][1]
+        try:
+            if isinstance(esperado, pd.DataFrame):
+                pd.testing.assert_frame_equal(_normalizar(esperado, agregacao), _normalizar(obtido, agregacao), check_dtype=False, check_exact=False, rtol=1e-9)
+            elif not (pd.isna(esperado) and pd.isna(obtido)) and abs(esperado - obtido) > 1e-9 * max(abs(esperado), 1):
+                raise AssertionError(f"{esperado} != {obtido}")
+            diferencas[chave] = None
+        except AssertionError as e:
+            diferencas[chave] = str(e)
+    return diferencas
+
+def _ampliar(df, linhas, semente=0):
+    """Amostra com reposição até `linhas` linhas (só as colunas agregadas), para medir em escala."""
+    colunas = [c for c in COLUNAS_AGREGADAS['validos'] if c in df.columns]
+    return df[colunas].sample(n=linhas, replace=True, random_state=semente).reset_index(drop=True)
+
+def comparar_latencias(df_validos, df_cancelados, tamanhos=(100_000, 1_000_000, 10_000_000), repeticoes=3, data_inicial=None, data_final=None, canais=None):
+    """
+    Mede, para cada tamanho, o tempo de filtrar e rodar todas as agregações do
+    dashboard em pandas e no DuckDB (melhor de `repeticoes`). Devolve uma linha
+    por tamanho com as latências em ms e o ganho do DuckDB.
+    """
+    resultados = []
+    for linhas in tamanhos:
+        validos = _ampliar(df_validos, linhas)
+        cancelados = _ampliar(df_cancelados, max(linhas // 10, 1)) if df_cancelados is not None and not df_cancelados.empty else None
+        if cancelados is not None and 'Motivo de cancelamento' in df_cancelados.columns:
+            cancelados['Motivo de cancelamento'] = df_cancelados['Motivo de cancelamento'].sample(n=len(cancelados), replace=True, random_state=1).values
+        with tempfile.TemporaryDirectory() as pasta:
+            arquivos = _gravar_parquets(pasta, validos, cancelados)
+            conexao = duckdb.connect(database=':memory:')
+            filtros = {'validos': (data_inicial, data_final, canais), 'cancelados': (data_inicial, data_final, None)}
+            originais = {'validos': validos, 'cancelados': cancelados}
+
+            def medir(montar):
+                melhor = float('inf')
+                for _ in range(repeticoes):
+                    inicio = time.perf_counter()
+                    _executar_casos(montar())
+                    melhor = min(melhor, time.perf_counter() - inicio)
+                return melhor * 1000
+
+            ms_pandas = medir(lambda: {t: ConsultaPandas(_filtrar_pandas(originais[t], *filtros[t])) for t in arquivos})
+            ms_duckdb = medir(lambda: {t: ConsultaDuckDB(arquivos[t], *filtros[t], conexao=conexao) for t in arquivos})
+            conexao.close()
+        resultados.append({'linhas': linhas, 'pandas_ms': round(ms_pandas, 1), 'duckdb_ms': round(ms_duckdb, 1), 'ganho': round(ms_pandas / ms_duckdb, 2) if ms_duckdb else None})
+    return resultados
+
+if __name__ == '__main__':
+    # python -m modules.motor_sql: confere e compara os motores com o snapshot atual.
+    if not duckdb_disponivel():
+        raise SystemExit("DuckDB não está instalado (pip install duckdb).")
+    dfs, _ = snapshots.carregar_snapshot('vendas', tabelas=['validos', 'cancelados'])
+    if dfs is None:
+        raise SystemExit("Nenhum snapshot de vendas em disco; abra o dashboard uma vez para gerá-lo.")
+    for chave, diferenca in verificar_equivalencia(dfs['validos'], dfs['cancelados']).items():
+        print(f"{'OK ' if diferenca is None else 'DIF'} {chave}" + (f": {diferenca}" if diferenca else ''))
+    for linha in comparar_latencias(dfs['validos'], dfs['cancelados']):
+        print(f"{linha['linhas']:>12,} linhas | pandas {linha['pandas_ms']:>9.1f} ms | duckdb {linha['duckdb_ms']:>9.1f} ms | {linha['ganho']}x")
@@ -0,0 +1,218 @@
+# modules/oraculo_ferramentas.py
+import json
+
+import pandas as pd
+import streamlit as st
+
+from . import llm_client
+from . import visualization as viz
+from .importacao_preguicosa import modulo
+from .modelo_falso import ModeloFalso
+from .historico_chat import compactar_historico
+from .oraculo_handler import CacheLRU, _como_cliente, impressao_digital_dados
+
+genai = modulo('google.generativeai')
+
+MAX_RODADAS_FERRAMENTAS = 4
+LIMITE_MAXIMO_LINHAS = 50
+
+DIMENSOES = {
+    'dia': 'Data',
+    'semana': 'Semana',
+    'mes': 'Mês',
+    'dia_da_semana': 'Dia da Semana',
+    'canal': 'Canal de venda',
+    'hora': 'Hora',
+    'bairro': 'Bairro',
+}
+DIMENSOES_TEMPORAIS = {'dia', 'semana', 'mes', 'hora', 'dia_da_semana'}
+
+# --- DECLARAÇÕES (O QUE O MODELO PODE CHAMAR) ---
+# Funções só de assinatura: o SDK do Gemini gera o esquema a partir das anotações
+# e da docstring. A execução de verdade acontece em `ExecutorFerramentas`.
+
+def faturamento_por(dimensao: str, limite: int = 31):
+    """Faturamento, número de pedidos e ticket médio agrupados por uma dimensão. dimensao: dia, semana, mes, dia_da_semana, canal, hora ou bairro."""
+
+def top_clientes(limite: int = 10):
+    """Clientes com mais pedidos no período filtrado, com faturamento total de cada um."""
+
+def motivos_cancelamento(limite: int = 10):
+    """Motivos de cancelamento mais frequentes, com quantidade e valor perdido."""
+
+def resumo_geral():
+    """Totais do período filtrado: faturamento, pedidos, ticket médio, período e cancelamentos."""
+
+DECLARACOES = [faturamento_por, top_clientes, motivos_cancelamento, resumo_geral]
+
+# --- EXECUÇÃO (WHITELIST + CACHE) ---
+
+@st.cache_resource
+def _cache_resultados():
+    return CacheLRU(max_itens=256)
+
+def _tabela(df):
+    """Formato compacto para o prompt: nomes das colunas + linhas, valores arredondados."""
+    df = df.round(2)
+    return {'colunas': [str(c) for c in df.columns], 'linhas': df.astype(object).where(df.notna(), None).values.tolist()}
+
+def _limite(valor, padrao):
+    try:
+        return max(1, min(int(valor), LIMITE_MAXIMO_LINHAS))
+    except (TypeError, ValueError):
+        return padrao
+
+class ExecutorFerramentas:
+    """Executa apenas as ferramentas da whitelist sobre os DataFrames filtrados (sem alterá-los)."""
+
+    def __init__(self, df_validos, df_cancelados, versao_dados=None, filtros=None):
+        self.df_validos = df_validos
+        self.df_cancelados = df_cancelados
+        self.chave_dados = (versao_dados or impressao_digital_dados(df_validos, df_cancelados), filtros)
+        self._ferramentas = {
+            'faturamento_por': self._faturamento_por,
+            'top_clientes': self._top_clientes,
+            'motivos_cancelamento': self._motivos_cancelamento,
+            'resumo_geral': self._resumo_geral,
+        }
+
+    def executar(self, nome, args=None):
+        args = dict(args or {})
+        if nome not in self._ferramentas:
+            return {'erro': f"Ferramenta '{nome}' não permitida."}
+        chave = self.chave_dados + (nome, json.dumps(args, sort_keys=True, default=str))
+        cache = _cache_resultados()
+        resultado = cache.obter(chave)
+        if resultado is None:
+            try:
+                resultado = self._ferramentas[nome](**args)
+            except TypeError as e:
+                return {'erro': f"Argumentos inválidos para '{nome}': {e}"}
+            except Exception as e:
+                # O erro volta para o modelo como resultado da ferramenta (e não entra no cache).
+                return {'erro': f"Falha ao executar '{nome}': {e}"}
+            cache.guardar(chave, resultado)
+        return resultado
+
+    def _totais(self):
+        return pd.to_numeric(self.df_validos['Total'], errors='coerce').fillna(0)
+
+    def _faturamento_por(self, dimensao='canal', limite=31):
+        if dimensao not in DIMENSOES:
+            return {'erro': f"Dimensão inválida. Use uma de: {', '.join(DIMENSOES)}."}
+        limite = _limite(limite, 31)
+        if self.df_validos.empty:
+            return _tabela(pd.DataFrame(columns=[dimensao, 'faturamento', 'pedidos', 'ticket_medio']))
+        if dimensao in ('dia', 'semana', 'mes'):
+            datas = pd.to_datetime(self.df_validos['Data'], errors='coerce')
+            chaves = {'dia': datas.dt.strftime('%Y-%m-%d'), 'semana': datas.dt.to_period('W').astype(str), 'mes': datas.dt.strftime('%Y-%m')}[dimensao]
+        else:
+            chaves = self.df_validos[DIMENSOES[dimensao]]
+        agrupado = self._totais().groupby(chaves, observed=True).agg(['sum', 'count'])
+        agrupado.columns = ['faturamento', 'pedidos']
+        agrupado['ticket_medio'] = agrupado['faturamento'] / agrupado['pedidos']
+        if dimensao in DIMENSOES_TEMPORAIS:
+            agrupado = agrupado.sort_index().tail(limite)
+        else:
+            agrupado = agrupado.sort_values('faturamento', ascending=False).head(limite)
+        return _tabela(agrupado.rename_axis(dimensao).reset_index())
+
+    def _top_clientes(self, limite=10):
+        limite = _limite(limite, 10)
+        if 'Consumidor' not in self.df_validos.columns:
+            return {'erro': 'Sem informação de clientes.'}
+        agrupado = self._totais().groupby(self.df_validos['Consumidor'], observed=True).agg(['count', 'sum'])
+        agrupado.columns = ['pedidos', 'faturamento']
+        return _tabela(agrupado.nlargest(limite, 'pedidos').rename_axis('cliente').reset_index())
+
+    def _motivos_cancelamento(self, limite=10):
+        limite = _limite(limite, 10)
+        df = self.df_cancelados
+        if df.empty or 'Motivo de cancelamento' not in df.columns:
+            return _tabela(pd.DataFrame(columns=['motivo', 'pedidos', 'valor']))
+        valores = pd.to_numeric(df['Total'], errors='coerce').fillna(0)
+        agrupado = valores.groupby(df['Motivo de cancelamento'].astype(object).fillna('Não informado')).agg(['count', 'sum'])
+        agrupado.columns = ['pedidos', 'valor']
+        return _tabela(agrupado.nlargest(limite, 'pedidos').rename_axis('motivo').reset_index())
+
+    def _resumo_geral(self):
+        totais = self._totais()
+        pedidos = len(self.df_validos)
+        datas = pd.to_datetime(self.df_validos['Data'], errors='coerce') if pedidos else pd.Series(dtype='datetime64[ns]')
+        return {
+            'periodo': f"{datas.min():%d/%m/%Y} a {datas.max():%d/%m/%Y}" if pedidos else None,
+            'faturamento': viz.formatar_moeda(totais.sum()),
+            'pedidos': pedidos,
+            'ticket_medio': viz.formatar_moeda(totais.sum() / pedidos if pedidos else 0),
+            'cancelados': len(self.df_cancelados),
+        }
+
+# --- MODELO E LAÇO DE CHAMADAS ---
+
+INSTRUCAO_SISTEMA = (
+    "Você é o Oráculo, um analista de dados da hamburgueria La Brasa Burger de Aracaju. "
+    "Para responder, consulte os dados chamando as ferramentas disponíveis; não há tabelas no prompt. "
+    "Responda de forma clara, profissional e direta, com valores no formato R$ 1.234,56. "
+    "Nunca invente dados: se nenhuma ferramenta cobre a pergunta, diga que não tem acesso a essa informação."
+)
+
+def configurar_ia_com_ferramentas():
+    """Cliente de IA com as ferramentas declaradas (ou o modelo falso, se configurado)."""
+    try:
+        return llm_client.obter_cliente(INSTRUCAO_SISTEMA, ferramentas_chave=tuple(f.__name__ for f in DECLARACOES), _ferramentas=tuple(DECLARACOES))
+    except Exception as e:
+        st.error(f"Ocorreu um erro ao configurar a IA: {e}")
+        return None
+
+def _extrair_chamadas(resposta):
+    try:
+        partes = resposta.candidates[0].content.parts
+    except (AttributeError, IndexError):
+        return []
+    chamadas = []
+    for parte in partes:
+        chamada = getattr(parte, 'function_call', None)
+        if chamada and getattr(chamada, 'name', ''):
+            chamadas.append((chamada.name, dict(chamada.args or {})))
+    return chamadas
+
+def _parte_resultado(modelo_nativo, nome, resultado):
+    if isinstance(modelo_nativo, ModeloFalso):
+        return {'function_response': {'name': nome, 'response': {'resultado': resultado}}}
+    return genai.protos.Part(function_response=genai.protos.FunctionResponse(name=nome, response={'resultado': resultado}))
+
+def responder_com_ferramentas(modelo, pergunta, historico_chat, executor, max_rodadas=MAX_RODADAS_FERRAMENTAS):
+    """
+    Envia só a pergunta; enquanto o modelo pedir ferramentas, executa-as localmente
+    e devolve os resultados. Retorna (resposta, lista de chamadas feitas).
+    """
+    if modelo is None:
+        return "Desculpe, a IA não está configurada.", []
+    cliente = _como_cliente(modelo)
+    if cliente.modelo_nativo is None:
+        return f"Consultas com ferramentas não estão disponíveis com o provedor '{cliente.nome}'.", []
+    chamadas_feitas = []
+
+    def enviar(conteudo):
+        with cliente.chamada():
+            return conversa.send_message(conteudo, **cliente.opcoes_chamada())
+
+    try:
+        compactado = compactar_historico(historico_chat)
+        if compactado.resumo:
+            pergunta = f"Resumo da conversa até aqui:\n{compactado.resumo}\n\nPergunta: {pergunta}"
+        conversa = cliente.modelo_nativo.start_chat(history=llm_client.historico_gemini(compactado.mensagens))
+        resposta = enviar(pergunta)
+        for _ in range(max_rodadas):
+            chamadas = _extrair_chamadas(resposta)
+            if not chamadas:
+                return resposta.text, chamadas_feitas
+            partes = []
+            for nome, args in chamadas:
+                chamadas_feitas.append((nome, args))
+                partes.append(_parte_resultado(cliente.modelo_nativo, nome, executor.executar(nome, args)))
+            resposta = enviar(partes)
+        return "Não consegui concluir a análise com as consultas disponíveis. Tente reformular a pergunta.", chamadas_feitas
+    except Exception as e:
+        print(f"Erro ao obter resposta da IA: {e}")
+        return f"Ocorreu um erro ao comunicar com a API: {str(e)}", chamadas_feitas
@@ -1,88 +1,175 @@
 # modules/oraculo_handler.py
 import streamlit as st
 import pandas as pd
-import google.generativeai as genai
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from . import visualization as viz
+from . import data_handler
+from .cache_respostas import obter_cache_respostas
+from .historico_chat import compactar_historico, estimar_tokens
+from . import llm_client
+from .modelo_falso import ModeloFalso
+
+INSTRUCAO_SISTEMA = (
+    "Você é o Oráculo, um analista de dados especialista na hamburgueria La Brasa Burger de Aracaju. "
+    "Sua missão é responder às perguntas de forma clara, amigável e baseada nos dados fornecidos no contexto. "
+    "Use os dados do contexto fornecido para fazer comparações, cálculos e gerar insights. "
+    "Seja sempre profissional, direto ao ponto e use emojis de forma sutil. "
+    "Nunca invente dados. Se a informação não estiver no contexto, diga que você não tem acesso àquela informação específica."
+)
 
-@st.cache_resource
 def configurar_ia():
-    """Configura a API do Gemini com a chave dos segredos."""
+    """Cliente de IA compartilhado (provedor definido nos segredos; modelo local com DASHBRASA_MODELO_FALSO=1)."""
     try:
-        api_key = st.secrets.get("GEMINI_API_KEY")
-        if not api_key:
-            st.error("Chave da API do Gemini não encontrada.")
-            return None
-        genai.configure(api_key=api_key)
-        
-        system_instruction = (
-            "Você é o Oráculo, um analista de dados especialista na hamburgueria La Brasa Burger de Aracaju. "
-            "Sua missão é responder às perguntas de forma clara, amigável e baseada nos dados fornecidos no contexto. "
-            "Use os dados das tabelas markdown fornecidas para fazer comparações, cálculos e gerar insights. "
-            "Seja sempre profissional, direto ao ponto e use emojis de forma sutil. "
-            "Nunca invente dados. Se a informação não estiver no contexto, diga que você não tem acesso àquela informação específica."
-        )
-        
-        model = genai.GenerativeModel(
-            model_name='gemini-1.5-flash',
-            system_instruction=system_instruction
-        )
-        return model
+        return llm_client.obter_cliente(INSTRUCAO_SISTEMA)
     except Exception as e:
         st.error(f"Ocorreu um erro ao configurar a IA: {e}")
         return None
 
-def gerar_contexto_dados(df_validos, df_cancelados):
-    """Gera um resumo detalhado em tabelas markdown para usar como contexto para a IA."""
+def _como_cliente(modelo):
+    """Aceita um ClienteLLM ou um ModeloFalso avulso (útil para exercitar o fluxo sem rede)."""
+    if isinstance(modelo, ModeloFalso):
+        return llm_client.ClienteLLM(llm_client.ProvedorFalso(modelo))
+    return modelo
+
+# --- CONTEXTO DE DADOS (COM CACHE) ---
+
+MAX_CONTEXTOS_EM_CACHE = 64
+
+@dataclass(frozen=True)
+class ContextoDados:
+    texto: str
+    tokens: int
+    chave: tuple
+    em_cache: bool = False
+    tokens_prompt: dict = None
+    # Versão do dataset inteiro, quando o chamador a informou (None se a chave usa a impressão digital do recorte).
+    versao_dados: str = None
+
+def impressao_digital_dados(*dfs):
+    """Impressão digital do conteúdo, usada quando o chamador não informa a versão dos dados."""
+    return data_handler.calcular_versao_dados(*dfs)
+
+class CacheLRU:
+    """LRU simples, limitado em número de itens, com contadores de acerto e falha."""
+
+    def __init__(self, max_itens=MAX_CONTEXTOS_EM_CACHE):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave):
+        with self._lock:
+            texto = self._itens.get(chave)
+            if texto is None:
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return texto
+
+    def guardar(self, chave, texto):
+        with self._lock:
+            self._itens[chave] = texto
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+@st.cache_resource
+def _cache_contextos():
+    return CacheLRU()
+
+def _montar_contexto(df_validos, df_cancelados):
+    """Resumo compacto (uma linha por canal, sem tabelas markdown). Não altera os DataFrames recebidos."""
     if df_validos.empty:
         return "Não há dados de vendas para analisar."
 
-    # Resumo Geral
-    faturamento_total = df_validos['Total'].sum()
+    totais = pd.to_numeric(df_validos['Total'], errors='coerce').fillna(0)
+    faturamento_total = totais.sum()
     pedidos_totais = len(df_validos)
     ticket_medio = faturamento_total / pedidos_totais if pedidos_totais > 0 else 0
-    
-    resumo_geral_md = f"""
-- Faturamento Total (Geral): {viz.formatar_moeda(faturamento_total)}
-- Número Total de Pedidos (Geral): {pedidos_totais}
-- Ticket Médio (Geral): {viz.formatar_moeda(ticket_medio)}
-"""
-    # Análise por Canal
-    df_canal = df_validos.groupby('Canal de venda').agg(Faturamento=('Total', 'sum'), Pedidos=('Pedido', 'count')).reset_index()
-    df_canal['Ticket_Medio'] = df_canal.apply(lambda r: r['Faturamento']/r['Pedidos'] if r['Pedidos']>0 else 0, axis=1)
-    df_canal = df_canal.sort_values(by="Faturamento", ascending=False)
-    vendas_canal_md = df_canal.to_markdown(index=False)
-
-    # Análise de Cancelamentos
+
+    linhas = ["Dados de vendas da La Brasa Burger (período filtrado no dashboard)."]
+    if 'Data' in df_validos.columns and df_validos['Data'].notna().any():
+        datas = pd.to_datetime(df_validos['Data'], errors='coerce')
+        linhas.append(f"Período: {datas.min():%d/%m/%Y} a {datas.max():%d/%m/%Y}")
+    linhas.append(f"Geral: faturamento {viz.formatar_moeda(faturamento_total)}; pedidos {pedidos_totais}; ticket médio {viz.formatar_moeda(ticket_medio)}")
+
+    # Vendas por canal: faturamento | pedidos | ticket médio
+    por_canal = totais.groupby(df_validos['Canal de venda'], observed=True).agg(['sum', 'count']).sort_values('sum', ascending=False)
+    linhas.append("Canais (faturamento | pedidos | ticket médio):")
+    for canal, (soma, contagem) in por_canal.iterrows():
+        linhas.append(f"- {canal}: {viz.formatar_moeda(soma)} | {int(contagem)} | {viz.formatar_moeda(soma / contagem if contagem else 0)}")
+
     pedidos_cancelados = len(df_cancelados)
-    valor_cancelado = df_cancelados['Total'].sum()
-    cancelados_md = f"- Total de Pedidos Cancelados: {pedidos_cancelados}\n- Prejuízo com Cancelamentos: {viz.formatar_moeda(valor_cancelado)}"
+    valor_cancelado = pd.to_numeric(df_cancelados['Total'], errors='coerce').sum() if 'Total' in df_cancelados.columns else 0
+    linhas.append(f"Cancelamentos: {pedidos_cancelados} pedidos; prejuízo {viz.formatar_moeda(valor_cancelado)}")
+    return "\n".join(linhas)
 
-    contexto_completo = f"""
-Aqui estão os dados de vendas da La Brasa Burger para sua análise:
+def construir_contexto(df_validos, df_cancelados, versao_dados=None, filtros=None):
+    """
+    Contexto para a IA, em cache por (versão/impressão digital dos dados, filtros).
+    Perguntas repetidas sobre os mesmos filtros reutilizam o texto já montado.
+    `versao_dados` identifica o dataset inteiro, não o recorte: quem a informa
+    precisa informar também os `filtros` que geraram os DataFrames.
+    """
+    if versao_dados is not None and filtros is None:
+        raise ValueError("Informe os filtros junto com a versão dos dados: a versão sozinha não distingue os recortes.")
+    versao = versao_dados or impressao_digital_dados(df_validos, df_cancelados)
+    chave = (versao, filtros)
+    cache = _cache_contextos()
+    texto = cache.obter(chave)
+    if texto is not None:
+        return ContextoDados(texto, estimar_tokens(texto), chave, em_cache=True, versao_dados=versao_dados)
+    texto = _montar_contexto(df_validos, df_cancelados)
+    cache.guardar(chave, texto)
+    return ContextoDados(texto, estimar_tokens(texto), chave, versao_dados=versao_dados)
 
-### Resumo Geral
-{resumo_geral_md}
+def gerar_contexto_dados(df_validos, df_cancelados, versao_dados=None, filtros=None):
+    """Gera o resumo dos dados usado como contexto para a IA."""
+    return construir_contexto(df_validos, df_cancelados, versao_dados, filtros).texto
 
-### Vendas por Canal de Venda
-{vendas_canal_md}
+def _preparar_conversa(prompt_usuario, historico_chat, contexto_dados):
+    """
+    Histórico compactado para a API e o prompt do turno. O contexto de dados vai
+    só no prompt atual (nunca no histórico); trocas antigas entram como resumo.
+    Retorna (histórico, prompt, tokens estimados por parte).
+    """
+    compactado = compactar_historico(historico_chat)
+    prompt = _montar_prompt(prompt_usuario, contexto_dados, compactado.resumo)
+    tokens = {
+        'contexto': estimar_tokens(_texto_contexto(contexto_dados)),
+        'resumo': estimar_tokens(compactado.resumo),
+        'historico': compactado.tokens - estimar_tokens(compactado.resumo),
+        'pergunta': estimar_tokens(prompt_usuario),
+        'turnos_resumidos': compactado.turnos_resumidos,
+    }
+    tokens['total'] = estimar_tokens(prompt) + tokens['historico']
+    return compactado.mensagens, prompt, tokens
 
-### Resumo de Cancelamentos
-{cancelados_md}
-"""
-    return contexto_completo
+def _texto_contexto(contexto_dados):
+    return contexto_dados.texto if isinstance(contexto_dados, ContextoDados) else contexto_dados
 
-def obter_resposta_ia(modelo, prompt_usuario, historico_chat, contexto_dados):
-    """Envia o prompt, o contexto e o histórico para a IA e retorna a resposta."""
-    if modelo is None:
-        return "Desculpe, a IA não está configurada."
+def _chave_resposta(prompt_usuario, historico_chat, contexto_dados):
+    """
+    Chave do cache de respostas e a versão do dataset que invalida as respostas
+    antigas. Só há cache quando o contexto é um ContextoDados; se ele foi montado
+    pela impressão digital do recorte, ela entra na chave mas não invalida nada.
+    """
+    if not isinstance(contexto_dados, ContextoDados):
+        return None, None
+    identificacao, filtros = contexto_dados.chave
+    return obter_cache_respostas().montar_chave(prompt_usuario, historico_chat, identificacao, filtros), contexto_dados.versao_dados
 
-    try:
-        historico_para_api = [
-            {'role': 'user' if m['role'] == 'user' else 'model', 'parts': [m['content']]}
-            for m in historico_chat
-        ]
-        
-        prompt_com_contexto = f"""
+def _montar_prompt(prompt_usuario, contexto_dados, resumo_conversa=''):
+    contexto_dados = _texto_contexto(contexto_dados)
+    if resumo_conversa:
+        contexto_dados = f"{contexto_dados}\n\nResumo da conversa até aqui:\n{resumo_conversa}"
+    return f"""
         Use os seguintes dados como única fonte de verdade para sua análise:
         ---
         {contexto_dados}
@@ -92,10 +179,122 @@ def obter_resposta_ia(modelo, prompt_usuario, historico_chat, contexto_dados):
         Pergunta: "{prompt_usuario}"
         """
 
-        conversa = modelo.start_chat(history=historico_para_api)
-        response = conversa.send_message(prompt_com_contexto)
-        
-        return response.text
+def obter_resposta_ia(modelo, prompt_usuario, historico_chat, contexto_dados, metricas=None):
+    """
+    Envia o prompt, o contexto e o histórico para a IA e retorna a resposta.
+    Com um `ContextoDados`, perguntas repetidas sobre os mesmos dados e filtros
+    são respondidas pelo cache de respostas, sem chamar a API. `metricas`
+    (MetricasResposta), opcional, recebe os tokens estimados do prompt.
+    """
+    if modelo is None:
+        return "Desculpe, a IA não está configurada."
+
+    cliente = _como_cliente(modelo)
+    chave, versao = _chave_resposta(prompt_usuario, historico_chat, contexto_dados)
+    if chave is not None:
+        em_cache = obter_cache_respostas().obter(chave, versao)
+        if em_cache is not None:
+            return em_cache
+    try:
+        historico_api, prompt, tokens = _preparar_conversa(prompt_usuario, historico_chat, contexto_dados)
+        if metricas is not None:
+            metricas.tokens_prompt = tokens
+        texto = cliente.gerar(prompt, historico_api)
+        if chave is not None:
+            obter_cache_respostas().guardar(chave, versao, texto)
+        return texto
+    except llm_client.ErroLLM as e:
+        print(f"Erro ao obter resposta da IA: {e}")
+        if e.tempo_esgotado:
+            return "A IA demorou demais para responder. Tente novamente em instantes."
+        return f"Ocorreu um erro ao comunicar com a API: {str(e)}"
     except Exception as e:
         print(f"Erro ao obter resposta da IA: {e}")
         return f"Ocorreu um erro ao comunicar com a API: {str(e)}"
+
+# --- RESPOSTA EM STREAMING ---
+
+@dataclass
+class MetricasResposta:
+    """Preenchida durante o streaming: tempo até o primeiro pedaço, tempo total e volume."""
+    inicio: float = 0.0
+    primeiro_pedaco_s: float = None
+    total_s: float = None
+    pedacos: int = 0
+    caracteres: int = 0
+    cancelada: bool = False
+    em_cache: bool = False
+    tokens_prompt: dict = None
+
+def cancelamento_solicitado(cancelar):
+    if cancelar is None:
+        return False
+    return cancelar.is_set() if hasattr(cancelar, 'is_set') else bool(cancelar())
+
+def obter_resposta_ia_stream(modelo, prompt_usuario, historico_chat, contexto_dados, cancelar=None, metricas=None):
+    """
+    Versão em streaming de `obter_resposta_ia`: gera os pedaços de texto à medida
+    que chegam. `cancelar` (threading.Event ou função sem argumentos) interrompe a
+    geração; `metricas` (MetricasResposta) recebe o tempo até o primeiro pedaço e o total.
+    """
+    metricas = metricas if metricas is not None else MetricasResposta()
+    metricas.inicio = time.perf_counter()
+    if modelo is None:
+        yield "Desculpe, a IA não está configurada."
+        return
+
+    chave, versao = _chave_resposta(prompt_usuario, historico_chat, contexto_dados)
+    if chave is not None:
+        em_cache = obter_cache_respostas().obter(chave, versao)
+        if em_cache is not None:
+            metricas.em_cache = True
+            metricas.primeiro_pedaco_s = time.perf_counter() - metricas.inicio
+            metricas.pedacos, metricas.caracteres = 1, len(em_cache)
+            metricas.total_s = metricas.primeiro_pedaco_s
+            yield em_cache
+            return
+
+    resposta = None
+    pedacos = []
+    try:
+        historico_api, prompt, metricas.tokens_prompt = _preparar_conversa(prompt_usuario, historico_chat, contexto_dados)
+        resposta = _como_cliente(modelo).gerar_stream(prompt, historico_api)
+        for texto in resposta:
+            if cancelamento_solicitado(cancelar):
+                metricas.cancelada = True
+                break
+            if not texto:
+                continue
+            if metricas.primeiro_pedaco_s is None:
+                metricas.primeiro_pedaco_s = time.perf_counter() - metricas.inicio
+            metricas.pedacos += 1
+            metricas.caracteres += len(texto)
+            pedacos.append(texto)
+            yield texto
+        if chave is not None and pedacos and not metricas.cancelada:
+            obter_cache_respostas().guardar(chave, versao, ''.join(pedacos))
+    except GeneratorExit:
+        # O script foi interrompido (ex.: novo rerun do Streamlit) durante a geração.
+        metricas.cancelada = True
+        raise
+    except Exception as e:
+        print(f"Erro ao obter resposta da IA: {e}")
+        yield f"Ocorreu um erro ao comunicar com a API: {str(e)}"
+    finally:
+        fechar = getattr(resposta, 'close', None)
+        if callable(fechar):
+            fechar()
+        metricas.total_s = time.perf_counter() - metricas.inicio
+
+def renderizar_resposta_stream(modelo, prompt_usuario, historico_chat, contexto_dados, cancelar=None):
+    """Escreve a resposta no chat à medida que ela chega. Retorna (texto completo, métricas)."""
+    metricas = MetricasResposta()
+    texto = st.write_stream(obter_resposta_ia_stream(modelo, prompt_usuario, historico_chat, contexto_dados, cancelar, metricas))
+    if metricas.em_cache:
+        st.caption("Resposta reaproveitada do cache (mesmos dados e filtros)")
+    elif metricas.primeiro_pedaco_s is not None:
+        legenda = f"Primeira resposta em {metricas.primeiro_pedaco_s:.2f} s · total {metricas.total_s:.2f} s"
+        if metricas.tokens_prompt:
+            legenda += f" · prompt ~{metricas.tokens_prompt['total']} tokens"
+        st.caption(legenda)
+    return texto, metricas
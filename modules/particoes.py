@@ -0,0 +1,139 @@
+# modules/particoes.py
+import hashlib
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime
+
+import gspread
+import pandas as pd
+import pytz
+
+from . import escrita_sheets
+
+# --- PARTIÇÕES MENSAIS DAS ABAS DE VENDAS ---
+# Cada mês fica numa aba própria ("Vendas 2025-06", "Cancelados 2025-06") e a aba
+# "Manifesto" descreve todas: linhas, datas extremas e a versão do conteúdo.
+
+ABA_MANIFESTO = "Manifesto"
+PREFIXOS = {'validos': 'Vendas', 'cancelados': 'Cancelados'}
+SEM_DATA = 'sem-data'
+
+@dataclass(frozen=True)
+class Particao:
+    aba: str
+    tabela: str
+    mes: str
+    linhas: int
+    data_inicial: str
+    data_final: str
+    versao: str
+    atualizado_em: str
+
+    def sobrepoe(self, data_inicial=None, data_final=None):
+        """A partição tem alguma data dentro de [data_inicial, data_final]? Partições sem data sempre entram."""
+        if not self.data_inicial or not self.data_final:
+            return True
+        if data_final is not None and self.data_inicial > str(data_final):
+            return False
+        if data_inicial is not None and self.data_final < str(data_inicial):
+            return False
+        return True
+
+COLUNAS_MANIFESTO = list(Particao.__dataclass_fields__)
+
+def nome_aba(tabela, mes):
+    return f"{PREFIXOS[tabela]} {mes}"
+
+def _datas(df):
+    for coluna in ('Data', 'Data da venda'):
+        if coluna in df.columns:
+            return pd.to_datetime(df[coluna].astype(str), format='mixed', dayfirst=True, errors='coerce')
+    return pd.Series(pd.NaT, index=df.index)
+
+def dividir_por_mes(df):
+    """{'AAAA-MM': linhas do mês}; linhas sem data vão para a partição 'sem-data'."""
+    if df is None or df.empty:
+        return {}
+    meses = _datas(df).dt.strftime('%Y-%m').fillna(SEM_DATA)
+    return {mes: parte for mes, parte in df.groupby(meses, sort=True)}
+
+def versao_particao(df):
+    """Impressão digital do conteúdo como ele vai para a planilha (texto)."""
+    texto = df.astype(str).where(df.notna(), '')
+    bruto = pd.util.hash_pandas_object(texto, index=False).values.tobytes() + '|'.join(map(str, df.columns)).encode('utf-8')
+    return hashlib.sha1(bruto).hexdigest()[:16]
+
+def descrever(tabela, mes, df, aba=None):
+    datas = _datas(df).dropna()
+    return Particao(
+        aba=aba or nome_aba(tabela, mes),
+        tabela=tabela,
+        mes=mes,
+        linhas=len(df),
+        data_inicial=datas.min().date().isoformat() if not datas.empty else '',
+        data_final=datas.max().date().isoformat() if not datas.empty else '',
+        versao=versao_particao(df),
+        atualizado_em=datetime.now(pytz.timezone('America/Maceio')).strftime('%Y-%m-%d %H:%M:%S'),
+    )
+
+def descrever_acrescimo(atual, novos):
+    """
+    Descrição da partição `atual` depois de receber as linhas `novos` no fim da aba,
+    sem relê-la: a versão encadeia a anterior com a das linhas acrescentadas.
+    """
+    acrescimo = descrever(atual.tabela, atual.mes, novos, aba=atual.aba)
+    iniciais = [d for d in (atual.data_inicial, acrescimo.data_inicial) if d]
+    finais = [d for d in (atual.data_final, acrescimo.data_final) if d]
+    return replace(
+        acrescimo,
+        linhas=atual.linhas + len(novos),
+        data_inicial=min(iniciais, default=''),
+        data_final=max(finais, default=''),
+        versao=hashlib.sha1(f"{atual.versao}+{acrescimo.versao}".encode('utf-8')).hexdigest()[:16],
+    )
+
+def selecionar(particoes, tabela, data_inicial=None, data_final=None):
+    """Partições da tabela que cruzam o período pedido, em ordem de mês."""
+    return sorted((p for p in particoes if p.tabela == tabela and p.sobrepoe(data_inicial, data_final)), key=lambda p: p.mes)
+
+def inicio_meses_recentes(particoes, meses):
+    """Primeiro dia do mais antigo dos `meses` últimos meses com partição ('AAAA-MM-01'), ou None se não houver."""
+    com_data = sorted({p.mes for p in particoes if p.mes != SEM_DATA})
+    return f"{com_data[-meses:][0]}-01" if com_data and meses else None
+
+# --- MANIFESTO ---
+
+def ler_manifesto(gateway):
+    """Partições descritas no manifesto, ou None se a planilha ainda não foi particionada."""
+    try:
+        gateway.planilha().worksheet(ABA_MANIFESTO)
+    except gspread.WorksheetNotFound:
+        return None
+    valores = gateway.ler_abas(ABA_MANIFESTO, valueRenderOption='UNFORMATTED_VALUE')[ABA_MANIFESTO]
+    if not valores:
+        return []
+    cabecalho = [str(c) for c in valores[0]]
+    particoes = []
+    for linha in valores[1:]:
+        registro = dict(zip(cabecalho, linha + [''] * (len(cabecalho) - len(linha))))
+        if not registro.get('aba'):
+            continue
+        particoes.append(Particao(
+            aba=str(registro['aba']),
+            tabela=str(registro['tabela']),
+            mes=str(registro['mes']),
+            linhas=int(float(registro.get('linhas') or 0)),
+            data_inicial=str(registro.get('data_inicial') or ''),
+            data_final=str(registro.get('data_final') or ''),
+            versao=str(registro.get('versao') or ''),
+            atualizado_em=str(registro.get('atualizado_em') or ''),
+        ))
+    return particoes
+
+def gravar_manifesto(planilha, particoes):
+    """Regrava o manifesto inteiro (é pequeno) com a mesma troca atômica das outras abas."""
+    linhas = [asdict(p) for p in sorted(particoes, key=lambda p: (p.tabela, p.mes))]
+    df = pd.DataFrame(linhas, columns=COLUNAS_MANIFESTO)
+    # RAW não funciona com gravar_aba (USER_ENTERED); prefixo "'" mantém datas e versões como texto.
+    for coluna in ('mes', 'data_inicial', 'data_final', 'versao', 'atualizado_em'):
+        df[coluna] = "'" + df[coluna].astype(str)
+    escrita_sheets.gravar_aba(planilha, ABA_MANIFESTO, df)
@@ -0,0 +1,299 @@
+# modules/pipeline_ingestao.py
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+from . import cep_handler, data_handler, escrita_sheets, particoes, sheets_gateway, telemetria
+
+# --- PIPELINE DE CARGA DO RELATÓRIO ---
+# Etapas em threads ligadas por filas limitadas:
+#
+#   particionamento ─┬─> gravacao_validos    (partições mensais de vendas)
+#                    ├─> gravacao_cancelados (partições mensais de cancelados)
+#                    └─> geocodificacao      (lotes de CEPs novos)
+#
+# As três etapas de saída rodam ao mesmo tempo; as gravações dividem o mesmo
+# balde de tokens da API (escrita_sheets), então o ritmo total não muda.
+# O manifesto é regravado a cada PARTICOES_POR_MANIFESTO partições gravadas e no
+# fim de cada etapa de gravação (cada regravação gasta escritas da mesma cota), e
+# cada lote de CEPs vai para o cache na hora: se uma etapa falha, o que as outras
+# (e ela mesma) já concluíram fica valendo. Nada é desfeito. Se o processo morre
+# entre duas regravações, as partições gravadas desde a última ficam fora do
+# manifesto e a próxima carga as regrava. Se o particionamento falha,
+# as etapas de saída que não chegaram a receber nada ficam como 'pulada'.
+# As threads não chamam st.*; o andamento chega à página como EventoEtapa. Abrir o
+# manifesto (que na primeira carga migra as abas antigas, escrevendo na página)
+# acontece na thread da página, antes das outras.
+
+TAMANHO_FILA_PARTICOES = 2
+TAMANHO_FILA_CEPS = 4
+CEPS_POR_LOTE = 100
+PARTICOES_POR_MANIFESTO = 5
+
+_FIM = object()
+
+@dataclass(frozen=True)
+class EventoEtapa:
+    etapa: str
+    estado: str  # 'aguardando', 'executando', 'concluida', 'falhou', 'pulada'
+    feitos: int
+    total: int
+    unidade: str
+    itens_por_s: float
+    mensagem: str = ''
+
+    @property
+    def fracao(self):
+        return min(self.feitos / self.total, 1.0) if self.total else (1.0 if self.estado == 'concluida' else 0.0)
+
+class _Etapa:
+    """Contadores e estado de uma etapa; cada mudança vira um EventoEtapa na fila de eventos."""
+
+    def __init__(self, nome, unidade, eventos):
+        self.nome = nome
+        self.unidade = unidade
+        self.eventos = eventos
+        self.estado = 'aguardando'
+        self.feitos = 0
+        self.total = 0
+        self.erro = None
+        self._inicio = None
+
+    def avisar(self, mensagem=''):
+        decorrido = time.perf_counter() - self._inicio if self._inicio else 0.0
+        self.eventos.put(EventoEtapa(self.nome, self.estado, self.feitos, self.total, self.unidade, self.feitos / decorrido if decorrido > 0 else 0.0, mensagem))
+
+    def iniciar(self):
+        self.estado, self._inicio = 'executando', time.perf_counter()
+        self.avisar()
+
+    def concluir(self, mensagem=''):
+        self.estado = 'concluida'
+        self.avisar(mensagem)
+
+    def falhar(self, erro):
+        self.estado, self.erro = 'falhou', erro
+        print(f"Etapa '{self.nome}' da carga falhou: {erro}")
+        self.avisar(str(erro))
+
+    def pular(self, mensagem=''):
+        self.estado = 'pulada'
+        self.avisar(mensagem)
+
+def _consumir(fila, etapa, processar):
+    """
+    Processa os itens da fila até o marcador de fim. Depois de uma falha a etapa
+    continua esvaziando a fila (sem processar) para não travar quem produz.
+    """
+    while True:
+        item = fila.get()
+        if item is _FIM:
+            return
+        if etapa.estado == 'falhou':
+            continue
+        try:
+            processar(item)
+        except Exception as e:
+            etapa.falhar(e)
+
+class PipelineIngestao:
+    """
+    Carga de um relatório já tratado: grava as partições (no `modo` de
+    data_handler.gravar_particao) e geocodifica os CEPs novos. `executar(ao_evento)`
+    roda na thread da página e chama `ao_evento` com cada EventoEtapa; retorna
+    {etapa: {'estado', 'feitos', 'total', 'erro'}}.
+    """
+
+    def __init__(self, df_validos, df_cancelados, gateway=None, modo='mesclar'):
+        self.df_validos = df_validos
+        self.df_cancelados = df_cancelados
+        self.modo = modo
+        self.gateway = gateway or sheets_gateway.obter_gateway()
+        self.eventos = queue.Queue()
+        self.etapas = {
+            'particionamento': _Etapa('particionamento', 'partições', self.eventos),
+            'gravacao_validos': _Etapa('gravacao_validos', 'linhas', self.eventos),
+            'gravacao_cancelados': _Etapa('gravacao_cancelados', 'linhas', self.eventos),
+            'geocodificacao': _Etapa('geocodificacao', 'CEPs', self.eventos),
+        }
+        self.filas = {
+            'gravacao_validos': queue.Queue(maxsize=TAMANHO_FILA_PARTICOES),
+            'gravacao_cancelados': queue.Queue(maxsize=TAMANHO_FILA_PARTICOES),
+            'geocodificacao': queue.Queue(maxsize=TAMANHO_FILA_CEPS),
+        }
+        self._atuais = {}
+        self._manifesto_alterado = False
+        self._particoes_gravadas = 0
+        self._particoes_fora_do_manifesto = 0
+        self._lock_manifesto = threading.Lock()
+
+    # --- ETAPAS ---
+
+    def _particionar(self):
+        etapa = self.etapas['particionamento']
+        etapa.iniciar()
+        try:
+            ceps = cep_handler.ceps_pendentes(self.df_validos)
+            pendentes = {'geocodificacao': [ceps[i:i + CEPS_POR_LOTE] for i in range(0, len(ceps), CEPS_POR_LOTE)]}
+            self.etapas['geocodificacao'].total = len(ceps)
+            for tabela, df in (('validos', self.df_validos), ('cancelados', self.df_cancelados)):
+                meses = particoes.dividir_por_mes(df)
+                pendentes[f'gravacao_{tabela}'] = [(tabela, mes, parte) for mes, parte in meses.items()]
+                self.etapas[f'gravacao_{tabela}'].total = sum(len(parte) for parte in meses.values())
+            etapa.total = sum(len(itens) for itens in pendentes.values())
+            # Distribui sem bloquear numa fila cheia: uma etapa lenta não segura as outras.
+            while any(pendentes.values()):
+                entregues = 0
+                for destino, itens in pendentes.items():
+                    if not itens:
+                        continue
+                    try:
+                        self.filas[destino].put_nowait(itens[0])
+                    except queue.Full:
+                        continue
+                    itens.pop(0)
+                    entregues += 1
+                    etapa.feitos += 1
+                    etapa.avisar()
+                if not entregues:
+                    time.sleep(0.05)
+            etapa.concluir()
+        except Exception as e:
+            etapa.falhar(e)
+        finally:
+            for fila in self.filas.values():
+                fila.put(_FIM)
+
+    def _encerrar(self, etapa, itens_recebidos, mensagem=''):
+        """Fim de uma etapa de saída: sem itens por causa de falha no particionamento, ela não rodou."""
+        if etapa.estado == 'falhou':
+            return
+        particionamento = self.etapas['particionamento']
+        if particionamento.estado == 'falhou':
+            if itens_recebidos:
+                etapa.falhar(RuntimeError(f"interrompida após {itens_recebidos} lote(s): o particionamento falhou"))
+            else:
+                etapa.pular("o particionamento falhou")
+        else:
+            etapa.concluir(mensagem)
+
+    def _gravar(self, nome_etapa):
+        etapa = self.etapas[nome_etapa]
+        etapa.iniciar()
+        feitos_antes = 0
+        recebidos = 0
+        tabelas = {'validos': self.df_validos, 'cancelados': self.df_cancelados}
+        excluir = data_handler.pedidos_das_outras_tabelas(tabelas, nome_etapa.removeprefix('gravacao_')) if self.modo == 'mesclar' else None
+
+        def progresso(p):
+            etapa.feitos = feitos_antes + p.linhas_gravadas
+            etapa.avisar(f"Aba '{p.aba}': bloco {p.blocos_gravados}/{p.total_blocos}")
+
+        def gravar(item):
+            nonlocal feitos_antes, recebidos
+            recebidos += 1
+            tabela, mes, parte = item
+            descricao = data_handler.gravar_particao(self.gateway, self._atuais, tabela, mes, parte, self.modo, progresso, escrita_sheets.gravar_aba, excluir)
+            if descricao is not None:
+                self._registrar_particao(descricao)
+            feitos_antes += len(parte)
+            etapa.feitos = feitos_antes
+            etapa.avisar(f"Partição {mes} {'gravada' if descricao else 'sem mudanças'}")
+
+        _consumir(self.filas[nome_etapa], etapa, gravar)
+        try:
+            self._descarregar_manifesto()
+        except Exception as e:
+            etapa.falhar(e)
+        self._encerrar(etapa, recebidos)
+
+    def _geocodificar(self):
+        etapa = self.etapas['geocodificacao']
+        etapa.iniciar()
+        feitos_antes = 0
+        salvos = 0
+        recebidos = 0
+
+        def geocodificar(lote):
+            nonlocal feitos_antes, salvos, recebidos
+            recebidos += 1
+
+            def ao_concluir(feitos, _total):
+                etapa.feitos = feitos_antes + feitos
+                etapa.avisar()
+
+            # Cada lote vai para o cache assim que termina.
+            salvos += cep_handler.salvar_coordenadas(cep_handler.buscar_coordenadas(lote, ao_concluir=ao_concluir))
+            feitos_antes += len(lote)
+
+        _consumir(self.filas['geocodificacao'], etapa, geocodificar)
+        self._encerrar(etapa, recebidos, f"{salvos} coordenadas novas")
+
+    def _registrar_particao(self, descricao):
+        """Partição gravada entra no manifesto em lotes de PARTICOES_POR_MANIFESTO (o resto, em _descarregar_manifesto)."""
+        with self._lock_manifesto:
+            self._atuais[descricao.aba] = descricao
+            self._particoes_gravadas += 1
+            self._particoes_fora_do_manifesto += 1
+            self._manifesto_alterado = True
+            if self._particoes_fora_do_manifesto >= PARTICOES_POR_MANIFESTO:
+                self._gravar_manifesto()
+
+    def _descarregar_manifesto(self):
+        with self._lock_manifesto:
+            if self._manifesto_alterado:
+                self._gravar_manifesto()
+
+    def _gravar_manifesto(self):
+        particoes.gravar_manifesto(self.gateway.planilha(), list(self._atuais.values()))
+        self._manifesto_alterado = False
+        self._particoes_fora_do_manifesto = 0
+
+    # --- EXECUÇÃO ---
+
+    def _resultado(self):
+        return {nome: {'estado': e.estado, 'feitos': e.feitos, 'total': e.total, 'erro': str(e.erro) if e.erro else None} for nome, e in self.etapas.items()}
+
+    def _repassar_eventos(self, ao_evento):
+        while not self.eventos.empty():
+            evento = self.eventos.get_nowait()
+            if ao_evento is not None:
+                ao_evento(evento)
+
+    def executar(self, ao_evento=None, intervalo_s=0.2):
+        # Na thread da página: a migração das abas antigas (primeira carga) usa st.write/st.success.
+        try:
+            self._atuais, self._manifesto_alterado = data_handler.abrir_manifesto_para_escrita(self.gateway)
+        except Exception as e:
+            self.etapas['particionamento'].falhar(e)
+            for nome in self.filas:
+                self.etapas[nome].pular("o manifesto não pôde ser aberto")
+            self._repassar_eventos(ao_evento)
+            return self._resultado()
+        threads = [
+            threading.Thread(target=self._particionar, name='ingestao-particionamento', daemon=True),
+            threading.Thread(target=self._gravar, args=('gravacao_validos',), name='ingestao-validos', daemon=True),
+            threading.Thread(target=self._gravar, args=('gravacao_cancelados',), name='ingestao-cancelados', daemon=True),
+            threading.Thread(target=self._geocodificar, name='ingestao-geocodificacao', daemon=True),
+        ]
+        with telemetria.span('ingestao.pipeline'):
+            for thread in threads:
+                thread.start()
+            while any(thread.is_alive() for thread in threads) or not self.eventos.empty():
+                try:
+                    evento = self.eventos.get(timeout=intervalo_s)
+                except queue.Empty:
+                    continue
+                if ao_evento is not None:
+                    ao_evento(evento)
+            for thread in threads:
+                thread.join()
+            self._finalizar()
+        return self._resultado()
+
+    def _finalizar(self):
+        """Migração sem partições novas ainda precisa do manifesto; qualquer aba gravada muda a versão da planilha."""
+        self._descarregar_manifesto()
+        if self._particoes_gravadas:
+            data_handler.registrar_versao_planilha(self.gateway.planilha())
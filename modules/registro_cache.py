@@ -0,0 +1,210 @@
+# modules/registro_cache.py
+import threading
+import time
+from dataclasses import dataclass, field
+
+import streamlit as st
+
+# --- REGISTRO DE CACHES NOMEADOS ---
+# Cada espaço de nomes ('vendas', 'cep', ...) guarda um snapshot
+# compartilhado por todas as sessões. A invalidação é feita por tags de
+# dependência, e a nova versão é reconstruída em segundo plano enquanto os
+# leitores continuam usando o snapshot anterior.
+
+@dataclass
+class _Entrada:
+    nome: str
+    carregador: object
+    tags: frozenset
+    sonda: object = None
+    restaurar: object = None
+    persistir: object = None
+    carregador_inicial: object = None
+    valor: object = None
+    versao: object = None
+    carregado_em: float = None
+    duracao_carga: float = None
+    origem: str = None
+    reconstruindo: bool = False
+    parcial: bool = False
+    nova_rodada: bool = False
+    ultimo_erro: str = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def carregado(self):
+        return self.carregado_em is not None
+
+
+class RegistroCache:
+    def __init__(self):
+        self._entradas = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, nome, carregador, tags=(), sonda=None, restaurar=None, persistir=None, carregador_inicial=None):
+        """
+        Registra (ou atualiza) um espaço de nomes. `carregador()` produz o valor;
+        `sonda()`, opcional, devolve a versão atual da fonte. `restaurar()` e
+        `persistir(valor, versao)`, opcionais, leem e gravam uma cópia em disco
+        usada para responder imediatamente após um reinício. Sem cópia em disco,
+        `carregador_inicial()`, opcional, produz uma primeira versão parcial (mais
+        rápida) e o `carregador` completo roda em seguida, em segundo plano; a
+        versão parcial não é persistida. O snapshot já carregado é preservado
+        quando o módulo é reimportado.
+        """
+        with self._lock:
+            entrada = self._entradas.get(nome)
+            if entrada is None:
+                self._entradas[nome] = _Entrada(nome, carregador, frozenset(tags), sonda, restaurar, persistir, carregador_inicial)
+            else:
+                entrada.carregador = carregador
+                entrada.tags = frozenset(tags)
+                entrada.sonda = sonda
+                entrada.restaurar = restaurar
+                entrada.persistir = persistir
+                entrada.carregador_inicial = carregador_inicial
+
+    def obter(self, nome):
+        """Devolve o snapshot atual, carregando-o na primeira vez."""
+        entrada = self._entradas[nome]
+        if not entrada.carregado:
+            with entrada.lock:
+                if not entrada.carregado:
+                    if self._restaurar(entrada):
+                        # Partida a frio: responde com a cópia em disco e valida contra a fonte em segundo plano.
+                        self._reconstruir_em_segundo_plano(entrada, somente_se_mudou=True)
+                    elif entrada.carregador_inicial is not None:
+                        # Sem cópia em disco: responde com a versão parcial e completa em segundo plano.
+                        self._carregar(entrada, self._sondar(entrada), parcial=True)
+                        self._reconstruir_em_segundo_plano(entrada, somente_se_mudou=True)
+                    else:
+                        self._carregar(entrada, self._sondar(entrada))
+            return entrada.valor
+        if entrada.parcial and not entrada.reconstruindo:
+            # A carga completa anterior falhou: tenta de novo.
+            self._reconstruir_em_segundo_plano(entrada)
+        elif entrada.sonda is not None and self._sondar(entrada) != entrada.versao:
+            self._reconstruir_em_segundo_plano(entrada)
+        return entrada.valor
+
+    def parcial(self, nome):
+        """O snapshot atual é a versão parcial do `carregador_inicial`?"""
+        return self._entradas[nome].parcial
+
+    def invalidar(self, *tags):
+        """Reconstrói em segundo plano apenas os espaços que dependem de alguma das tags."""
+        alvos = [e for e in self._entradas.values() if e.tags & set(tags)]
+        for entrada in alvos:
+            if entrada.carregado:
+                self._reconstruir_em_segundo_plano(entrada)
+        return [e.nome for e in alvos]
+
+    def estatisticas(self):
+        return {
+            nome: {
+                'tags': sorted(e.tags),
+                'versao': e.versao,
+                'origem': e.origem,
+                'carregado_em': e.carregado_em,
+                'duracao_carga_s': e.duracao_carga,
+                'reconstruindo': e.reconstruindo,
+                'parcial': e.parcial,
+                'ultimo_erro': e.ultimo_erro,
+            }
+            for nome, e in self._entradas.items()
+        }
+
+    # --- INTERNOS ---
+
+    def _sondar(self, entrada):
+        if entrada.sonda is None:
+            return None
+        try:
+            return entrada.sonda()
+        except Exception as e:
+            print(f"Erro ao sondar a versão de '{entrada.nome}': {e}")
+            return entrada.versao
+
+    def _restaurar(self, entrada):
+        if entrada.restaurar is None:
+            return False
+        inicio = time.perf_counter()
+        try:
+            restaurado = entrada.restaurar()
+        except Exception as e:
+            print(f"Erro ao restaurar o snapshot de '{entrada.nome}': {e}")
+            return False
+        if restaurado is None:
+            return False
+        entrada.valor, entrada.versao = restaurado
+        entrada.parcial = False
+        entrada.origem = 'disco'
+        entrada.duracao_carga = time.perf_counter() - inicio
+        entrada.carregado_em = time.time()
+        return True
+
+    def _carregar(self, entrada, versao_fonte, parcial=False):
+        inicio = time.perf_counter()
+        valor = entrada.carregador_inicial() if parcial else entrada.carregador()
+        # A troca do snapshot é uma única atribuição: leitores nunca veem um estado intermediário.
+        entrada.valor = valor
+        entrada.versao = versao_fonte
+        entrada.parcial = parcial
+        entrada.origem = 'fonte (parcial)' if parcial else 'fonte'
+        entrada.duracao_carga = time.perf_counter() - inicio
+        entrada.carregado_em = time.time()
+        entrada.ultimo_erro = None
+        if entrada.persistir is not None and not parcial:
+            threading.Thread(target=self._persistir, args=(entrada, valor, versao_fonte), daemon=True, name=f"snapshot-{entrada.nome}").start()
+
+    def _persistir(self, entrada, valor, versao_fonte):
+        try:
+            entrada.persistir(valor, versao_fonte)
+        except Exception as e:
+            print(f"Erro ao gravar o snapshot de '{entrada.nome}': {e}")
+
+    def _reconstruir_em_segundo_plano(self, entrada, somente_se_mudou=False):
+        if not somente_se_mudou:
+            with entrada.lock:
+                if entrada.reconstruindo:
+                    entrada.nova_rodada = True
+                    return
+                entrada.reconstruindo = True
+        else:
+            # Chamado com entrada.lock já adquirido (partida a frio).
+            entrada.reconstruindo = True
+        threading.Thread(target=self._executar_reconstrucao, args=(entrada, somente_se_mudou), daemon=True, name=f"cache-{entrada.nome}").start()
+
+    def _executar_reconstrucao(self, entrada, somente_se_mudou=False):
+        while True:
+            entrada.nova_rodada = False
+            try:
+                versao_fonte = self._sondar(entrada)
+                if not (somente_se_mudou and versao_fonte == entrada.versao and not entrada.parcial):
+                    self._carregar(entrada, versao_fonte)
+                somente_se_mudou = False
+            except Exception as e:
+                entrada.ultimo_erro = str(e)
+                print(f"Erro ao reconstruir o cache '{entrada.nome}': {e}")
+            with entrada.lock:
+                if not entrada.nova_rodada:
+                    entrada.reconstruindo = False
+                    return
+
+
+@st.cache_resource
+def obter_registro():
+    """Registro único do processo, compartilhado entre todas as sessões."""
+    return RegistroCache()
+
+def registrar(nome, carregador, tags=(), sonda=None, restaurar=None, persistir=None, carregador_inicial=None):
+    obter_registro().registrar(nome, carregador, tags=tags, sonda=sonda, restaurar=restaurar, persistir=persistir, carregador_inicial=carregador_inicial)
+
+def obter(nome):
+    return obter_registro().obter(nome)
+
+def invalidar(*tags):
+    return obter_registro().invalidar(*tags)
+
+def parcial(nome):
+    return obter_registro().parcial(nome)
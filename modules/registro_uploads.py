@@ -0,0 +1,64 @@
+# modules/registro_uploads.py
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+import pytz
+
+ARQUIVO_REGISTRO = os.path.join('data', 'uploads', 'registro.json')
+FORMATOS = ('xlsx', 'csv', 'parquet')
+
+# --- REGISTRO DOS RELATÓRIOS JÁ CARREGADOS ---
+# Cada arquivo enviado é identificado pelo sha256 do conteúdo. Depois que a carga
+# termina sem falhas, o arquivo entra no registro; o mesmo arquivo enviado de novo
+# (com qualquer nome) é reconhecido e não é reprocessado nem regravado.
+
+_lock = threading.Lock()
+
+def sha256_conteudo(conteudo):
+    return hashlib.sha256(conteudo).hexdigest()
+
+def formato_arquivo(nome):
+    """'xlsx', 'csv' ou 'parquet', pela extensão do arquivo."""
+    extensao = os.path.splitext(str(nome))[1].lower().lstrip('.')
+    if extensao not in FORMATOS:
+        raise ValueError(f"Formato de relatório não suportado: '{nome}'. Use {', '.join('.' + f for f in FORMATOS)}.")
+    return extensao
+
+def _ler(caminho):
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _gravar(caminho, registro):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(registro, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+def consultar(sha256, caminho=ARQUIVO_REGISTRO):
+    """Entrada do arquivo no registro, ou None se ele nunca foi carregado."""
+    return _ler(caminho).get(sha256)
+
+def registrar(sha256, nome, validos, cancelados, caminho=ARQUIVO_REGISTRO):
+    """Anota o arquivo como carregado. Chamado só depois de a carga terminar sem falhas."""
+    entrada = {
+        'nome': str(nome),
+        'validos': int(validos),
+        'cancelados': int(cancelados),
+        'carregado_em': datetime.now(pytz.timezone('America/Maceio')).strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    with _lock:
+        registro = _ler(caminho)
+        registro[sha256] = entrada
+        _gravar(caminho, registro)
+    return entrada
+
+def listar(caminho=ARQUIVO_REGISTRO):
+    """{sha256: entrada} de todos os arquivos já carregados."""
+    return _ler(caminho)
@@ -2,53 +2,26 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import gspread
-from gspread_dataframe import get_as_dataframe
 from datetime import time
 from . import visualization as viz 
+from . import campanhas, data_handler
+from .importacao_preguicosa import modulo
 
-# --- FUNÇÃO DE CONEXÃO (AGORA AUTOCONTIDA NO MÓDULO) ---
-def _get_google_sheets_client():
-    """Autentica no Google Sheets de forma segura."""
-    try:
-        return gspread.service_account_from_dict(st.secrets["google_credentials"])
-    except Exception as e:
-        # Imprime o erro no console para depuração sem quebrar o app
-        print(f"Erro ao autenticar com o Google Sheets: {e}")
-        return None
+go = modulo('plotly.graph_objects')
 
-# --- FUNÇÕES DE DADOS ---
-@st.cache_data(ttl=600)
-def carregar_dados_sao_joao():
-    """Carrega e prepara os dados das planilhas para a análise de São João."""
-    try:
-        # CORREÇÃO: Chama a função local deste módulo
-        gc = _get_google_sheets_client()
-        if gc is None: 
-            st.error("Falha na autenticação com o Google Sheets.")
-            return pd.DataFrame(), pd.DataFrame()
-        
-        spreadsheet = gc.open(st.secrets["GOOGLE_SHEET_NAME"])
-        
-        df_validos = get_as_dataframe(spreadsheet.worksheet("Página1"), evaluate_formulas=False).dropna(how='all')
-        df_cancelados = get_as_dataframe(spreadsheet.worksheet("Cancelados"), evaluate_formulas=False).dropna(how='all')
-
-        for df in [df_validos, df_cancelados]:
-            if not df.empty:
-                df['Data'] = pd.to_datetime(df['Data'], errors='coerce').dt.date
-                df['Hora'] = pd.to_numeric(df['Hora'], errors='coerce')
-                df['Total'] = pd.to_numeric(df['Total'], errors='coerce')
-                df.dropna(subset=['Data', 'Hora'], inplace=True) # Remove linhas onde a data/hora falhou
-        
-        df_validos_madrugada = df_validos[df_validos['Hora'].between(0, 4)].copy()
-        df_cancelados_madrugada = df_cancelados[df_cancelados['Hora'].between(0, 4)].copy()
-        
-        return df_validos_madrugada, df_cancelados_madrugada
+CAMPANHA = campanhas.CAMPANHAS['sao_joao_2025']
 
-    except Exception as e:
-        st.error(f"Ocorreu um erro ao carregar os dados da planilha: {e}")
-        return pd.DataFrame(), pd.DataFrame()
+# --- FUNÇÕES DE DADOS ---
+def carregar_dados_sao_joao(campanha=CAMPANHA):
+    """
+    Fatia o dataset já carregado pelo dashboard na janela da campanha (período e
+    horário da madrugada). Retorna (validos, cancelados, rollups, versao_dados).
+    """
+    df_validos, df_cancelados, versao_dados = data_handler.obter_dados_dashboard()
+    df_validos_madrugada = campanhas.fatiar(df_validos, campanha)
+    df_cancelados_madrugada = campanhas.fatiar(df_cancelados, campanha)
+    rollups = campanhas.materializar_rollups(versao_dados, df_validos, df_cancelados)
+    return df_validos_madrugada, df_cancelados_madrugada, rollups, versao_dados
 
 # --- FUNÇÕES DE VISUALIZAÇÃO ---
 
@@ -83,7 +56,7 @@ def display_hourly_performance_chart(df):
     st.markdown("<h5 class='card-title'>Performance por Hora (Madrugada)</h5>", unsafe_allow_html=True)
     if df.empty: return
     hourly_summary = df.groupby('Hora').agg(Pedidos=('Pedido', 'count'), Faturamento=('Total', 'sum')).reset_index()
-    horas_template = pd.DataFrame({'Hora': range(5)})
+    horas_template = pd.DataFrame({'Hora': range(CAMPANHA.hora_inicial, CAMPANHA.hora_final + 1)})
     hourly_summary = pd.merge(horas_template, hourly_summary, on='Hora', how='left').fillna(0)
     hourly_summary['Faturamento_Texto'] = hourly_summary['Faturamento'].apply(viz.formatar_moeda)
     hourly_summary['Hora_Str'] = hourly_summary['Hora'].apply(lambda x: f'{x:02d}:00')
@@ -110,3 +83,15 @@ def display_cancelled_orders_table(df_cancelados):
     df_display['Valor'] = df_display['Valor'].apply(viz.formatar_moeda)
     df_display['Hora'] = df_display['Hora'].apply(lambda x: f"{int(x):02d}:00")
     st.dataframe(df_display, use_container_width=True, hide_index=True)
+
+def display_comparativo_anual(rollups, campanha=CAMPANHA):
+    comparativo = campanhas.comparativo_anual(rollups, campanha)
+    if len(comparativo) < 2:
+        return
+    st.markdown("---")
+    st.markdown(f"#### <i class='bi bi-calendar2-range'></i> Mesmo Período em Outros Anos ({campanha.rotulo_periodo})", unsafe_allow_html=True)
+    df_display = comparativo[['Ano', 'faturamento', 'pedidos', 'ticket_medio', 'cancelados']].copy()
+    df_display['faturamento'] = df_display['faturamento'].apply(viz.formatar_moeda)
+    df_display['ticket_medio'] = df_display['ticket_medio'].apply(viz.formatar_moeda)
+    df_display.columns = ['Ano', 'Faturamento', 'Pedidos', 'Ticket Médio', 'Cancelados']
+    st.dataframe(df_display, use_container_width=True, hide_index=True)
@@ -0,0 +1,164 @@
+# modules/sheets_gateway.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import gspread
+import streamlit as st
+
+ARQUIVO_CREDENCIAIS = "google_credentials.json"
+INTERVALOS_POR_LOTE = 10
+MAX_LOTES_PARALELOS = 4
+# Renderização usada quando quem lê não escolhe outra: o texto exibido na planilha,
+# como o antigo get_all_values. Vai sempre explícita no pedido, para que nenhuma
+# leitura dependa do padrão da API.
+PARAMETROS_PADRAO_LEITURA = {'valueRenderOption': 'FORMATTED_VALUE'}
+
+def _segredo(nome, padrao=None):
+    try:
+        return st.secrets.get(nome, os.getenv(nome, padrao))
+    except Exception:
+        # Fora do Streamlit (robô de extração) pode não haver secrets.toml.
+        return os.getenv(nome, padrao)
+
+def _autenticar():
+    """Conta de serviço dos segredos do Streamlit ou, no robô, do arquivo local de credenciais."""
+    try:
+        credenciais = st.secrets.get("google_credentials")
+    except Exception:
+        credenciais = None
+    if credenciais:
+        return gspread.service_account_from_dict(credenciais)
+    if os.path.exists(ARQUIVO_CREDENCIAIS):
+        return gspread.service_account(filename=ARQUIVO_CREDENCIAIS)
+    raise RuntimeError("Credenciais do Google não encontradas.")
+
+def _intervalo_da_aba(nome_aba, intervalo=None):
+    nome = nome_aba.replace("'", "''")
+    return f"'{nome}'!{intervalo}" if intervalo else f"'{nome}'"
+
+def _letra_coluna(indice):
+    """0 -> 'A', 26 -> 'AA'."""
+    letras = ''
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+def _grupos_contiguos(posicoes):
+    grupos = []
+    for posicao in posicoes:
+        if grupos and posicao == grupos[-1][-1] + 1:
+            grupos[-1].append(posicao)
+        else:
+            grupos.append([posicao])
+    return grupos
+
+# --- GATEWAY ---
+
+class GatewaySheets:
+    """
+    Sessão autorizada e planilha resolvidas uma única vez por processo. A planilha
+    é aberta pela chave (GOOGLE_SHEET_KEY), sem a busca por título no Drive; o nome
+    (GOOGLE_SHEET_NAME) fica só como alternativa. `cliente` permite injetar outro
+    cliente com a interface do gspread (ex.: um backend local).
+    """
+
+    def __init__(self, cliente=None, chave=None, nome=None):
+        self._cliente = cliente
+        self.chave = chave
+        self.nome = nome
+        self._planilha = None
+        self._lock = threading.Lock()
+
+    def cliente(self):
+        if self._cliente is None:
+            with self._lock:
+                if self._cliente is None:
+                    self._cliente = _autenticar()
+        return self._cliente
+
+    def planilha(self):
+        if self._planilha is None:
+            cliente = self.cliente()
+            with self._lock:
+                if self._planilha is None:
+                    if self.chave:
+                        self._planilha = cliente.open_by_key(self.chave)
+                    elif self.nome:
+                        self._planilha = cliente.open(self.nome)
+                        # Guarda a chave para não repetir a busca por título.
+                        self.chave = self._planilha.id
+                    else:
+                        raise RuntimeError("Planilha não configurada (GOOGLE_SHEET_KEY ou GOOGLE_SHEET_NAME).")
+        return self._planilha
+
+    def ler_intervalos(self, intervalos, **parametros):
+        """
+        Lê vários intervalos (notação A1) com `values:batchGet`: um pedido por lote
+        de até INTERVALOS_POR_LOTE intervalos, com os lotes buscados em paralelo.
+        Devolve as linhas de cada intervalo, na ordem pedida. Sem
+        valueRenderOption em `parametros`, vale PARAMETROS_PADRAO_LEITURA.
+        """
+        planilha = self.planilha()
+        parametros = {**PARAMETROS_PADRAO_LEITURA, **parametros}
+        intervalos = list(intervalos)
+        lotes = [intervalos[i:i + INTERVALOS_POR_LOTE] for i in range(0, len(intervalos), INTERVALOS_POR_LOTE)]
+
+        def buscar(lote):
+            resposta = planilha.values_batch_get(lote, params=parametros)
+            return [faixa.get('values', []) for faixa in resposta.get('valueRanges', [])]
+
+        if len(lotes) <= 1:
+            return buscar(lotes[0]) if lotes else []
+        with ThreadPoolExecutor(max_workers=min(MAX_LOTES_PARALELOS, len(lotes)), thread_name_prefix="sheets") as executor:
+            return [linhas for resultado in executor.map(buscar, lotes) for linhas in resultado]
+
+    def ler_abas(self, *nomes_abas, **parametros):
+        """Conteúdo de cada aba (lista de linhas, cabeçalho incluso), por nome."""
+        valores = self.ler_intervalos([_intervalo_da_aba(nome) for nome in nomes_abas], **parametros)
+        return dict(zip(nomes_abas, valores))
+
+    def cabecalhos(self, nomes_abas):
+        """Nomes das colunas (primeira linha) de cada aba, num único batchGet: {aba: [nomes]}."""
+        linhas = self.ler_intervalos([_intervalo_da_aba(aba, '1:1') for aba in nomes_abas])
+        return {aba: [str(nome).strip() for nome in (valores[0] if valores else [])] for aba, valores in zip(nomes_abas, linhas)}
+
+    def ler_colunas(self, nomes_abas, colunas, cabecalhos=None, **parametros):
+        """
+        Lê só as colunas pedidas (pelo nome no cabeçalho) de cada aba, em dois
+        pedidos batchGet: um com os cabeçalhos e outro com os dados, coluna a
+        coluna (majorDimension=COLUMNS). Colunas vizinhas viram um único
+        intervalo aberto (ex.: C2:E), que a API já corta no fim da área usada.
+        Com `cabecalhos` ({aba: [nomes]}, de `cabecalhos()`), o primeiro pedido é pulado.
+        Devolve {aba: {coluna: lista de valores}}.
+        """
+        cabecalhos = cabecalhos or self.cabecalhos(nomes_abas)
+        pedidos = []
+        for aba in nomes_abas:
+            cabecalho = cabecalhos[aba]
+            posicoes = [i for i, nome in enumerate(cabecalho) if nome in colunas]
+            for grupo in _grupos_contiguos(posicoes):
+                intervalo = f"{_letra_coluna(grupo[0])}2:{_letra_coluna(grupo[-1])}"
+                pedidos.append((aba, [cabecalho[i] for i in grupo], _intervalo_da_aba(aba, intervalo)))
+        valores = self.ler_intervalos([p[2] for p in pedidos], majorDimension='COLUMNS', **parametros) if pedidos else []
+        resultado = {aba: {} for aba in nomes_abas}
+        for (aba, nomes, _), lidas in zip(pedidos, valores):
+            for i, nome in enumerate(nomes):
+                resultado[aba][nome] = lidas[i] if i < len(lidas) else []
+        return resultado
+
+    def aba(self, nome_aba, criar_com_colunas=None):
+        """Worksheet pelo nome; se não existir e `criar_com_colunas` for informado, cria a aba."""
+        try:
+            return self.planilha().worksheet(nome_aba)
+        except gspread.WorksheetNotFound:
+            if criar_com_colunas is None:
+                raise
+            return self.planilha().add_worksheet(title=nome_aba, rows=1, cols=max(int(criar_com_colunas), 1))
+
+@st.cache_resource
+def obter_gateway():
+    """Gateway único do processo, compartilhado por todas as sessões e threads."""
+    return GatewaySheets(chave=_segredo("GOOGLE_SHEET_KEY"), nome=_segredo("GOOGLE_SHEET_NAME"))
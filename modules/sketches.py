@@ -0,0 +1,209 @@
+# modules/sketches.py
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from . import snapshots, telemetria
+
+# --- SKETCHES DE QUANTIS DO VALOR DOS PEDIDOS ---
+# Cada pedido cai numa faixa de valor de largura relativa fixa (faixas
+# logarítmicas com razão GAMMA). Como as faixas são as mesmas para qualquer
+# conjunto de pedidos, juntar dois sketches é somar as contagens faixa a faixa.
+#
+# Garantia: quantil(q) devolve v̂ com |v̂ - v| <= ERRO_RELATIVO * v, sendo v o
+# valor exato do pedido de posto ceil(q * n) (quantil sem interpolação).
+# Valores abaixo de VALOR_MINIMO contam como 0 (erro absoluto menor que um
+# centavo) e acima de VALOR_MAXIMO ficam na última faixa.
+#
+# Na carga, calcular_agregados grava a tabela 'agg_sketch_total' (pedidos por
+# dia, canal e faixa) junto ao snapshot; IndiceSketches guarda as contagens
+# acumuladas por dia, então qualquer período e conjunto de canais sai em
+# duas subtrações, sem olhar os pedidos.
+
+ERRO_RELATIVO = 0.01
+GAMMA = (1 + ERRO_RELATIVO) / (1 - ERRO_RELATIVO)
+VALOR_MINIMO = 0.01
+VALOR_MAXIMO = 1e6
+
+_LOG_GAMMA = math.log(GAMMA)
+_EXPOENTE_MINIMO = math.ceil(math.log(VALOR_MINIMO) / _LOG_GAMMA)
+TOTAL_FAIXAS = math.ceil(math.log(VALOR_MAXIMO) / _LOG_GAMMA) - _EXPOENTE_MINIMO + 2
+
+def faixas(valores):
+    """Faixa de cada valor: 0 para valores abaixo de VALOR_MINIMO (e nulos), 1.. para os demais."""
+    valores = np.asarray(valores, dtype='float64')
+    positivos = np.where(valores >= VALOR_MINIMO, valores, VALOR_MINIMO)
+    indices = np.ceil(np.log(positivos) / _LOG_GAMMA).astype('int64') - _EXPOENTE_MINIMO + 1
+    return np.where(valores >= VALOR_MINIMO, np.clip(indices, 1, TOTAL_FAIXAS - 1), 0)
+
+def limites_faixas(indices):
+    """(inferior, superior) de cada faixa; a faixa i > 0 cobre (GAMMA^(e-1), GAMMA^e]."""
+    indices = np.asarray(indices, dtype='int64')
+    superior = np.power(GAMMA, indices + _EXPOENTE_MINIMO - 1)
+    return np.where(indices > 0, superior / GAMMA, 0.0), np.where(indices > 0, superior, VALOR_MINIMO)
+
+def representantes(indices):
+    """Valor devolvido para cada faixa: o ponto com o mesmo erro relativo às duas bordas."""
+    _, superior = limites_faixas(indices)
+    return np.where(np.asarray(indices) > 0, 2 * superior / (GAMMA + 1), 0.0)
+
+class SketchQuantis:
+    """Contagem de pedidos por faixa de valor, a partir da faixa `inicio`."""
+    __slots__ = ('inicio', 'contagens')
+
+    erro_relativo = ERRO_RELATIVO
+
+    def __init__(self, inicio=0, contagens=None):
+        self.inicio = int(inicio)
+        self.contagens = np.zeros(0, dtype='int64') if contagens is None else np.asarray(contagens, dtype='int64')
+
+    @classmethod
+    def de_valores(cls, valores):
+        indices = faixas(pd.to_numeric(pd.Series(valores), errors='coerce').dropna().to_numpy())
+        if not len(indices):
+            return cls()
+        inicio = int(indices.min())
+        return cls(inicio, np.bincount(indices - inicio))
+
+    @property
+    def total(self):
+        return int(self.contagens.sum())
+
+    def mesclar(self, outro):
+        if not outro.total:
+            return SketchQuantis(self.inicio, self.contagens.copy())
+        if not self.total:
+            return SketchQuantis(outro.inicio, outro.contagens.copy())
+        inicio = min(self.inicio, outro.inicio)
+        contagens = np.zeros(max(self.inicio + len(self.contagens), outro.inicio + len(outro.contagens)) - inicio, dtype='int64')
+        contagens[self.inicio - inicio:self.inicio - inicio + len(self.contagens)] += self.contagens
+        contagens[outro.inicio - inicio:outro.inicio - inicio + len(outro.contagens)] += outro.contagens
+        return SketchQuantis(inicio, contagens)
+
+    def quantis(self, qs):
+        """Valores nos quantis `qs` (0 a 1); None se o sketch estiver vazio."""
+        total = self.total
+        if not total:
+            return None
+        postos = np.maximum(np.ceil(np.asarray(qs, dtype='float64') * total), 1)
+        posicoes = np.searchsorted(np.cumsum(self.contagens), postos, side='left')
+        return representantes(posicoes + self.inicio)
+
+    def quantil(self, q):
+        valores = self.quantis([q])
+        return None if valores is None else float(valores[0])
+
+    def limite_outliers(self):
+        """Limite superior de Tukey (Q3 + 1,5 × IQR), como agregacoes.limite_outliers."""
+        quartis = self.quantis([0.25, 0.75])
+        return None if quartis is None else float(quartis[1] + 1.5 * (quartis[1] - quartis[0]))
+
+    def histograma(self, barras=30):
+        """Inicio | Fim | Pedidos, juntando faixas vizinhas em até `barras` barras sobre o intervalo observado."""
+        ocupadas = np.flatnonzero(self.contagens)
+        if not len(ocupadas):
+            return pd.DataFrame(columns=['Inicio', 'Fim', 'Pedidos'])
+        contagens = self.contagens[ocupadas[0]:ocupadas[-1] + 1]
+        grupos = np.arange(len(contagens)) * min(barras, len(contagens)) // len(contagens)
+        primeira = np.flatnonzero(np.r_[True, np.diff(grupos) > 0])
+        indices = np.arange(len(contagens)) + self.inicio + ocupadas[0]
+        inferior, superior = limites_faixas(indices)
+        return pd.DataFrame({
+            'Inicio': inferior[primeira],
+            'Fim': superior[np.r_[primeira[1:] - 1, len(contagens) - 1]],
+            'Pedidos': np.add.reduceat(contagens, primeira),
+        })
+
+# --- SKETCHES POR DIA E CANAL ---
+
+def tabela_sketches(df_validos):
+    """Data | Canal de venda | Faixa | Pedidos: o sketch de cada dia e canal, para gravar no snapshot."""
+    if df_validos.empty:
+        return pd.DataFrame(columns=['Data', 'Canal de venda', 'Faixa', 'Pedidos'])
+    # Mesma regra de SketchQuantis.de_valores: pedido sem Total numérico fica de fora.
+    totais = pd.to_numeric(df_validos['Total'], errors='coerce')
+    selecionados = df_validos['Data'].notna() & totais.notna()
+    com_data = df_validos[selecionados]
+    tabela = pd.DataFrame({
+        'Data': com_data['Data'].to_numpy(),
+        'Canal de venda': com_data['Canal de venda'].astype(object).to_numpy(),
+        'Faixa': faixas(totais[selecionados].to_numpy()),
+    })
+    return tabela.groupby(['Data', 'Canal de venda', 'Faixa'], dropna=False).size().reset_index(name='Pedidos')
+
+class IndiceSketches:
+    """
+    Contagens acumuladas por dia (dia × canal × faixa). `mesclar` devolve o
+    sketch de um período e de um conjunto de canais em tempo constante.
+    """
+
+    def __init__(self, tabela):
+        self.canais = []
+        self.inicio = 0
+        self.primeiro_dia = None
+        self.acumulado = np.zeros((1, 0, 0), dtype='int32')
+        if tabela.empty:
+            return
+        dias = pd.to_datetime(tabela['Data']).to_numpy().astype('datetime64[D]')
+        codigos_canal, canais = pd.factorize(tabela['Canal de venda'], use_na_sentinel=False)
+        faixa = tabela['Faixa'].to_numpy().astype('int64')
+        self.canais = list(canais)
+        self.inicio = int(faixa.min())
+        self.primeiro_dia = dias.min()
+        posicao_dia = (dias - self.primeiro_dia).astype('int64')
+        contagens = np.zeros((posicao_dia.max() + 1, len(canais), faixa.max() - self.inicio + 1), dtype='int32')
+        np.add.at(contagens, (posicao_dia, codigos_canal, faixa - self.inicio), tabela['Pedidos'].to_numpy().astype('int32'))
+        # Linha 0 zerada: o período [i, j] é acumulado[j + 1] - acumulado[i].
+        self.acumulado = np.concatenate([np.zeros((1, *contagens.shape[1:]), dtype='int32'), contagens.cumsum(axis=0, dtype='int32')])
+
+    @property
+    def bytes(self):
+        return int(self.acumulado.nbytes)
+
+    @property
+    def dias(self):
+        return len(self.acumulado) - 1
+
+    def _posicao(self, data, padrao):
+        """Dias desde o primeiro dia do índice (negativo antes dele, >= dias depois do último)."""
+        if data is None or self.primeiro_dia is None:
+            return padrao
+        return int((np.datetime64(pd.Timestamp(data).date(), 'D') - self.primeiro_dia).astype('int64'))
+
+    def mesclar(self, data_inicial=None, data_final=None, canais=None):
+        """Sketch dos pedidos entre as datas (inclusive) nos `canais` (None = todos)."""
+        with telemetria.span('sketches.mesclar'):
+            # Período recortado aos dias do índice; fora dele (ou invertido) não há pedidos.
+            inicio = max(self._posicao(data_inicial, 0), 0)
+            fim = min(self._posicao(data_final, self.dias - 1), self.dias - 1) + 1
+            if fim <= inicio:
+                return SketchQuantis()
+            periodo = self.acumulado[fim] - self.acumulado[inicio]
+            if canais is not None:
+                selecionados = set(canais)
+                periodo = periodo[[i for i, canal in enumerate(self.canais) if canal in selecionados]]
+            return SketchQuantis(self.inicio, periodo.sum(axis=0, dtype='int64'))
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def obter_indice(versao_dados, _df_validos):
+    """
+    Índice da versão `versao_dados`: lido do snapshot 'vendas' quando ele é
+    dessa versão (gravado na carga), ou calculado a partir de `_df_validos`.
+    """
+    manifesto = snapshots.ler_manifesto('vendas')
+    tabela = None
+    if manifesto is not None and manifesto.get('versao_dados') == versao_dados and 'agg_sketch_total' in manifesto['tabelas']:
+        dfs, _ = snapshots.carregar_snapshot('vendas', tabelas=['agg_sketch_total'])
+        tabela = dfs['agg_sketch_total'] if dfs else None
+    origem = 'snapshot' if tabela is not None else 'calculado'
+    if tabela is None:
+        tabela = tabela_sketches(_df_validos)
+    indice = IndiceSketches(tabela)
+    telemetria.anotar('sketches_total', {'origem': origem, 'celulas': len(tabela), 'canais': len(indice.canais), 'mb': round(indice.bytes / (1024 * 1024), 2)})
+    return indice
+
+def sketch_do_filtro(filtro, df_validos):
+    """Sketch do valor dos pedidos no período e canais de um visoes.FiltroDashboard."""
+    return obter_indice(filtro.versao_dados, df_validos).mesclar(filtro.data_inicial, filtro.data_final, filtro.canais)
@@ -0,0 +1,103 @@
+# modules/snapshots.py
+import json
+import os
+import shutil
+import time
+import uuid
+
+import pandas as pd
+
+SNAPSHOT_DIR = 'data/snapshots'
+MANIFESTO = 'manifest.json'
+VERSOES_MANTIDAS = 2
+
+# --- SNAPSHOTS EM DISCO (PARQUET + MANIFESTO) ---
+# Estrutura: data/snapshots/<nome>/<id>/{<tabela>.parquet, manifest.json}
+# e data/snapshots/<nome>/ATUAL apontando para o último snapshot completo.
+
+def _pasta(nome):
+    return os.path.join(SNAPSHOT_DIR, nome)
+
+def _preparar_para_parquet(df):
+    """Colunas de texto com tipos misturados (ex.: CEP lido como número e texto) viram texto, preservando nulos."""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object and col != 'Data':
+            nao_nulos = df[col].notna()
+            df[col] = df[col].where(~nao_nulos, df[col].astype(str))
+    return df
+
+def salvar_snapshot(nome, tabelas, metadados=None):
+    """
+    Grava um snapshot versionado com uma tabela Parquet por DataFrame e um
+    manifesto JSON. A troca do ponteiro ATUAL só acontece depois que todos os
+    arquivos foram escritos, então um snapshot incompleto nunca é lido.
+    """
+    pasta = _pasta(nome)
+    snapshot_id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    destino = os.path.join(pasta, snapshot_id)
+    os.makedirs(destino, exist_ok=True)
+
+    arquivos = {}
+    for tabela, df in tabelas.items():
+        arquivo = f"{tabela}.parquet"
+        _preparar_para_parquet(df).to_parquet(os.path.join(destino, arquivo), index=False)
+        arquivos[tabela] = {'arquivo': arquivo, 'linhas': len(df), 'colunas': [str(c) for c in df.columns]}
+
+    manifesto = {'id': snapshot_id, 'criado_em': time.time(), 'tabelas': arquivos, **(metadados or {})}
+    with open(os.path.join(destino, MANIFESTO), 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2, default=str)
+
+    ponteiro_tmp = os.path.join(pasta, f"ATUAL.{snapshot_id}.tmp")
+    with open(ponteiro_tmp, 'w', encoding='utf-8') as f:
+        f.write(snapshot_id)
+    os.replace(ponteiro_tmp, os.path.join(pasta, 'ATUAL'))
+
+    _remover_antigos(pasta, manter=snapshot_id)
+    return manifesto
+
+def ler_manifesto(nome):
+    """Manifesto do snapshot atual, ou None se não houver snapshot."""
+    ponteiro = os.path.join(_pasta(nome), 'ATUAL')
+    try:
+        with open(ponteiro, encoding='utf-8') as f:
+            snapshot_id = f.read().strip()
+        with open(os.path.join(_pasta(nome), snapshot_id, MANIFESTO), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def caminho_tabela(nome, tabela):
+    """Caminho do Parquet de `tabela` no snapshot atual e o manifesto, ou (None, None)."""
+    manifesto = ler_manifesto(nome)
+    if manifesto is None or tabela not in manifesto['tabelas']:
+        return None, None
+    return os.path.join(_pasta(nome), manifesto['id'], manifesto['tabelas'][tabela]['arquivo']), manifesto
+
+def carregar_snapshot(nome, tabelas=None):
+    """
+    Lê o snapshot atual com memory-map. Retorna (dict de DataFrames, manifesto)
+    ou (None, None) se não houver snapshot válido.
+    """
+    manifesto = ler_manifesto(nome)
+    if manifesto is None:
+        return None, None
+    pasta = os.path.join(_pasta(nome), manifesto['id'])
+    nomes = tabelas or list(manifesto['tabelas'])
+    try:
+        dfs = {
+            tabela: pd.read_parquet(os.path.join(pasta, manifesto['tabelas'][tabela]['arquivo']), memory_map=True)
+            for tabela in nomes
+        }
+    except Exception as e:
+        print(f"Erro ao ler o snapshot '{nome}': {e}")
+        return None, None
+    return dfs, manifesto
+
+def _remover_antigos(pasta, manter):
+    snapshots = sorted(
+        d for d in os.listdir(pasta)
+        if os.path.isdir(os.path.join(pasta, d)) and d != manter
+    )
+    for antigo in snapshots[:max(len(snapshots) - (VERSOES_MANTIDAS - 1), 0)]:
+        shutil.rmtree(os.path.join(pasta, antigo), ignore_errors=True)
@@ -0,0 +1,210 @@
+# modules/telemetria.py
+import functools
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+JANELA_AMOSTRAS = 500
+# Sessões sem medição há mais que isso são consideradas encerradas.
+TTL_SESSAO_S = 30 * 60
+# Limites (ms) das faixas do histograma mostrado na página de desempenho.
+FAIXAS_HISTOGRAMA_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# --- SPANS ---
+# Cada span (ex.: 'sheets.ler_dados', 'visualization.criar_grafico_tendencia')
+# guarda as últimas JANELA_AMOSTRAS durações e tamanhos de payload, além dos
+# contadores desde o início do processo. Medir custa um perf_counter e um append.
+
+def _percentil(ordenados, p):
+    return ordenados[min(int(p * len(ordenados)), len(ordenados) - 1)] if ordenados else None
+
+class _Serie:
+    def __init__(self, janela):
+        self.duracoes_ms = deque(maxlen=janela)
+        self.payloads = deque(maxlen=janela)
+        self.chamadas = 0
+        self.erros = 0
+        self.total_ms = 0.0
+
+    def resumo(self):
+        duracoes = sorted(self.duracoes_ms)
+        payloads = sorted(self.payloads)
+        histograma = [0] * (len(FAIXAS_HISTOGRAMA_MS) + 1)
+        for duracao in duracoes:
+            histograma[next((i for i, limite in enumerate(FAIXAS_HISTOGRAMA_MS) if duracao <= limite), len(FAIXAS_HISTOGRAMA_MS))] += 1
+        return {
+            'chamadas': self.chamadas,
+            'erros': self.erros,
+            'total_ms': round(self.total_ms, 1),
+            'p50_ms': _percentil(duracoes, 0.50),
+            'p95_ms': _percentil(duracoes, 0.95),
+            'max_ms': duracoes[-1] if duracoes else None,
+            'amostras': len(duracoes),
+            'payload_p50_bytes': _percentil(payloads, 0.50),
+            'payload_p95_bytes': _percentil(payloads, 0.95),
+            'histograma': histograma,
+        }
+
+class Telemetria:
+    def __init__(self, janela=JANELA_AMOSTRAS):
+        self.janela = janela
+        self._series = {}
+        self._anotacoes = {}
+        self._sessoes = {}
+        self._lock = threading.Lock()
+        self.iniciada_em = time.time()
+
+    def _serie(self, nome):
+        serie = self._series.get(nome)
+        if serie is None:
+            serie = self._series.setdefault(nome, _Serie(self.janela))
+        return serie
+
+    def registrar(self, nome, duracao_s, bytes_payload=None, erro=False):
+        with self._lock:
+            serie = self._serie(nome)
+            duracao_ms = duracao_s * 1000
+            serie.chamadas += 1
+            serie.erros += int(erro)
+            serie.total_ms += duracao_ms
+            serie.duracoes_ms.append(round(duracao_ms, 3))
+            if bytes_payload is not None:
+                serie.payloads.append(int(bytes_payload))
+
+    def registrar_payload(self, nome, bytes_payload):
+        """Tamanho de payload sem duração (ex.: especificação de gráfico vinda do cache)."""
+        with self._lock:
+            self._serie(nome).payloads.append(int(bytes_payload))
+
+    def anotar(self, nome, valor):
+        """Guarda o último valor de uma medida pontual (ex.: memória dos dados após a carga)."""
+        with self._lock:
+            self._anotacoes[nome] = valor
+
+    def registrar_sessao(self, id_sessao, bytes_sessao):
+        with self._lock:
+            self._sessoes[id_sessao] = (int(bytes_sessao), time.time())
+
+    def resumo_sessoes(self):
+        """Bytes no session_state das sessões ativas (última medição de cada uma)."""
+        limite = time.time() - TTL_SESSAO_S
+        with self._lock:
+            for id_sessao in [s for s, (_, instante) in self._sessoes.items() if instante < limite]:
+                del self._sessoes[id_sessao]
+            tamanhos = [b for b, _ in self._sessoes.values()]
+        return {'sessoes': len(tamanhos), 'total_bytes': sum(tamanhos), 'maior_bytes': max(tamanhos, default=0)}
+
+    def resumo(self):
+        with self._lock:
+            return {nome: serie.resumo() for nome, serie in sorted(self._series.items())}
+
+    def anotacoes(self):
+        with self._lock:
+            return dict(self._anotacoes)
+
+    def limpar(self):
+        with self._lock:
+            self._series.clear()
+            self.iniciada_em = time.time()
+
+@st.cache_resource
+def obter_telemetria():
+    """Agregador único do processo, alimentado por todas as sessões e threads."""
+    return Telemetria()
+
+class _Medicao:
+    """Objeto do `with span(...)`: o bloco pode informar o tamanho do payload em `bytes`."""
+    __slots__ = ('bytes',)
+
+    def __init__(self, bytes_payload=None):
+        self.bytes = bytes_payload
+
+@contextmanager
+def span(nome, bytes_payload=None):
+    """Mede o bloco e registra no span `nome`; exceções contam como erro e seguem adiante."""
+    medicao = _Medicao(bytes_payload)
+    inicio = time.perf_counter()
+    erro = False
+    try:
+        yield medicao
+    except BaseException:
+        erro = True
+        raise
+    finally:
+        obter_telemetria().registrar(nome, time.perf_counter() - inicio, medicao.bytes, erro)
+
+def cronometrar(nome=None):
+    """Decorador: cada chamada da função vira uma amostra do span (padrão: 'modulo.funcao')."""
+    def decorar(funcao):
+        nome_span = nome or f"{funcao.__module__.rsplit('.', 1)[-1]}.{funcao.__name__}"
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with span(nome_span):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorar
+
+def registrar_payload(nome, bytes_payload):
+    obter_telemetria().registrar_payload(nome, bytes_payload)
+
+def anotar(nome, valor):
+    obter_telemetria().anotar(nome, valor)
+
+def registrar_sessao(id_sessao, bytes_sessao):
+    obter_telemetria().registrar_sessao(id_sessao, bytes_sessao)
+
+def tamanho_dataframe(df):
+    """Bytes ocupados pelo DataFrame (sem inspecionar cada string, que seria caro no caminho quente)."""
+    return int(df.memory_usage(index=True, deep=False).sum()) if df is not None else 0
+
+def tamanho_objeto(valor):
+    """Bytes aproximados de um valor guardado na sessão (DataFrames com o conteúdo das strings)."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(index=True, deep=True)
+        return int(uso.sum() if isinstance(valor, pd.DataFrame) else uso)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_objeto(k) + tamanho_objeto(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple, set)):
+        return sys.getsizeof(valor) + sum(tamanho_objeto(v) for v in valor)
+    if hasattr(valor, '__dict__'):
+        return sys.getsizeof(valor) + tamanho_objeto(vars(valor))
+    return sys.getsizeof(valor)
+
+# --- CACHES ---
+
+def _taxa(acertos, falhas):
+    consultas = acertos + falhas
+    return acertos / consultas if consultas else 0.0
+
+def estatisticas_caches():
+    """Acertos, falhas e taxa de acerto dos caches compartilhados."""
+    from . import cache_graficos, cache_respostas, oraculo_ferramentas, oraculo_handler
+    caches = {'graficos': cache_graficos.obter_cache().estatisticas(), 'respostas_ia': cache_respostas.obter_cache_respostas().estatisticas()}
+    for nome, cache in (('contextos_ia', oraculo_handler._cache_contextos()), ('ferramentas_ia', oraculo_ferramentas._cache_resultados())):
+        caches[nome] = {'itens': len(cache._itens), 'acertos': cache.acertos, 'falhas': cache.falhas, 'taxa_acerto': _taxa(cache.acertos, cache.falhas)}
+    return caches
+
+def instantaneo():
+    """Tudo o que a página de desempenho mostra, serializável em JSON."""
+    from . import importacao_preguicosa, llm_client, registro_cache
+    telemetria = obter_telemetria()
+    return {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'desde': datetime.fromtimestamp(telemetria.iniciada_em).isoformat(timespec='seconds'),
+        'janela_amostras': telemetria.janela,
+        'faixas_histograma_ms': list(FAIXAS_HISTOGRAMA_MS),
+        'spans': telemetria.resumo(),
+        'anotacoes': telemetria.anotacoes(),
+        'sessoes': telemetria.resumo_sessoes(),
+        'caches': estatisticas_caches(),
+        'llm': llm_client.estatisticas(),
+        'registro_cache': registro_cache.obter_registro().estatisticas(),
+        'importacoes': importacao_preguicosa.relatorio(),
+    }
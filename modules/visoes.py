@@ -0,0 +1,94 @@
+# modules/visoes.py
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from . import data_handler, telemetria
+
+# --- FILTROS DA SESSÃO ---
+# A sessão guarda só a descrição do filtro (datas, canais e a versão dos dados
+# em que foi feito). Os DataFrames ficam no snapshot compartilhado por todas as
+# sessões e as visões filtradas são montadas quando alguém precisa delas.
+
+CHAVE_FILTRO = 'filtro_dashboard'
+
+@dataclass(frozen=True)
+class FiltroDashboard:
+    """Filtro da página principal. `canais` None = todos os canais."""
+    versao_dados: str
+    data_inicial: date
+    data_final: date
+    canais: tuple = None
+
+def guardar_filtro(filtro):
+    st.session_state[CHAVE_FILTRO] = filtro
+
+def filtro_da_sessao():
+    """Último filtro aplicado na página principal por esta sessão (None se ainda não houver)."""
+    return st.session_state.get(CHAVE_FILTRO)
+
+# --- VISÕES SOBRE O DATASET COMPARTILHADO ---
+
+def fatia_por_data(df, data_inicial, data_final):
+    """
+    Linhas com Data entre as duas datas (inclusive). Nos DataFrames compactados,
+    ordenados por Data, é um recorte contínuo (iloc) que não copia as colunas;
+    nos demais, cai no filtro por máscara.
+    """
+    if df.empty:
+        return df
+    if df.attrs.get('ordenado_por') != 'Data':
+        return df[(df['Data'] >= data_inicial) & (df['Data'] <= data_final)]
+    datas = df['Data'].to_numpy()
+    # Datas nulas ficam no fim: a busca binária olha só o trecho com data.
+    com_data = int(pd.notna(datas).sum()) if pd.isna(datas[-1]) else len(datas)
+    inicio = np.searchsorted(datas[:com_data], data_inicial, side='left')
+    fim = np.searchsorted(datas[:com_data], data_final, side='right')
+    return df.iloc[inicio:max(inicio, fim)]
+
+def _filtrar_canais(df, canais):
+    if canais is None or df.empty:
+        return df
+    coluna = df['Canal de venda']
+    if isinstance(coluna.dtype, pd.CategoricalDtype) and not coluna.hasnans and set(canais) >= set(coluna.cat.categories):
+        return df  # Todos os canais selecionados: a fatia por data já é a visão.
+    return df[coluna.isin(canais)]
+
+def aplicar_filtro(filtro, df_validos, df_cancelados):
+    """(validos, cancelados) do filtro; os cancelados não dependem do filtro de canal."""
+    df_filtrado = _filtrar_canais(fatia_por_data(df_validos, filtro.data_inicial, filtro.data_final), filtro.canais)
+    df_cancelados_filtrado = fatia_por_data(df_cancelados, filtro.data_inicial, filtro.data_final) if not df_cancelados.empty else pd.DataFrame()
+    return df_filtrado, df_cancelados_filtrado
+
+def visao_da_sessao():
+    """
+    (validos, cancelados, filtro) do filtro guardado na sessão, montados sobre
+    o snapshot compartilhado atual. Se os dados mudaram desde o filtro, o mesmo
+    recorte é aplicado à versão nova (o filtro devolvido traz a versão usada).
+    Retorna None se a sessão ainda não filtrou nada.
+    """
+    filtro = filtro_da_sessao()
+    if filtro is None:
+        return None
+    df_validos, df_cancelados, versao_dados = data_handler.obter_dados_dashboard()
+    if versao_dados != filtro.versao_dados:
+        filtro = FiltroDashboard(versao_dados, filtro.data_inicial, filtro.data_final, filtro.canais)
+    return (*aplicar_filtro(filtro, df_validos, df_cancelados), filtro)
+
+# --- MEMÓRIA DA SESSÃO ---
+
+def medir_sessao():
+    """Mede o session_state desta sessão e registra na telemetria. Retorna os bytes."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        contexto = get_script_run_ctx()
+    except Exception:
+        contexto = None
+    if contexto is None:
+        return 0
+    bytes_sessao = sum(telemetria.tamanho_objeto(valor) for valor in st.session_state.to_dict().values())
+    telemetria.registrar_sessao(contexto.session_id, bytes_sessao)
+    return bytes_sessao
@@ -1,12 +1,17 @@
 # modules/visualization.py
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import plotly.figure_factory as ff
 import textwrap
-import altair as alt
+import json
 import os
+from . import agregacoes, cache_graficos, sketches, telemetria
+from .importacao_preguicosa import modulo
+
+# Backends de gráfico carregados só quando um gráfico precisa ser construído
+# (especificações vindas do cache de gráficos não precisam deles).
+px = modulo('plotly.express')
+go = modulo('plotly.graph_objects')
+alt = modulo('altair')
 
 def aplicar_css_local(caminho_arquivo):
     try:
@@ -19,6 +24,18 @@ def formatar_moeda(valor):
     if valor is None: return "R$ 0,00"
     return f"R$ {valor:,.2f}".replace(",", "v").replace(".", ",").replace("v", ".")
 
+def _agregar(df, consulta, agregacao, *args):
+    """Agregação no motor SQL, quando a página passa uma consulta ligada aos filtros, ou em pandas sobre o df filtrado."""
+    if consulta is not None:
+        return consulta.executar(agregacao, *args)
+    return agregacoes.AGREGACOES[agregacao](df, *args)
+
+def _spec_plotly(fig):
+    return json.loads(fig.to_json())
+
+def _spec_altair(chart):
+    return json.loads(chart.to_json())
+
 def criar_card(label, valor, icone_html, delta_text=None):
     delta_html = ""
     if delta_text is not None:
@@ -32,6 +49,7 @@ def criar_card(label, valor, icone_html, delta_text=None):
     card_html = f"""<div class="metric-card" style="min-height: 130px;"><div class="metric-label"><span class="metric-icon">{icone_html}</span><span>{label}</span></div><div class="metric-value">{valor}</div>{delta_html}</div>"""
     st.markdown(card_html, unsafe_allow_html=True)
 
+@telemetria.cronometrar()
 def criar_cards_resumo(df):
     if df.empty: return
     faturamento_sem_taxas = df['Total'].sum() - df['Total taxa de serviço'].sum()
@@ -42,6 +60,7 @@ def criar_cards_resumo(df):
     with col2: criar_card("Total em Taxas", formatar_moeda(total_taxas), "<i class='bi bi-receipt'></i>")
     with col3: criar_card("Faturamento Geral", formatar_moeda(total_geral), "<i class='bi bi-graph-up-arrow'></i>")
 
+@telemetria.cronometrar()
 def criar_cards_delivery_resumo(df_delivery_filtrado, df_delivery_total):
     if df_delivery_filtrado.empty: return
     qtd_entregas = len(df_delivery_filtrado)
@@ -59,6 +78,7 @@ def criar_cards_delivery_resumo(df_delivery_filtrado, df_delivery_total):
     with col3: criar_card("Ticket Médio Delivery", formatar_moeda(ticket_medio_delivery), "<i class='bi bi-tag-fill'></i>")
     with col4: criar_card(label="Pedidos/Dia vs Média", valor=f"{media_pedidos_diaria_filtro:.1f}", icone_html="<i class='bi bi-speedometer2'></i>", delta_text=f"{delta_pedidos_percent:.2f}%")
 
+@telemetria.cronometrar()
 def criar_cards_dias_semana(df):
     if df.empty: return
     st.markdown("#### <i class='bi bi-calendar-week'></i> Análise por Dia da Semana", unsafe_allow_html=True)
@@ -83,33 +103,38 @@ def criar_cards_dias_semana(df):
                 card_html = textwrap.dedent(f"""<div class="metric-card" style="min-height: 230px;"><p class="metric-label" style="font-size: 1.1rem;">{nome_dia_semana}</p><p class="metric-value">{formatar_moeda(ticket_medio)}</p><p class="metric-label" style="font-size: 0.8rem; margin-bottom: 8px;">Ticket Médio</p><hr class="metric-divider"><p class="secondary-metric">Pedidos/Dia: <b>{media_pedidos_dia:.1f}</b></p><p class="secondary-metric">Horário Pico: <b>{horario_pico_str}</b></p><p class="secondary-metric">Média Pico: <b>{formatar_moeda(valor_medio_pico)}</b></p></div>""")
             st.markdown(card_html, unsafe_allow_html=True)
 
-def criar_grafico_tendencia(df):
-    if df.empty or len(df.groupby('Data')) < 2: st.info("É necessário ter pelo menos dois dias de dados para mostrar uma tendência."); return
+@telemetria.cronometrar()
+def criar_grafico_tendencia(df, chave=None, consulta=None):
+    if df.empty or df['Data'].nunique() < 2: st.info("É necessário ter pelo menos dois dias de dados para mostrar uma tendência."); return
     st.markdown("##### <i class='bi bi-graph-up'></i> Tendência do Faturamento Diário", unsafe_allow_html=True)
-    daily_revenue = df.groupby(pd.to_datetime(df['Data']))['Total'].sum().reset_index().sort_values(by='Data')
-    daily_revenue['diff'] = daily_revenue['Total'].diff()
-    fig = go.Figure()
-    for i in range(1, len(daily_revenue)):
-        color = "#2E8B57" if daily_revenue['diff'].iloc[i] >= 0 else "#CD5C5C"
-        fig.add_trace(go.Scatter(x=daily_revenue['Data'].iloc[i-1:i+1], y=daily_revenue['Total'].iloc[i-1:i+1], mode='lines', line=dict(color=color, width=3), hoverinfo='skip'))
-    fig.add_trace(go.Scatter(x=daily_revenue['Data'], y=daily_revenue['Total'], mode='markers', marker=dict(color='#FAFAFA', size=6, line=dict(color='#333', width=1)), hoverinfo='text', text=[f"Data: {d.strftime('%d/%m/%Y')}<br>Faturamento: {formatar_moeda(v)}" for d, v in zip(daily_revenue['Data'], daily_revenue['Total'])]))
-    fig.update_layout(template="streamlit", showlegend=False, yaxis_title="Faturamento (R$)", xaxis_title="Data", margin=dict(l=20, r=20, t=20, b=20), plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', height=350)
-    st.plotly_chart(fig, use_container_width=True)
-
-def criar_grafico_barras_horarios(df):
+    def construir():
+        daily_revenue = _agregar(df, consulta, 'faturamento_diario')
+        daily_revenue['diff'] = daily_revenue['Total'].diff()
+        fig = go.Figure()
+        for i in range(1, len(daily_revenue)):
+            color = "#2E8B57" if daily_revenue['diff'].iloc[i] >= 0 else "#CD5C5C"
+            fig.add_trace(go.Scatter(x=daily_revenue['Data'].iloc[i-1:i+1], y=daily_revenue['Total'].iloc[i-1:i+1], mode='lines', line=dict(color=color, width=3), hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=daily_revenue['Data'], y=daily_revenue['Total'], mode='markers', marker=dict(color='#FAFAFA', size=6, line=dict(color='#333', width=1)), hoverinfo='text', text=[f"Data: {d.strftime('%d/%m/%Y')}<br>Faturamento: {formatar_moeda(v)}" for d, v in zip(daily_revenue['Data'], daily_revenue['Total'])]))
+        fig.update_layout(template="streamlit", showlegend=False, yaxis_title="Faturamento (R$)", xaxis_title="Data", margin=dict(l=20, r=20, t=20, b=20), plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', height=350)
+        return _spec_plotly(fig)
+    st.plotly_chart(cache_graficos.em_cache('tendencia', chave, construir), use_container_width=True)
+
+@telemetria.cronometrar()
+def criar_grafico_barras_horarios(df, chave=None, consulta=None):
     if df.empty: return
     st.markdown("##### <i class='bi bi-clock-history'></i> Performance por Hora", unsafe_allow_html=True)
-    hourly_summary = df.groupby('Hora').agg(Num_Pedidos=('Pedido', 'count'), Faturamento_Total=('Total', 'sum')).reset_index()
-    horas_template = pd.DataFrame({'Hora': range(24)})
-    hourly_summary = pd.merge(horas_template, hourly_summary, on='Hora', how='left').fillna(0)
-    hourly_summary['Ticket_Medio'] = hourly_summary.apply(lambda row: row['Faturamento_Total'] / row['Num_Pedidos'] if row['Num_Pedidos'] > 0 else 0, axis=1)
-    chart = alt.Chart(hourly_summary).mark_bar(cornerRadiusTopLeft=3, cornerRadiusTopRight=3).encode(x=alt.X('Hora:O', title='Hora do Dia', axis=alt.Axis(labelAngle=0)), y=alt.Y('Num_Pedidos:Q', title='Número de Pedidos'), color=alt.Color('Num_Pedidos:Q', scale=alt.Scale(scheme='blues'), legend=None), tooltip=[alt.Tooltip('Hora:N', title='Hora do Dia'), alt.Tooltip('Num_Pedidos:Q', title='Nº de Pedidos'), alt.Tooltip('Faturamento_Total:Q', title='Faturamento', format='$.2f'), alt.Tooltip('Ticket_Medio:Q', title='Ticket Médio', format='$.2f')]).configure_axis(grid=False).configure_view(strokeWidth=0)
-    st.altair_chart(chart, use_container_width=True)
+    def construir():
+        hourly_summary = _agregar(df, consulta, 'resumo_por_hora')
+        chart = alt.Chart(hourly_summary).mark_bar(cornerRadiusTopLeft=3, cornerRadiusTopRight=3).encode(x=alt.X('Hora:O', title='Hora do Dia', axis=alt.Axis(labelAngle=0)), y=alt.Y('Num_Pedidos:Q', title='Número de Pedidos'), color=alt.Color('Num_Pedidos:Q', scale=alt.Scale(scheme='blues'), legend=None), tooltip=[alt.Tooltip('Hora:N', title='Hora do Dia'), alt.Tooltip('Num_Pedidos:Q', title='Nº de Pedidos'), alt.Tooltip('Faturamento_Total:Q', title='Faturamento', format='$.2f'), alt.Tooltip('Ticket_Medio:Q', title='Ticket Médio', format='$.2f')]).configure_axis(grid=False).configure_view(strokeWidth=0)
+        return _spec_altair(chart)
+    st.vega_lite_chart(cache_graficos.em_cache('barras_horarios', chave, construir), use_container_width=True)
 
+@telemetria.cronometrar()
 def criar_top_bairros_delivery(df_delivery_filtrado, df_delivery_total):
     if df_delivery_filtrado.empty: return
     st.markdown("#### <i class='bi bi-geo-alt-fill'></i> Top Bairros por Nº de Entregas", unsafe_allow_html=True)
-    top_bairros = df_delivery_filtrado['Bairro'].value_counts().nlargest(3).index.tolist()
+    contagem_bairros = df_delivery_filtrado['Bairro'].value_counts()
+    top_bairros = contagem_bairros[contagem_bairros > 0].nlargest(3).index.tolist()
     if not top_bairros: st.info("Não há informações de bairro suficientes para gerar o top 3."); return
     cols = st.columns(3)
     for i, bairro_nome in enumerate(top_bairros):
@@ -129,16 +154,19 @@ def criar_top_bairros_delivery(df_delivery_filtrado, df_delivery_total):
             card_html = textwrap.dedent(f"""<div class="metric-card" style="min-height: 230px;"><p class="metric-label" style="font-size: 1.1rem;">{i+1}º - {bairro_nome}</p><p class="metric-value">{pedidos_bairro}</p><p class="metric-label" style="font-size: 0.8rem; margin-bottom: 8px;">Nº de Pedidos</p>{delta_html}<hr class="metric-divider"><p class="secondary-metric">Faturamento: <b>{formatar_moeda(faturamento_bairro)}</b></p><p class="secondary-metric">Ticket Médio: <b>{formatar_moeda(ticket_medio_bairro)}</b></p><p class="secondary-metric">Total Taxas: <b>{formatar_moeda(total_taxa_entrega)}</b></p></div>""")
             st.markdown(card_html, unsafe_allow_html=True)
 
+@telemetria.cronometrar()
 def criar_mapa_de_calor(df_delivery, df_cache_cep):
     st.markdown("#### <i class='bi bi-map-fill'></i> Concentração de Entregas", unsafe_allow_html=True)
     if df_cache_cep.empty: st.warning("O arquivo de cache de CEPs está vazio."); return
-    df_delivery['CEP'] = df_delivery['CEP'].astype(str); df_cache_cep['cep'] = df_cache_cep['cep'].astype(str)
-    df_mapa = pd.merge(df_delivery, df_cache_cep, left_on='CEP', right_on='cep', how='left').dropna(subset=['lat', 'lon'])
+    # O cache de CEPs é compartilhado entre sessões: não alterar o DataFrame recebido.
+    # O CEP fica em memória como número: volta a ter 8 dígitos para casar com o cache.
+    df_mapa = pd.merge(df_delivery[['CEP']].astype(str).apply(lambda s: s.str.zfill(8)), df_cache_cep.astype({'cep': str}), left_on='CEP', right_on='cep', how='left').dropna(subset=['lat', 'lon'])
     if df_mapa.empty: st.warning("Nenhum CEP dos pedidos foi encontrado no cache."); return
     df_mapa_final = df_mapa[['lat', 'lon']].copy()
     df_mapa_final['lat'] = pd.to_numeric(df_mapa_final['lat']); df_mapa_final['lon'] = pd.to_numeric(df_mapa_final['lon'])
     st.map(df_mapa_final, zoom=11)
 
+@telemetria.cronometrar()
 def criar_cards_cancelamento_resumo(df_cancelados, df_validos):
     num_cancelados = len(df_cancelados); num_validos = len(df_validos); total_pedidos = num_validos + num_cancelados
     valor_perdido = pd.to_numeric(df_cancelados['Total'], errors='coerce').sum()
@@ -148,48 +176,60 @@ def criar_cards_cancelamento_resumo(df_cancelados, df_validos):
     with col2: st.metric("Valor Perdido", formatar_moeda(valor_perdido))
     with col3: st.metric("Taxa de Cancelamento", f"{taxa_cancelamento:.2f}%")
 
-def criar_grafico_motivos_cancelamento(df_cancelados):
+@telemetria.cronometrar()
+def criar_grafico_motivos_cancelamento(df_cancelados, chave=None, consulta=None):
     if df_cancelados.empty or 'Motivo de cancelamento' not in df_cancelados.columns: return
     st.markdown("##### <i class='bi bi-question-circle'></i> Principais Motivos de Cancelamento", unsafe_allow_html=True)
-    motivos = df_cancelados['Motivo de cancelamento'].value_counts().reset_index(); motivos.columns = ['Motivo', 'Contagem']
-    chart = alt.Chart(motivos).mark_bar().encode(y=alt.Y('Motivo:N', title='Motivo', sort='-x'), x=alt.X('Contagem:Q', title='Número de Ocorrências'), tooltip=['Motivo', 'Contagem']).properties(height=300)
-    st.altair_chart(chart, use_container_width=True)
-
-def criar_grafico_cancelamentos_por_hora(df_cancelados):
+    def construir():
+        motivos = _agregar(df_cancelados, consulta, 'contagem_por', 'Motivo de cancelamento', 'Motivo')
+        chart = alt.Chart(motivos).mark_bar().encode(y=alt.Y('Motivo:N', title='Motivo', sort='-x'), x=alt.X('Contagem:Q', title='Número de Ocorrências'), tooltip=['Motivo', 'Contagem']).properties(height=300)
+        return _spec_altair(chart)
+    st.vega_lite_chart(cache_graficos.em_cache('motivos_cancelamento', chave, construir), use_container_width=True)
+
+@telemetria.cronometrar()
+def criar_grafico_cancelamentos_por_hora(df_cancelados, chave=None, consulta=None):
     if df_cancelados.empty: return
     st.markdown("##### <i class='bi bi-clock'></i> Cancelamentos por Hora", unsafe_allow_html=True)
-    df_cancelados['Hora'] = pd.to_numeric(df_cancelados['Hora'], errors='coerce')
-    hourly_cancel = df_cancelados.groupby('Hora').size().reset_index(name='Contagem')
-    horas_template = pd.DataFrame({'Hora': range(24)})
-    hourly_cancel = pd.merge(horas_template, hourly_cancel, on='Hora', how='left').fillna(0)
-    chart = alt.Chart(hourly_cancel).mark_bar(color="#CD5C5C").encode(x=alt.X('Hora:O', title='Hora do Dia'), y=alt.Y('Contagem:Q', title='Nº de Cancelamentos'), tooltip=['Hora', 'Contagem']).properties(height=300)
-    st.altair_chart(chart, use_container_width=True)
-
-def criar_donut_cancelamentos_por_canal(df_cancelados):
+    def construir():
+        hourly_cancel = _agregar(df_cancelados, consulta, 'cancelamentos_por_hora')
+        chart = alt.Chart(hourly_cancel).mark_bar(color="#CD5C5C").encode(x=alt.X('Hora:O', title='Hora do Dia'), y=alt.Y('Contagem:Q', title='Nº de Cancelamentos'), tooltip=['Hora', 'Contagem']).properties(height=300)
+        return _spec_altair(chart)
+    st.vega_lite_chart(cache_graficos.em_cache('cancelamentos_por_hora', chave, construir), use_container_width=True)
+
+@telemetria.cronometrar()
+def criar_donut_cancelamentos_por_canal(df_cancelados, chave=None, consulta=None):
     if df_cancelados.empty or 'Canal de venda' not in df_cancelados.columns: return
     st.markdown("##### <i class='bi bi-pie-chart-fill'></i> Divisão por Canal de Venda", unsafe_allow_html=True)
-    canal_counts = df_cancelados['Canal de venda'].value_counts().reset_index(); canal_counts.columns = ['Canal', 'Contagem']
-    chart = alt.Chart(canal_counts).mark_arc(innerRadius=80).encode(theta=alt.Theta(field="Contagem", type="quantitative"), color=alt.Color(field="Canal", type="nominal", title="Canal"), tooltip=['Canal', 'Contagem']).properties(height=300)
-    st.altair_chart(chart, use_container_width=True)
+    def construir():
+        canal_counts = _agregar(df_cancelados, consulta, 'contagem_por', 'Canal de venda', 'Canal')
+        chart = alt.Chart(canal_counts).mark_arc(innerRadius=80).encode(theta=alt.Theta(field="Contagem", type="quantitative"), color=alt.Color(field="Canal", type="nominal", title="Canal"), tooltip=['Canal', 'Contagem']).properties(height=300)
+        return _spec_altair(chart)
+    st.vega_lite_chart(cache_graficos.em_cache('donut_cancelamentos_canal', chave, construir), use_container_width=True)
     
-def criar_donut_e_resumo_canais(df):
+@telemetria.cronometrar()
+def criar_donut_e_resumo_canais(df, chave=None, consulta=None):
     if df.empty:
         st.info("Não há dados para exibir na análise de canais."); return
     st.markdown("#### <i class='bi bi-pie-chart-fill'></i> Análise por Canal de Venda", unsafe_allow_html=True)
-    col1, col2 = st.columns([1, 1])
-    with col1:
-        df_canal = df.groupby('Canal de venda').agg(Faturamento=('Total', 'sum'), Pedidos=('Pedido', 'count')).reset_index()
-        df_canal['Ticket Medio'] = df_canal.apply(lambda r: r['Faturamento']/r['Pedidos'] if r['Pedidos']>0 else 0, axis=1)
+    def construir():
+        df_canal = _agregar(df, consulta, 'resumo_por_canal')
         df_canal['Faturamento Formatado'] = df_canal['Faturamento'].apply(formatar_moeda)
         df_canal['Ticket Medio Formatado'] = df_canal['Ticket Medio'].apply(formatar_moeda)
         chart = alt.Chart(df_canal).mark_arc(innerRadius=80, outerRadius=120).encode(theta=alt.Theta(field="Faturamento", type="quantitative", stack=True), color=alt.Color(field="Canal de venda", type="nominal", legend=alt.Legend(title="Canais de Venda")), tooltip=[alt.Tooltip('Canal de venda', title='Canal'), alt.Tooltip('Faturamento Formatado', title='Faturamento'), alt.Tooltip('Pedidos', title='Nº de Pedidos'), alt.Tooltip('Ticket Medio Formatado', title='Ticket Médio')])
-        st.altair_chart(chart, use_container_width=True)
+        df_canal_sorted = df_canal.sort_values(by="Faturamento", ascending=False)
+        return {
+            'grafico': _spec_altair(chart),
+            'ticket_medio_geral': float(df['Total'].sum() / len(df)) if len(df) > 0 else 0.0,
+            'canais': [[str(c), float(tm)] for c, tm in zip(df_canal_sorted['Canal de venda'], df_canal_sorted['Ticket Medio'])],
+        }
+    spec = cache_graficos.em_cache('donut_canais', chave, construir)
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        st.vega_lite_chart(spec['grafico'], use_container_width=True)
     with col2:
         st.markdown("###### Insights sobre os Canais")
-        ticket_medio_geral = df['Total'].sum() / len(df) if len(df) > 0 else 0
-        df_canal_sorted = df_canal.sort_values(by="Faturamento", ascending=False)
-        for index, row in df_canal_sorted.iterrows():
-            canal = row['Canal de venda']; tm_canal = row['Ticket Medio']
+        ticket_medio_geral = spec['ticket_medio_geral']
+        for canal, tm_canal in spec['canais']:
             if tm_canal > ticket_medio_geral * 1.02: status_cor = "green"; status_texto = "Acima da média"
             elif tm_canal < ticket_medio_geral * 0.98: status_cor = "red"; status_texto = "Abaixo da média"
             else: status_cor = "orange"; status_texto = "Na média"
@@ -199,25 +239,21 @@ def criar_donut_e_resumo_canais(df):
             with insight_cols[1]:
                 st.badge(status_texto, color=status_cor)
 
-def criar_distplot_e_analise(df):
+@telemetria.cronometrar()
+def criar_distplot_e_analise(df, chave=None, consulta=None, sketch=None):
+    """`sketch`: SketchQuantis do período filtrado (sketches.sketch_do_filtro); sem ele, é montado a partir de df."""
     st.markdown("#### <i class='bi bi-distribute-vertical'></i> Análise de Distribuição de Valores", unsafe_allow_html=True)
     if df.empty:
         st.info("Não há dados para a análise de dispersão."); return
 
-    col1, col2 = st.columns([1, 1])
-    with col1:
-        df['Data'] = pd.to_datetime(df['Data'])
-
+    def construir():
         # Agrupar por data: soma dos totais por dia
-        df_totais_por_data = df.groupby('Data')['Total'].sum().reset_index()
+        df_totais_por_data = _agregar(df, consulta, 'faturamento_diario')
 
-        # Calcular outliers: valores > Q3 + 1.5 * IQR
-        Q1 = df['Total'].quantile(0.25)
-        Q3 = df['Total'].quantile(0.75)
-        IQR = Q3 - Q1
-        limite_superior = Q3 + 1.5 * IQR
-        df_outliers = df[df['Total'] > limite_superior]
-        df_outliers_agrupado = df_outliers.groupby('Data')['Total'].sum().reset_index()
+        # Outliers: valores > Q3 + 1.5 * IQR, com os quartis tirados do sketch do período
+        resumo = sketch if sketch is not None else sketches.SketchQuantis.de_valores(df['Total'])
+        limite_superior = resumo.limite_outliers()
+        df_outliers_agrupado = _agregar(df, consulta, 'outliers_por_dia', limite_superior)
 
         fig = go.Figure()
 
@@ -253,67 +289,124 @@ def criar_distplot_e_analise(df):
             margin=dict(l=20, r=20, t=40, b=20)
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        # Histograma do valor dos pedidos, com as faixas do sketch
+        faixas = resumo.histograma()
+        fig_histograma = go.Figure(go.Bar(
+            x=(faixas['Inicio'] + faixas['Fim']) / 2,
+            y=faixas['Pedidos'],
+            width=faixas['Fim'] - faixas['Inicio'],
+            marker_color='rgba(0,123,255,0.6)',
+            hovertemplate='R$ %{x:.2f}: %{y} pedidos<extra></extra>'
+        ))
+        fig_histograma.add_vline(x=limite_superior, line=dict(color='red', dash='dash'))
+        fig_histograma.update_layout(
+            template="streamlit",
+            xaxis_title="Valor do Pedido (R$)",
+            yaxis_title="Pedidos",
+            height=220,
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            margin=dict(l=20, r=20, t=20, b=20)
+        )
+
+        top_outliers = _agregar(df, consulta, 'maiores_outliers', limite_superior, 5)
+        return {
+            'grafico': _spec_plotly(fig),
+            'histograma': _spec_plotly(fig_histograma),
+            'percentis': [float(v) for v in resumo.quantis([0.5, 0.9, 0.99])],
+            'erro_relativo': resumo.erro_relativo,
+            'outliers': [
+                [float(row['Total']), pd.to_datetime(row['Data']).strftime('%d/%m'), str(row['Canal de venda'])]
+                for _, row in top_outliers.iterrows()
+            ],
+        }
+
+    spec = cache_graficos.em_cache('distplot', chave, construir)
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        st.plotly_chart(spec['grafico'], use_container_width=True)
 
     with col2:
         st.markdown("###### O que este gráfico significa?")
         st.markdown("O gráfico mostra a **evolução diária do faturamento total**. A área azul representa os valores somados por dia. A linha vermelha em destaque representa os dias que tiveram **valores atípicos (outliers)**, ou seja, muito acima da média.")
 
-        if not df_outliers.empty:
+        p50, p90, p99 = spec['percentis']
+        st.markdown("###### Valor dos Pedidos")
+        st.markdown(f"Mediana **{formatar_moeda(p50)}** · 90% até **{formatar_moeda(p90)}** · 99% até **{formatar_moeda(p99)}**")
+        st.caption(f"Percentis estimados com erro de até {spec['erro_relativo']:.0%} do valor. A linha vermelha marca o limite dos valores atípicos.")
+        st.plotly_chart(spec['histograma'], use_container_width=True)
+
+        if spec['outliers']:
             st.markdown("###### Pedidos com Valores Atípicos (Acima)")
-            for index, row in df_outliers.sort_values(by='Total', ascending=False).head(5).iterrows():
-                data_formatada = pd.to_datetime(row['Data']).strftime('%d/%m')
-                st.markdown(f" • **{formatar_moeda(row['Total'])}** em {data_formatada} ({row['Canal de venda']})")
+            for total, data_formatada, canal in spec['outliers']:
+                st.markdown(f" • **{formatar_moeda(total)}** em {data_formatada} ({canal})")
         else:
             st.text("Nenhum pedido com valor muito acima da média foi detectado no período.")
 
 
 
-def criar_tabela_canais_com_linha_do_tempo(df):
+@telemetria.cronometrar()
+def criar_tabela_canais_com_linha_do_tempo(df, chave=None, consulta=None):
     if df.empty or 'Canal de venda' not in df.columns or 'Data' not in df.columns or 'Total' not in df.columns:
         st.info("Não há dados suficientes para gerar a tabela de canais com linha do tempo.")
         return
 
-    df_temp = (
-        df.groupby(['Canal de venda', 'Data'])['Total']
-        .sum()
-        .reset_index()
-    )
+    def construir():
+        df_temp = _agregar(df, consulta, 'canais_por_dia')
+
+        df_temp['Data'] = pd.to_datetime(df_temp['Data']).dt.date
+
+        canais = df_temp['Canal de venda'].unique()
+        data_inicial = df_temp['Data'].min()
+        data_final = df_temp['Data'].max()
+        datas = pd.date_range(data_inicial, data_final)
+
+        linhas = []
+        todos_valores = []
+
+        for canal in canais:
+            df_canal = df_temp[df_temp['Canal de venda'] == canal]
+            total = df_canal['Total'].sum()
+            serie = []
+            for data in datas:
+                data_atual = data.date()
+                valor = df_canal[df_canal['Data'] == data_atual]['Total'].sum()
+                serie.append(round(float(valor), 2))
+                todos_valores.append(valor)
+            linhas.append({
+                "Canal": str(canal),
+                "Faturamento": float(total),
+                "Faturamento Formatado": formatar_moeda(total),
+                "Linha do Tempo": serie
+            })
+
+        if not todos_valores:
+            return None
+
+        y_max = float(max(todos_valores) * 1.1) if max(todos_valores) > 0 else 1
+        linhas.sort(key=lambda linha: linha['Faturamento'], reverse=True)
+
+        fig_pizza = px.pie(
+            pd.DataFrame(linhas),
+            names="Canal",
+            values="Faturamento",
+            hole=0.4,
+            color_discrete_sequence=px.colors.qualitative.Set3
+        )
+        fig_pizza.update_layout(
+            title="Participação por Canal",
+            height=350,
+            margin=dict(t=50, b=20, l=20, r=20),
+            showlegend=True
+        )
+        return {'linhas': linhas, 'y_max': y_max, 'pizza': _spec_plotly(fig_pizza)}
 
-    df_temp['Data'] = pd.to_datetime(df_temp['Data']).dt.date
-
-    canais = df_temp['Canal de venda'].unique()
-    data_inicial = df_temp['Data'].min()
-    data_final = df_temp['Data'].max()
-    datas = pd.date_range(data_inicial, data_final)
-
-    linhas = []
-    todos_valores = []
-
-    for canal in canais:
-        df_canal = df_temp[df_temp['Canal de venda'] == canal]
-        total = df_canal['Total'].sum()
-        serie = []
-        for data in datas:
-            data_atual = data.date()
-            valor = df_canal[df_canal['Data'] == data_atual]['Total'].sum()
-            serie.append(round(valor, 2))
-            todos_valores.append(valor)
-        linhas.append({
-            "Canal": canal,
-            "Faturamento": total,
-            "Faturamento Formatado": formatar_moeda(total),
-            "Linha do Tempo": serie
-        })
-
-    if not todos_valores:
+    spec = cache_graficos.em_cache('tabela_canais_linha_do_tempo', chave, construir)
+    if spec is None:
         st.warning("Não há dados suficientes para gerar a linha do tempo.")
         return
 
-    y_max = max(todos_valores) * 1.1 if max(todos_valores) > 0 else 1
-
-    df_resultado = pd.DataFrame(linhas)
-    df_resultado.sort_values(by="Faturamento", ascending=False, inplace=True)
+    df_resultado = pd.DataFrame(spec['linhas'])
 
     st.markdown("### <i class='bi bi-bar-chart'></i> Faturamento por Canal com Linha do Tempo", unsafe_allow_html=True)
 
@@ -331,7 +424,7 @@ def criar_tabela_canais_com_linha_do_tempo(df):
                 "Linha do Tempo": st.column_config.LineChartColumn(
                     "Linha do Tempo",
                     y_min=0,
-                    y_max=y_max
+                    y_max=spec['y_max']
                 ),
             },
             hide_index=True,
@@ -339,23 +432,11 @@ def criar_tabela_canais_com_linha_do_tempo(df):
         )
 
     with col_pizza:
-        fig_pizza = px.pie(
-            df_resultado,
-            names="Canal",
-            values="Faturamento",
-            hole=0.4,
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        fig_pizza.update_layout(
-            title="Participação por Canal",
-            height=350,
-            margin=dict(t=50, b=20, l=20, r=20),
-            showlegend=True
-        )
-        st.plotly_chart(fig_pizza, use_container_width=True)
+        st.plotly_chart(spec['pizza'], use_container_width=True)
 
 
 
+@telemetria.cronometrar()
 def criar_tabela_top_clientes(df_delivery, nome_coluna_cliente='Consumidor'):
     # CSS ESPECÍFICO PARA O GLIDE DATA EDITOR
     st.markdown("""
@@ -414,7 +495,7 @@ def criar_tabela_top_clientes(df_delivery, nome_coluna_cliente='Consumidor'):
     if 'Canal de venda' in df_delivery_com_cliente.columns:
         agg_dict['Canal_Preferido'] = ('Canal de venda', lambda x: x.mode().iat[0] if not x.mode().empty else 'N/A')
 
-    df_clientes = df_delivery_com_cliente.groupby(nome_coluna_cliente).agg(**agg_dict).reset_index()
+    df_clientes = df_delivery_com_cliente.groupby(nome_coluna_cliente, observed=True).agg(**agg_dict).reset_index()
     
     df_clientes_sorted = df_clientes.sort_values(by='Quantidade_Pedidos', ascending=False).reset_index(drop=True)
     
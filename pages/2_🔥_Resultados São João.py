@@ -1,8 +1,10 @@
 # pages/2_🔥_Resultados São João.py
 
-import streamlit as st
-from modules import sao_joao_handler, visualization
-from datetime import date
+from modules.importacao_preguicosa import perfil_importacoes
+
+with perfil_importacoes("Resultados São João"):
+    import streamlit as st
+    from modules import sao_joao_handler, visualization
 
 # --- CONFIGURAÇÃO DA PÁGINA E CSS ---
 st.set_page_config(layout="wide", page_title="Análise São João")
@@ -12,19 +14,18 @@ st.markdown("<h1 class='main-title-sj'>Análise de Resultados</h1>", unsafe_allo
 st.markdown("<h2 class='subtitle-sj'>Madrugada Junina</h2>", unsafe_allow_html=True)
 
 # --- CARREGAMENTO E FILTRAGEM INICIAL ---
-df_madrugada_validos, df_madrugada_cancelados = sao_joao_handler.carregar_dados_sao_joao()
+# A campanha (período, horário e canais) é definida em modules/campanhas.py.
+campanha = sao_joao_handler.CAMPANHA
+df_madrugada_validos, df_madrugada_cancelados, rollups, versao_dados = sao_joao_handler.carregar_dados_sao_joao(campanha)
 
 if df_madrugada_validos.empty:
-    st.warning("Nenhum pedido encontrado no período da campanha junina (28/05 a 30/06) no horário da madrugada.")
+    st.warning(f"Nenhum pedido encontrado no período da campanha junina ({campanha.rotulo_periodo}) no horário da madrugada.")
     st.stop()
 
 # --- FILTRO DE DATA ---
 with st.expander("📅 Filtrar por Data (Período Junino)", expanded=True):
-    DATA_INICIAL_CAMPANHA = date(2025, 5, 28)
-    DATA_FINAL_CAMPANHA = date(2025, 6, 30)
-
-    data_min_disponivel = max(df_madrugada_validos['Data'].min(), DATA_INICIAL_CAMPANHA)
-    data_max_disponivel = min(df_madrugada_validos['Data'].max(), DATA_FINAL_CAMPANHA)
+    data_min_disponivel = df_madrugada_validos['Data'].min()
+    data_max_disponivel = df_madrugada_validos['Data'].max()
 
     col1, col2 = st.columns(2)
     with col1:
@@ -61,3 +62,6 @@ with col_graf2:
 
 # Tabela de Pedidos Cancelados
 sao_joao_handler.display_cancelled_orders_table(df_cancelados_filtrado)
+
+# Comparativo ano a ano da mesma janela, a partir dos rollups da campanha
+sao_joao_handler.display_comparativo_anual(rollups, campanha)
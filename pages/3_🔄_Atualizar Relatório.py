@@ -1,30 +1,13 @@
 # pages/3_🔄_Atualizar Relatório.py
 
-import streamlit as st
-import pandas as pd
-from modules import data_handler, cep_handler
+from modules.importacao_preguicosa import perfil_importacoes
 
-st.set_page_config(layout="wide", page_title="Atualizar Relatório de Vendas")
+with perfil_importacoes("Atualizar Relatório"):
+    import streamlit as st
+    from modules import data_handler, pipeline_ingestao, registro_cache, registro_uploads, visoes
+    from modules.autenticacao import check_password
 
-# Verificação de senha
-def check_password():
-    """Verifica se o usuário digitou a senha correta."""
-    if 'password_correct' not in st.session_state:
-        st.session_state.password_correct = False
-    
-    if not st.session_state.password_correct:
-        password_placeholder = st.empty()
-        password = password_placeholder.text_input("Digite a senha para acessar:", type="password")
-        
-        if password:
-            if password == st.secrets["update_password"]:
-                st.session_state.password_correct = True
-                password_placeholder.empty()  # Remove o input de senha após acertar
-            else:
-                st.error("Senha incorreta. Tente novamente.")
-                st.stop()
-    
-    return st.session_state.password_correct
+st.set_page_config(layout="wide", page_title="Atualizar Relatório de Vendas")
 
 # Só mostra o conteúdo se a senha estiver correta
 if not check_password():
@@ -34,58 +17,116 @@ st.title("🔄 Atualizar Relatório de Vendas")
 
 st.markdown("""
 ### Passo 1: Faça o upload do relatório
-Baixe o relatório de "Vendas por Período" do sistema Saipos e faça o upload do arquivo `.xlsx` aqui.
+Baixe o relatório de "Vendas por Período" do sistema Saipos e faça o upload aqui (`.xlsx`, `.csv` ou `.parquet`).
+Vários arquivos podem ser enviados juntos: pedidos repetidos entre eles, ou já salvos na planilha, ficam com a versão mais recente.
 """)
 
-uploaded_file = st.file_uploader(
-    "Selecione o arquivo .xlsx do relatório Saipos",
-    type=['xlsx']
+uploaded_files = st.file_uploader(
+    "Selecione os relatórios da Saipos",
+    type=list(registro_uploads.FORMATOS),
+    accept_multiple_files=True
 )
 
-# Usamos o st.session_state para "lembrar" dos dados entre as interações
-if 'dados_tratados' not in st.session_state:
-    st.session_state.dados_tratados = None
+# A sessão guarda só os sha256 dos relatórios processados e as contagens; os DataFrames
+# ficam no cache compartilhado de data_handler.tratar_relatorios_enviados.
+if 'relatorio_enviado' not in st.session_state:
+    st.session_state.relatorio_enviado = None
+
+# Arquivos enviados, sem repetições (o mesmo conteúdo com outro nome conta uma vez só).
+arquivos_enviados = {}
+for arquivo in uploaded_files or []:
+    arquivos_enviados.setdefault(registro_uploads.sha256_conteudo(arquivo.getvalue()), arquivo)
+
+# Se algum arquivo processado saiu do seletor, o processamento deixa de valer.
+if st.session_state.relatorio_enviado is not None and not {sha256 for sha256, _ in st.session_state.relatorio_enviado['arquivos']} <= arquivos_enviados.keys():
+    st.session_state.relatorio_enviado = None
+
+def dados_do_relatorio():
+    """(validos, cancelados, linhas_por_arquivo) dos relatórios processados nesta sessão."""
+    chaves = tuple(st.session_state.relatorio_enviado['arquivos'])
+    return data_handler.tratar_relatorios_enviados(chaves, [arquivos_enviados[sha256].getvalue() for sha256, _ in chaves])
 
-if uploaded_file is not None:
+if arquivos_enviados:
     if st.button("Processar Arquivo"):
-        with st.spinner("Lendo e tratando os dados do relatório..."):
-            df_bruto = pd.read_excel(uploaded_file)
-            df_validos, df_cancelados = data_handler.tratar_dados_saipos(df_bruto)
-            
-            if not df_validos.empty:
-                st.session_state.dados_tratados = {
-                    "validos": df_validos,
-                    "cancelados": df_cancelados
+        ja_carregados = {sha256: registro_uploads.consultar(sha256) for sha256 in arquivos_enviados}
+        ja_carregados = {sha256: entrada for sha256, entrada in ja_carregados.items() if entrada is not None}
+        for sha256, entrada in ja_carregados.items():
+            st.info(f"'{arquivos_enviados[sha256].name}' já foi carregado em {entrada['carregado_em']} ({entrada['validos']} vendas válidas, {entrada['cancelados']} canceladas) e será ignorado.")
+        novos = tuple((sha256, arquivo.name) for sha256, arquivo in arquivos_enviados.items() if sha256 not in ja_carregados)
+        st.session_state.relatorio_enviado = None
+        if not novos:
+            st.success("Nenhum arquivo novo: a planilha já tem esses relatórios.")
+        else:
+            with st.spinner("Lendo e tratando os dados do relatório..."):
+                try:
+                    df_validos, df_cancelados, _ = data_handler.tratar_relatorios_enviados(novos, [arquivos_enviados[sha256].getvalue() for sha256, _ in novos])
+                except Exception as e:
+                    st.error(f"Não foi possível ler o relatório: {e}")
+                    df_validos = df_cancelados = None
+
+            if df_validos is not None and not df_validos.empty:
+                st.session_state.relatorio_enviado = {
+                    "arquivos": novos,
+                    "validos": len(df_validos),
+                    "cancelados": len(df_cancelados)
                 }
                 st.success("Dados processados com sucesso! Verifique a prévia abaixo.")
-            else:
+            elif df_validos is not None:
                 st.error("Nenhum dado válido foi encontrado no relatório. Verifique o arquivo.")
-                st.session_state.dados_tratados = None
 
-if st.session_state.dados_tratados is not None:
+if st.session_state.relatorio_enviado is not None:
+    df_validos, df_cancelados, linhas_por_arquivo = dados_do_relatorio()
     st.markdown("---")
     st.subheader("Passo 2: Pré-visualização dos Dados Válidos")
-    st.info(f"Encontradas **{len(st.session_state.dados_tratados['validos'])}** vendas válidas e **{len(st.session_state.dados_tratados['cancelados'])}** vendas canceladas.")
+    st.info(f"Encontradas **{st.session_state.relatorio_enviado['validos']}** vendas válidas e **{st.session_state.relatorio_enviado['cancelados']}** vendas canceladas.")
     st.markdown("Abaixo estão as primeiras 50 linhas dos dados que serão adicionados à planilha. Confira se as colunas e valores parecem corretos.")
     
-    st.dataframe(st.session_state.dados_tratados['validos'].head(50))
+    st.dataframe(df_validos.head(50))
     
     st.markdown("---")
     st.subheader("Passo 3: Salvar na Planilha")
     st.warning("Ao clicar no botão abaixo, os dados novos serão adicionados à planilha Google Sheets. Linhas duplicadas não serão salvas.", icon="⚠️")
     
     if st.button("✅ Salvar Dados na Planilha", type="primary"):
-        with st.spinner("Atualizando cache de CEPs..."):
-            cep_handler.atualizar_cache_cep(st.session_state.dados_tratados['validos'])
-        
-        with st.spinner("Conectando ao Google Sheets e salvando os novos dados..."):
-            data_handler.carregar_dados_para_gsheets(
-                st.session_state.dados_tratados['validos'],
-                st.session_state.dados_tratados['cancelados']
-            )
-        
-        st.success("Planilha atualizada com sucesso!")
-        st.balloons()
+        # Particionamento, gravação das vendas, dos cancelados e geocodificação rodam juntos;
+        # cada etapa mostra o próprio andamento. Uma etapa que falha não desfaz as outras.
+        rotulos = {
+            'particionamento': "Separando o relatório por mês",
+            'gravacao_validos': "Gravando vendas válidas",
+            'gravacao_cancelados': "Gravando vendas canceladas",
+            'geocodificacao': "Geocodificando CEPs novos",
+        }
+        barras = {etapa: st.progress(0.0, text=f"{rotulo}: aguardando...") for etapa, rotulo in rotulos.items()}
+
+        def mostrar_evento(evento):
+            detalhe = f" · {evento.mensagem}" if evento.mensagem else ""
+            if evento.estado == 'falhou':
+                texto = f"❌ {rotulos[evento.etapa]}: falhou{detalhe}"
+            elif evento.estado == 'pulada':
+                texto = f"⏭️ {rotulos[evento.etapa]}: não executada{detalhe}"
+            else:
+                marca = "✅ " if evento.estado == 'concluida' else ""
+                texto = f"{marca}{rotulos[evento.etapa]}: {evento.feitos:,}/{evento.total:,} {evento.unidade} · {evento.itens_por_s:,.0f} {evento.unidade}/s{detalhe}"
+            barras[evento.etapa].progress(evento.fracao, text=texto)
+
+        resultado = pipeline_ingestao.PipelineIngestao(df_validos, df_cancelados).executar(mostrar_evento)
         
-        # Limpa o estado da sessão para permitir um novo upload
-        st.session_state.dados_tratados = None
+        # Reconstrói em segundo plano só os caches afetados pela carga.
+        data_handler.obter_versao_planilha.clear()
+        registro_cache.invalidar('vendas', 'cep')
+
+        falhas = {etapa: r['erro'] for etapa, r in resultado.items() if r['estado'] == 'falhou'}
+        if not falhas:
+            # Só entra no registro o que foi salvo por inteiro: enviar o mesmo arquivo de novo não faz nada.
+            for sha256, nome in st.session_state.relatorio_enviado['arquivos']:
+                registro_uploads.registrar(sha256, nome, *linhas_por_arquivo[sha256])
+            st.success("Planilha atualizada com sucesso!")
+            st.balloons()
+            # Limpa o estado da sessão para permitir um novo upload
+            st.session_state.relatorio_enviado = None
+        else:
+            for etapa, erro in falhas.items():
+                st.error(f"{rotulos[etapa]}: {erro}")
+            st.warning("O que as outras etapas concluíram já está salvo. Clique em salvar de novo para completar: as gravações continuam de onde pararam.")
+
+visoes.medir_sessao()
@@ -0,0 +1,123 @@
+# pages/4_📈_Desempenho.py
+
+from modules.importacao_preguicosa import perfil_importacoes
+
+with perfil_importacoes("Desempenho"):
+    import json
+    import streamlit as st
+    import pandas as pd
+    from modules import telemetria, visoes
+    from modules.autenticacao import check_password
+
+st.set_page_config(layout="wide", page_title="Desempenho do Dashboard")
+
+# Página de administração: senha própria (admin_password) ou, sem ela, a mesma da carga de relatórios.
+try:
+    segredo_senha = "admin_password" if "admin_password" in st.secrets else "update_password"
+except Exception:
+    segredo_senha = "update_password"
+if not check_password(segredo_senha):
+    st.stop()
+
+st.title("📈 Desempenho do Dashboard")
+st.caption(f"Métricas deste processo, somando todas as sessões. Percentis sobre as últimas {telemetria.JANELA_AMOSTRAS} amostras de cada etapa.")
+
+dados = telemetria.instantaneo()
+
+col1, col2, col3 = st.columns([1, 1, 4])
+with col1:
+    if st.button("🔄 Atualizar", use_container_width=True):
+        st.rerun()
+with col2:
+    if st.button("🧹 Zerar spans", use_container_width=True):
+        telemetria.obter_telemetria().limpar()
+        st.rerun()
+with col3:
+    st.download_button(
+        "⬇️ Exportar JSON",
+        data=json.dumps(dados, ensure_ascii=False, indent=2, default=str),
+        file_name=f"desempenho_{dados['gerado_em'].replace(':', '')}.json",
+        mime="application/json",
+    )
+
+# --- ETAPAS (SPANS) ---
+st.subheader("Tempo por etapa")
+spans = dados['spans']
+if not spans:
+    st.info("Nenhuma etapa medida ainda. Abra o dashboard ou use o Oráculo para gerar amostras.")
+else:
+    tabela = pd.DataFrame([
+        {
+            'Etapa': nome,
+            'Chamadas': s['chamadas'],
+            'Erros': s['erros'],
+            'p50 (ms)': s['p50_ms'],
+            'p95 (ms)': s['p95_ms'],
+            'Máx. (ms)': s['max_ms'],
+            'Total (s)': s['total_ms'] / 1000,
+            'Payload p50 (KB)': s['payload_p50_bytes'] / 1024 if s['payload_p50_bytes'] is not None else None,
+            'Payload p95 (KB)': s['payload_p95_bytes'] / 1024 if s['payload_p95_bytes'] is not None else None,
+        }
+        for nome, s in spans.items()
+    ]).sort_values('Total (s)', ascending=False)
+    st.dataframe(tabela, hide_index=True, use_container_width=True, column_config={
+        'p50 (ms)': st.column_config.NumberColumn(format="%.1f"),
+        'p95 (ms)': st.column_config.NumberColumn(format="%.1f"),
+        'Máx. (ms)': st.column_config.NumberColumn(format="%.1f"),
+        'Total (s)': st.column_config.NumberColumn(format="%.2f"),
+        'Payload p50 (KB)': st.column_config.NumberColumn(format="%.1f"),
+        'Payload p95 (KB)': st.column_config.NumberColumn(format="%.1f"),
+    })
+
+    etapas_com_tempo = [nome for nome, s in spans.items() if s['amostras']]
+    if etapas_com_tempo:
+        etapa = st.selectbox("Histograma da etapa", etapas_com_tempo)
+        faixas = dados['faixas_histograma_ms']
+        rotulos = [f"≤ {limite} ms" for limite in faixas] + [f"> {faixas[-1]} ms"]
+        histograma = pd.DataFrame({'Faixa': rotulos, 'Amostras': spans[etapa]['histograma']})
+        histograma['Faixa'] = pd.Categorical(histograma['Faixa'], categories=rotulos, ordered=True)
+        st.bar_chart(histograma, x='Faixa', y='Amostras', height=250)
+
+# --- CACHES ---
+st.subheader("Caches")
+caches = pd.DataFrame([
+    {'Cache': nome, 'Itens': c.get('itens'), 'Acertos': c.get('acertos'), 'Falhas': c.get('falhas'), 'Taxa de acerto': c.get('taxa_acerto', 0.0) * 100}
+    for nome, c in dados['caches'].items()
+])
+st.dataframe(caches, hide_index=True, use_container_width=True, column_config={'Taxa de acerto': st.column_config.ProgressColumn(format="%.1f%%", min_value=0, max_value=100)})
+
+col_llm, col_registro = st.columns(2)
+with col_llm:
+    st.subheader("Modelo de linguagem")
+    if dados['llm']:
+        st.dataframe(pd.DataFrame(dados['llm']).T, use_container_width=True)
+    else:
+        st.info("Nenhuma chamada ao modelo neste processo.")
+with col_registro:
+    st.subheader("Snapshots de dados")
+    if dados['registro_cache']:
+        st.dataframe(pd.DataFrame(dados['registro_cache']).T[['origem', 'duracao_carga_s', 'reconstruindo', 'ultimo_erro']], use_container_width=True)
+    else:
+        st.info("Nenhum snapshot carregado neste processo.")
+
+# --- MEMÓRIA ---
+st.subheader("Memória")
+sessoes = dados['sessoes']
+col_sessoes, col_total, col_maior = st.columns(3)
+col_sessoes.metric("Sessões ativas", sessoes['sessoes'])
+col_total.metric("Estado das sessões (total)", f"{sessoes['total_bytes'] / 1024:,.1f} KB")
+col_maior.metric("Maior sessão", f"{sessoes['maior_bytes'] / 1024:,.1f} KB")
+memoria = dados['anotacoes'].get('memoria_dados_dashboard')
+if memoria:
+    st.dataframe(pd.DataFrame([
+        {'Tabela': nome, 'Linhas': m['linhas'], 'Antes (MB)': m['antes_mb'], 'Depois (MB)': m['depois_mb'], 'Colunas descartadas': ', '.join(m['colunas_descartadas'])}
+        for nome, m in memoria.items()
+    ]), hide_index=True, use_container_width=True)
+indice_sketches = dados['anotacoes'].get('sketches_total')
+if indice_sketches:
+    st.caption(f"Sketches do valor dos pedidos: {indice_sketches['celulas']:,} células (dia × canal × faixa) em {indice_sketches['mb']:.2f} MB, {indice_sketches['origem']}.")
+
+with st.expander("Importação de módulos"):
+    st.json(dados['importacoes'])
+
+visoes.medir_sessao()
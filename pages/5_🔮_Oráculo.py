@@ -0,0 +1,57 @@
+# pages/5_🔮_Oráculo.py
+
+from modules.importacao_preguicosa import perfil_importacoes
+
+with perfil_importacoes("Oráculo"):
+    import streamlit as st
+    from modules import oraculo_ferramentas, oraculo_handler, visoes, visualization
+
+# --- CONFIGURAÇÃO DA PÁGINA E CSS ---
+st.set_page_config(layout="wide", page_title="Oráculo La Brasa")
+visualization.aplicar_css_local("style/oraculo_style.css")
+
+st.title("🔮 Oráculo La Brasa")
+
+# --- DADOS DO FILTRO DA PÁGINA PRINCIPAL ---
+# O Oráculo responde sobre o mesmo recorte (período e canais) filtrado no Dashboard Principal.
+visao = visoes.visao_da_sessao()
+if visao is None:
+    st.info("Abra o Dashboard Principal e escolha o período e os canais: o Oráculo responde sobre esse recorte.")
+    st.stop()
+df_validos, df_cancelados, filtro = visao
+canais = ', '.join(filtro.canais) if filtro.canais is not None else "todos"
+st.caption(f"Período: {filtro.data_inicial:%d/%m/%Y} a {filtro.data_final:%d/%m/%Y} · Canais: {canais}")
+
+# Com ferramentas, o modelo consulta os dados por funções locais em vez de receber as tabelas no prompt.
+usar_ferramentas = st.toggle("Consultar os dados com ferramentas", key="oraculo_ferramentas", help="O modelo pede as tabelas de que precisa (faturamento por dimensão, clientes, cancelamentos) em vez de receber um resumo fixo.")
+modelo = oraculo_ferramentas.configurar_ia_com_ferramentas() if usar_ferramentas else oraculo_handler.configurar_ia()
+if modelo is None:
+    st.stop()
+filtros = (filtro.data_inicial, filtro.data_final, filtro.canais)
+
+# --- CHAT ---
+# A sessão guarda só o texto das mensagens.
+historico = st.session_state.setdefault('historico_oraculo', [])
+for mensagem in historico:
+    with st.chat_message(mensagem['role']):
+        st.markdown(mensagem['content'])
+
+pergunta = st.chat_input("Pergunte sobre as vendas, ex.: qual canal teve o maior ticket médio?")
+if pergunta:
+    with st.chat_message("user"):
+        st.markdown(pergunta)
+    with st.chat_message("assistant"):
+        if usar_ferramentas:
+            executor = oraculo_ferramentas.ExecutorFerramentas(df_validos, df_cancelados, filtro.versao_dados, filtros)
+            with st.spinner("Consultando os dados..."):
+                resposta, chamadas = oraculo_ferramentas.responder_com_ferramentas(modelo, pergunta, historico, executor)
+            st.markdown(resposta)
+            if chamadas:
+                st.caption("Consultas: " + ", ".join(nome for nome, _ in chamadas))
+        else:
+            contexto = oraculo_handler.construir_contexto(df_validos, df_cancelados, filtro.versao_dados, filtros=filtros)
+            resposta, _ = oraculo_handler.renderizar_resposta_stream(modelo, pergunta, historico, contexto)
+    historico.append({'role': 'user', 'content': pergunta})
+    historico.append({'role': 'assistant', 'content': resposta})
+
+visoes.medir_sessao()
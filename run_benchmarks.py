@@ -0,0 +1,254 @@
+# run_benchmarks.py
+"""
+Mede o tempo e o pico de memória das etapas do dashboard sobre relatórios
+sintéticos da Saipos (modules/gerador_saipos.py) e compara com uma baseline.
+
+    python run_benchmarks.py                         # 1k, 10k e 100k linhas
+    python run_benchmarks.py --tamanhos 1000000      # só 1M linhas
+    python run_benchmarks.py --salvar-baseline       # grava a baseline atual
+    python run_benchmarks.py --casos ingestao filtro # só alguns casos
+    python run_benchmarks.py --motores               # pandas x DuckDB até 10M linhas
+
+Sai com código 1 se algum caso ficar mais lento ou usar mais memória que a
+baseline além da tolerância.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+import streamlit.logger
+
+from modules import data_handler, gerador_saipos, motor_sql, oraculo_handler, sketches, visoes, visualization
+
+ARQUIVO_BASELINE = os.path.join('data', 'benchmarks', 'baseline.json')
+ARQUIVO_ULTIMA_EXECUCAO = os.path.join('data', 'benchmarks', 'ultima_execucao.json')
+ARQUIVO_MOTORES = os.path.join('data', 'benchmarks', 'motores.json')
+TAMANHOS_PADRAO = [1_000, 10_000, 100_000]
+TOLERANCIA_PADRAO = 0.25
+# Diferenças absolutas menores que isso são ruído, mesmo acima da tolerância.
+MINIMO_TEMPO_MS = 5.0
+MINIMO_MEMORIA_MB = 1.0
+# Comparação dos motores: o relatório-base é ampliado por amostragem até cada tamanho.
+LINHAS_BASE_MOTORES = 20_000
+TAMANHOS_MOTORES = [100_000, 1_000_000, 10_000_000]
+
+# --- CASOS ---
+# Cada caso recebe o estado preparado para o tamanho e executa uma etapa.
+
+def _preparar(linhas, semente):
+    """Relatório bruto, dados tipados e compactados como no dashboard, recortes filtrados e cache de CEPs."""
+    bruto = gerador_saipos.gerar_relatorio(linhas, semente=semente)
+    validos_tipados, cancelados_tipados = data_handler.tipar_dados_dashboard(*data_handler.tratar_dados_saipos(bruto))
+    validos, cancelados = data_handler.compactar_dados_dashboard(validos_tipados, cancelados_tipados)
+    datas = sorted(validos['Data'].unique())
+    # Filtro típico: a metade central do período e todos os canais menos um.
+    data_inicial, data_final = datas[len(datas) // 4], datas[(3 * len(datas)) // 4]
+    canais = sorted(validos['Canal de venda'].unique())[:-1]
+    filtrado, cancelados_filtrado = _filtrar(validos, cancelados, data_inicial, data_final, canais)
+    indice = sketches.IndiceSketches(sketches.tabela_sketches(validos))
+    return {
+        'bruto': bruto,
+        'tipados': (validos_tipados, cancelados_tipados),
+        'validos': validos,
+        'cancelados': cancelados,
+        'filtros': (data_inicial, data_final, canais),
+        'filtrado': filtrado,
+        'cancelados_filtrado': cancelados_filtrado,
+        'indice_sketches': indice,
+        'sketch_filtrado': indice.mesclar(data_inicial, data_final, canais),
+        'delivery_filtrado': filtrado[filtrado['Tipo de Canal'] == 'Delivery'],
+        'delivery_total': validos[validos['Tipo de Canal'] == 'Delivery'],
+        'cache_cep': gerador_saipos.gerar_cache_cep(bruto, semente=semente),
+    }
+
+def _filtrar(df_validos, df_cancelados, data_inicial, data_final, canais):
+    """Mesmo filtro da página principal."""
+    return visoes.aplicar_filtro(visoes.FiltroDashboard(None, data_inicial, data_final, tuple(canais)), df_validos, df_cancelados)
+
+def _ingestao(e):
+    data_handler.tratar_dados_saipos(e['bruto'])
+
+def _tipagem(e):
+    validos, cancelados = data_handler.tratar_dados_saipos(e['bruto'])
+    data_handler.tipar_dados_dashboard(validos, cancelados)
+
+def _contexto_oraculo(e):
+    # Filtros únicos a cada chamada: mede a montagem, não o acerto no cache de contextos.
+    oraculo_handler.construir_contexto(e['filtrado'], e['cancelados_filtrado'], filtros=time.perf_counter_ns())
+
+CASOS = {
+    'ingestao': _ingestao,
+    'tipagem': _tipagem,
+    'compactacao': lambda e: data_handler.compactar_dados_dashboard(*e['tipados']),
+    'versao_dados': lambda e: data_handler.calcular_versao_dados(e['validos'], e['cancelados']),
+    'filtro': lambda e: _filtrar(e['validos'], e['cancelados'], *e['filtros']),
+    'sketches_ingestao': lambda e: sketches.IndiceSketches(sketches.tabela_sketches(e['validos'])),
+    'sketch_periodo': lambda e: e['indice_sketches'].mesclar(*e['filtros']),
+    'criar_cards_resumo': lambda e: visualization.criar_cards_resumo(e['filtrado']),
+    'criar_cards_dias_semana': lambda e: visualization.criar_cards_dias_semana(e['filtrado']),
+    'criar_grafico_tendencia': lambda e: visualization.criar_grafico_tendencia(e['filtrado']),
+    'criar_grafico_barras_horarios': lambda e: visualization.criar_grafico_barras_horarios(e['filtrado']),
+    'criar_donut_e_resumo_canais': lambda e: visualization.criar_donut_e_resumo_canais(e['filtrado']),
+    'criar_distplot_e_analise': lambda e: visualization.criar_distplot_e_analise(e['filtrado'], sketch=e['sketch_filtrado']),
+    'criar_tabela_canais_com_linha_do_tempo': lambda e: visualization.criar_tabela_canais_com_linha_do_tempo(e['filtrado']),
+    'criar_cards_delivery_resumo': lambda e: visualization.criar_cards_delivery_resumo(e['delivery_filtrado'], e['delivery_total']),
+    'criar_top_bairros_delivery': lambda e: visualization.criar_top_bairros_delivery(e['delivery_filtrado'], e['delivery_total']),
+    'criar_tabela_top_clientes': lambda e: visualization.criar_tabela_top_clientes(e['delivery_filtrado']),
+    'criar_cards_cancelamento_resumo': lambda e: visualization.criar_cards_cancelamento_resumo(e['cancelados_filtrado'], e['filtrado']),
+    'criar_grafico_motivos_cancelamento': lambda e: visualization.criar_grafico_motivos_cancelamento(e['cancelados_filtrado']),
+    'criar_grafico_cancelamentos_por_hora': lambda e: visualization.criar_grafico_cancelamentos_por_hora(e['cancelados_filtrado']),
+    'criar_donut_cancelamentos_por_canal': lambda e: visualization.criar_donut_cancelamentos_por_canal(e['cancelados_filtrado']),
+    'contexto_oraculo': _contexto_oraculo,
+    # Busca das coordenadas dos CEPs no cache (merge) feita pelo mapa de calor.
+    'geocode_mapa_de_calor': lambda e: visualization.criar_mapa_de_calor(e['delivery_filtrado'], e['cache_cep']),
+}
+
+# --- MEDIÇÃO ---
+
+def medir(funcao, estado, repeticoes):
+    """Melhor tempo de `repeticoes` execuções (ms) e pico de memória alocada numa execução à parte (MB)."""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        funcao(estado)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    # O tracemalloc deixa a execução mais lenta; por isso o pico é medido separadamente.
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        funcao(estado)
+        pico = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return round(melhor * 1000, 2), round(pico / (1024 * 1024), 2)
+
+def executar(tamanhos, casos, repeticoes, semente):
+    resultados = {}
+    for linhas in tamanhos:
+        inicio = time.perf_counter()
+        estado = _preparar(linhas, semente)
+        print(f"\n{linhas:,} linhas (preparo em {time.perf_counter() - inicio:.1f} s)")
+        for nome in casos:
+            tempo_ms, pico_mb = medir(CASOS[nome], estado, repeticoes)
+            resultados[f"{nome}@{linhas}"] = {'caso': nome, 'linhas': linhas, 'tempo_ms': tempo_ms, 'pico_mb': pico_mb}
+            print(f"    {nome:<40} {tempo_ms:>10.1f} ms {pico_mb:>10.1f} MB")
+        del estado
+    return resultados
+
+def comparar_motores(tamanhos, repeticoes, semente):
+    """
+    Filtro típico + todas as agregações do dashboard em pandas e no DuckDB
+    (motor_sql.comparar_latencias), do relatório-base ampliado até cada tamanho.
+    None se o DuckDB não estiver instalado.
+    """
+    if not motor_sql.duckdb_disponivel():
+        print("\nDuckDB não está instalado; comparação dos motores ignorada.")
+        return None
+    estado = _preparar(LINHAS_BASE_MOTORES, semente)
+    data_inicial, data_final, canais = estado['filtros']
+    print(f"\nMotores (filtro de {data_inicial} a {data_final}, {len(canais)} canais)")
+    linhas = motor_sql.comparar_latencias(estado['validos'], estado['cancelados'], tamanhos=tamanhos, repeticoes=repeticoes, data_inicial=data_inicial, data_final=data_final, canais=canais)
+    for linha in linhas:
+        print(f"    {linha['linhas']:>12,} linhas | pandas {linha['pandas_ms']:>9.1f} ms | duckdb {linha['duckdb_ms']:>9.1f} ms | {linha['ganho']}x")
+    return linhas
+
+def comparar(resultados, baseline, tolerancia):
+    """Casos que pioraram além da tolerância (e do mínimo absoluto) em tempo ou memória."""
+    regressoes = []
+    for chave, atual in resultados.items():
+        anterior = baseline.get(chave)
+        if anterior is None:
+            continue
+        for metrica, minimo in (('tempo_ms', MINIMO_TEMPO_MS), ('pico_mb', MINIMO_MEMORIA_MB)):
+            antes, depois = anterior[metrica], atual[metrica]
+            if depois > antes * (1 + tolerancia) and depois - antes > minimo:
+                regressoes.append({'chave': chave, 'metrica': metrica, 'baseline': antes, 'atual': depois, 'variacao': round(depois / antes - 1, 3) if antes else float('inf')})
+    return regressoes
+
+def _ler_json(caminho):
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _gravar_json(caminho, conteudo):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(conteudo, f, ensure_ascii=False, indent=2)
+
+def _silenciar_streamlit():
+    """Fora do `streamlit run`, cada st.* avisa que não há contexto de execução."""
+    streamlit.logger.set_log_level('error')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do dashboard com relatórios sintéticos da Saipos.")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO, help="Linhas do relatório (1.000 a 5.000.000).")
+    parser.add_argument('--casos', nargs='+', choices=sorted(CASOS), default=list(CASOS))
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--baseline', default=ARQUIVO_BASELINE)
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO, help="Piora relativa aceita (0.25 = 25%%).")
+    parser.add_argument('--salvar-baseline', action='store_true', help="Grava os resultados como a nova baseline.")
+    parser.add_argument('--motores', action='store_true', help="Em vez dos casos, compara pandas e DuckDB nas agregações.")
+    parser.add_argument('--tamanhos-motores', type=int, nargs='+', default=TAMANHOS_MOTORES, help="Linhas da comparação dos motores (padrão: 100 mil, 1M e 10M).")
+    args = parser.parse_args(argv)
+
+    _silenciar_streamlit()
+    if args.motores:
+        motores = comparar_motores(args.tamanhos_motores, args.repeticoes, args.semente)
+        if motores is not None:
+            _gravar_json(ARQUIVO_MOTORES, {
+                'executado_em': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                'maquina': platform.platform(),
+                'repeticoes': args.repeticoes,
+                'resultados': motores,
+            })
+        return 0
+    resultados = executar(args.tamanhos, args.casos, args.repeticoes, args.semente)
+    execucao = {
+        'executado_em': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'maquina': platform.platform(),
+        'semente': args.semente,
+        'repeticoes': args.repeticoes,
+        'resultados': resultados,
+    }
+    _gravar_json(ARQUIVO_ULTIMA_EXECUCAO, execucao)
+
+    if args.salvar_baseline:
+        anterior = _ler_json(args.baseline) or {}
+        # Mantém os casos/tamanhos que não foram medidos agora.
+        execucao['resultados'] = {**anterior.get('resultados', {}), **resultados}
+        _gravar_json(args.baseline, execucao)
+        print(f"\nBaseline gravada em '{args.baseline}'.")
+        return 0
+
+    baseline = _ler_json(args.baseline)
+    if baseline is None:
+        print(f"\nSem baseline em '{args.baseline}'. Rode com --salvar-baseline para criar uma.")
+        return 0
+    regressoes = comparar(resultados, baseline['resultados'], args.tolerancia)
+    if not regressoes:
+        print(f"\nNenhuma regressão em relação à baseline de {baseline['executado_em']}.")
+        return 0
+    print(f"\n{len(regressoes)} regressão(ões) em relação à baseline de {baseline['executado_em']}:")
+    for r in regressoes:
+        unidade = 'ms' if r['metrica'] == 'tempo_ms' else 'MB'
+        print(f"    {r['chave']:<48} {r['metrica']:<8} {r['baseline']:>10.1f} -> {r['atual']:>10.1f} {unidade} ({r['variacao']:+.0%})")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
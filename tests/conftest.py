@@ -0,0 +1,30 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+import streamlit.logger
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Os módulos usam st.cache_*; fora do `streamlit run` isso só gera avisos.
+streamlit.logger.set_log_level('error')
+
+@pytest.fixture
+def pasta_temporaria(tmp_path, monkeypatch):
+    """Roda o teste numa pasta vazia: data/ (snapshots, registro de uploads, cache de CEPs) fica isolada."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture
+def planilha(pasta_temporaria, monkeypatch):
+    """Planilha em memória (tests/planilha_falsa.py) no lugar do Google Sheets, sem o ritmo da cota de escrita."""
+    from modules import data_handler, escrita_sheets, sheets_gateway
+    from planilha_falsa import ClienteFalso
+
+    cliente = ClienteFalso()
+    gateway = sheets_gateway.GatewaySheets(cliente=cliente, chave=cliente.planilha.id)
+    monkeypatch.setattr(sheets_gateway, 'obter_gateway', lambda: gateway)
+    monkeypatch.setattr(escrita_sheets, 'obter_balde_escrita', lambda: escrita_sheets.BaldeTokens(1000, 1000))
+    data_handler._cache_particoes.clear()
+    yield cliente.planilha
+    data_handler._cache_particoes.clear()
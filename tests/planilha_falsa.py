@@ -0,0 +1,175 @@
+# tests/planilha_falsa.py
+"""
+Planilha do Google em memória, com a parte da interface do gspread que o
+dashboard usa. Cada pedido à "API" fica registrado em `PlanilhaFalsa.pedidos`.
+
+Como no Sheets, valores gravados com USER_ENTERED viram número quando parecem
+número (texto com "'" na frente fica texto) e a leitura devolve o texto exibido
+(FORMATTED_VALUE, o padrão da API) ou o valor (UNFORMATTED_VALUE).
+"""
+import re
+import threading
+
+import gspread
+
+def _indice_coluna(letras):
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + ord(letra) - 64
+    return indice - 1
+
+def _valor_digitado(valor):
+    if not isinstance(valor, str):
+        return valor
+    if valor.startswith("'"):
+        return valor[1:]
+    try:
+        numero = float(valor)
+    except ValueError:
+        return valor
+    return int(numero) if numero.is_integer() and re.fullmatch(r'-?\d+', valor) else numero
+
+def _texto_exibido(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+class AbaFalsa:
+    _proximo_id = 0
+
+    def __init__(self, planilha, title):
+        AbaFalsa._proximo_id += 1
+        self.id = AbaFalsa._proximo_id
+        self.title = title
+        self.index = len(planilha.abas)
+        self._planilha = planilha
+        self.celulas = {}
+
+    def linhas(self):
+        if not self.celulas:
+            return []
+        return [self.celulas.get(i, []) for i in range(max(self.celulas) + 1)]
+
+    def update(self, valores, intervalo):
+        self._planilha.values_update(f"'{self.title}'!{intervalo.split(':')[0]}", body={'values': valores})
+
+    def append_rows(self, valores, value_input_option='USER_ENTERED'):
+        self._planilha._registrar('append', self.title, len(valores))
+        inicio = len(self.linhas())
+        for i, linha in enumerate(valores):
+            self.celulas[inicio + i] = [_valor_digitado(v) for v in linha]
+
+class PlanilhaFalsa:
+    def __init__(self, id='planilha-falsa', title='Vendas'):
+        self.id = id
+        self.title = title
+        self.abas = {}
+        self.pedidos = []
+        self._lock = threading.Lock()
+
+    def _registrar(self, *pedido):
+        with self._lock:
+            self.pedidos.append(pedido)
+
+    def pedidos_de(self, tipo):
+        return [p for p in self.pedidos if p[0] == tipo]
+
+    def worksheet(self, nome):
+        if nome not in self.abas:
+            raise gspread.WorksheetNotFound(nome)
+        return self.abas[nome]
+
+    def worksheets(self):
+        return list(self.abas.values())
+
+    def add_worksheet(self, title, rows=1, cols=1):
+        self._registrar('add', title)
+        self.abas[title] = AbaFalsa(self, title)
+        return self.abas[title]
+
+    def del_worksheet(self, aba):
+        self._registrar('del', aba.title)
+        del self.abas[aba.title]
+
+    def _aba_e_celula(self, intervalo):
+        encontrado = re.match(r"'((?:[^']|'')*)'(?:!(.*))?$", intervalo)
+        nome, celula = encontrado.group(1).replace("''", "'"), encontrado.group(2)
+        if nome not in self.abas:
+            raise gspread.WorksheetNotFound(nome)
+        return self.abas[nome], celula
+
+    def values_update(self, intervalo, params=None, body=None):
+        self._registrar('update', intervalo)
+        aba, celula = self._aba_e_celula(intervalo)
+        primeira = int(re.sub(r'[A-Z]', '', celula)) - 1
+        for i, linha in enumerate(body['values']):
+            aba.celulas[primeira + i] = [_valor_digitado(v) for v in linha]
+
+    def values_get(self, intervalo, params=None):
+        return self.values_batch_get([intervalo], params)['valueRanges'][0]
+
+    def values_batch_get(self, intervalos, params=None):
+        params = dict(params or {})
+        self._registrar('batchGet', tuple(intervalos), params)
+        formatar = (lambda v: v) if params.get('valueRenderOption') == 'UNFORMATTED_VALUE' else _texto_exibido
+        faixas = []
+        for intervalo in intervalos:
+            aba, celula = self._aba_e_celula(intervalo)
+            linhas = [[formatar(v) for v in linha] for linha in aba.linhas()]
+            if celula is None:
+                faixas.append({'values': linhas})
+            elif celula == '1:1':
+                faixas.append({'values': linhas[:1]})
+            elif re.fullmatch(r'[A-Z]+\d+', celula):
+                coluna, linha = _indice_coluna(re.sub(r'\d', '', celula)), int(re.sub(r'[A-Z]', '', celula)) - 1
+                valor = linhas[linha][coluna] if linha < len(linhas) and coluna < len(linhas[linha]) else ''
+                faixas.append({'values': [[valor]]} if valor != '' else {})
+            else:
+                primeira, ultima = re.fullmatch(r'([A-Z]+)2:([A-Z]+)', celula).groups()
+                colunas = [[linha[i] if i < len(linha) else '' for linha in linhas[1:]] for i in range(_indice_coluna(primeira), _indice_coluna(ultima) + 1)]
+                if params.get('majorDimension') != 'COLUMNS':
+                    colunas = [list(linha) for linha in zip(*colunas)]
+                # Como a API, corta as células vazias do fim.
+                faixas.append({'values': [c[:max([j + 1 for j, v in enumerate(c) if v != ''] + [0])] for c in colunas]})
+        return {'valueRanges': faixas}
+
+    def batch_update(self, body):
+        self._registrar('batchUpdate', len(body['requests']))
+        for pedido in body['requests']:
+            if 'deleteSheet' in pedido:
+                nome = next(n for n, aba in self.abas.items() if aba.id == pedido['deleteSheet']['sheetId'])
+                del self.abas[nome]
+            else:
+                propriedades = pedido['updateSheetProperties']['properties']
+                nome = next(n for n, aba in self.abas.items() if aba.id == propriedades['sheetId'])
+                aba = self.abas.pop(nome)
+                aba.title = propriedades['title']
+                self.abas[aba.title] = aba
+
+class ClienteFalso:
+    """Cliente autorizado: abre a planilha pela chave ou pelo título."""
+
+    def __init__(self, planilha=None):
+        self.planilha = planilha or PlanilhaFalsa()
+        self.aberturas = []
+
+    def open_by_key(self, chave):
+        self.aberturas.append(('chave', chave))
+        if chave != self.planilha.id:
+            raise gspread.SpreadsheetNotFound(chave)
+        return self.planilha
+
+    def open(self, titulo):
+        self.aberturas.append(('titulo', titulo))
+        if titulo != self.planilha.title:
+            raise gspread.SpreadsheetNotFound(titulo)
+        return self.planilha
+
+def preencher(planilha, nome_aba, linhas):
+    """Cria a aba com as linhas dadas (cabeçalho na primeira), sem registrar pedidos."""
+    aba = AbaFalsa(planilha, nome_aba)
+    aba.celulas = {i: [_valor_digitado(v) for v in linha] for i, linha in enumerate(linhas)}
+    planilha.abas[nome_aba] = aba
+    return aba
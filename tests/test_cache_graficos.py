@@ -0,0 +1,89 @@
+# tests/test_cache_graficos.py
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from modules import cache_graficos, telemetria, visualization
+from modules.cache_graficos import CacheGraficos, em_cache, montar_chave
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Cache próprio do teste, com 1 KB de limite, e telemetria isolada."""
+    cache = CacheGraficos(limite_mb=1 / 1024)
+    monkeypatch.setattr(cache_graficos, 'obter_cache', lambda: cache)
+    registro = telemetria.Telemetria()
+    monkeypatch.setattr(telemetria, 'obter_telemetria', lambda: registro)
+    return cache
+
+def _construtor(payload):
+    chamadas = []
+
+    def construir():
+        chamadas.append(1)
+        return payload
+    return construir, chamadas
+
+def test_chave_e_versao_dos_dados_mais_filtros(cache):
+    construir, chamadas = _construtor({'mark': 'bar', 'data': [1, 2]})
+    chave = montar_chave('v1', date(2025, 6, 1), date(2025, 6, 30), ['IFOOD', 'BALCÃO'])
+    assert em_cache('barras', chave, construir) == {'mark': 'bar', 'data': [1, 2]}
+    # Mesmos filtros, com a lista de canais em outra ordem e a data como texto ISO: acerto.
+    mesma = montar_chave('v1', '2025-06-01', '2025-06-30', ['BALCÃO', 'IFOOD'])
+    assert mesma == chave
+    assert em_cache('barras', mesma, construir) == {'mark': 'bar', 'data': [1, 2]} and len(chamadas) == 1
+
+    for outra in (
+        montar_chave('v2', date(2025, 6, 1), date(2025, 6, 30), ['IFOOD', 'BALCÃO']),
+        montar_chave('v1', date(2025, 6, 2), date(2025, 6, 30), ['IFOOD', 'BALCÃO']),
+        montar_chave('v1', date(2025, 6, 1), date(2025, 6, 30), ['IFOOD']),
+    ):
+        em_cache('barras', outra, construir)
+    assert len(chamadas) == 4
+    # O widget também faz parte da chave.
+    em_cache('donut', chave, construir)
+    assert len(chamadas) == 5
+    assert cache.estatisticas()['acertos'] == 1 and cache.estatisticas()['itens'] == 5
+
+def test_sem_chave_sempre_constroi(cache):
+    construir, chamadas = _construtor({'mark': 'bar'})
+    em_cache('barras', None, construir)
+    em_cache('barras', None, construir)
+    assert len(chamadas) == 2 and cache.estatisticas()['itens'] == 0
+
+def test_limite_em_mb_descarta_os_menos_usados(cache):
+    spec = {'dados': 'x' * 300}  # ~315 bytes em JSON: três cabem em 1 KB, quatro não
+    for versao in ('v1', 'v2', 'v3'):
+        em_cache('barras', montar_chave(versao), lambda: spec)
+    em_cache('barras', montar_chave('v1'), lambda: pytest.fail('v1 deveria estar no cache'))
+    em_cache('barras', montar_chave('v4'), lambda: spec)
+
+    estatisticas = cache.estatisticas()
+    assert estatisticas['itens'] == 3 and estatisticas['remocoes'] == 1
+    assert estatisticas['tamanho_mb'] <= estatisticas['limite_mb']
+    # v2 era o menos usado (v1 acabou de ser lido).
+    assert cache.obter(('barras',) + montar_chave('v2')) is None
+    assert cache.obter(('barras',) + montar_chave('v1')) is not None
+
+def test_especificacao_maior_que_o_limite_nao_e_guardada(cache):
+    construir, chamadas = _construtor({'dados': 'x' * 2000})
+    em_cache('barras', montar_chave('v1'), construir)
+    em_cache('barras', montar_chave('v1'), construir)
+    assert len(chamadas) == 2 and cache.estatisticas()['itens'] == 0
+
+def test_grafico_com_a_mesma_chave_nao_reagrega(cache, monkeypatch):
+    cache.limite_bytes = 1024 * 1024  # a especificação do Altair passa de 1 KB
+    agregacoes = []
+    original = visualization._agregar
+
+    def contar(df, consulta, agregacao, *args):
+        agregacoes.append(agregacao)
+        return original(df, consulta, agregacao, *args)
+    monkeypatch.setattr(visualization, '_agregar', contar)
+    df = pd.DataFrame({'Data': [date(2025, 6, 1)] * 3, 'Hora': [19, 20, 20], 'Total': [10.0, 20.0, 30.0], 'Pedido': ['1', '2', '3']})
+    chave = montar_chave('v1', date(2025, 6, 1), date(2025, 6, 1), ['IFOOD'])
+    visualization.criar_grafico_barras_horarios(df, chave=chave)
+    visualization.criar_grafico_barras_horarios(df, chave=chave)
+    assert agregacoes == ['resumo_por_hora']
+    visualization.criar_grafico_barras_horarios(df, chave=montar_chave('v2', date(2025, 6, 1), date(2025, 6, 1), ['IFOOD']))
+    assert agregacoes == ['resumo_por_hora'] * 2
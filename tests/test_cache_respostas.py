@@ -0,0 +1,52 @@
+# tests/test_cache_respostas.py
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from modules import oraculo_handler
+from modules.cache_respostas import CacheRespostas
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheRespostas(arquivo=str(tmp_path / 'cache_respostas.json'))
+
+@pytest.fixture(autouse=True)
+def contextos_limpos():
+    oraculo_handler._cache_contextos.clear()
+    yield
+    oraculo_handler._cache_contextos.clear()
+
+def _guardar(cache, pergunta, versao, identificacao=None):
+    chave = cache.montar_chave(pergunta, [], identificacao or versao, None)
+    cache.guardar(chave, versao, f"resposta de {pergunta}")
+    return chave
+
+def test_respostas_sem_versao_nao_se_invalidam(cache):
+    # Duas sessões com recortes diferentes (impressões digitais distintas, sem versão do dataset).
+    chave_a = _guardar(cache, "pergunta a", None, identificacao='recorte-a')
+    chave_b = _guardar(cache, "pergunta b", None, identificacao='recorte-b')
+    assert cache.obter(chave_a, None) == "resposta de pergunta a"
+    assert cache.obter(chave_b, None) == "resposta de pergunta b"
+    assert cache.invalidadas == 0
+
+def test_versao_nova_do_dataset_descarta_so_as_versionadas(cache):
+    antiga = _guardar(cache, "faturamento", 'v1')
+    sem_versao = _guardar(cache, "ticket", None, identificacao='recorte')
+    nova = _guardar(cache, "faturamento", 'v2')
+    assert cache.obter(antiga, 'v2') is None
+    assert cache.obter(nova, 'v2') == "resposta de faturamento"
+    assert cache.obter(sem_versao, None) == "resposta de ticket"
+    assert cache.invalidadas == 1
+    # Consultar sem versão não volta a versão atual para trás.
+    assert cache.versao_atual == 'v2'
+
+def test_chave_da_resposta_usa_a_versao_do_dataset():
+    validos = pd.DataFrame({'Data': [date(2025, 6, 1)], 'Canal de venda': ['iFood'], 'Total': [10.0]})
+    cancelados = pd.DataFrame({'Total': []})
+    filtros = (date(2025, 6, 1), date(2025, 6, 1), None)
+    com_versao = oraculo_handler.construir_contexto(validos, cancelados, 'v1', filtros=filtros)
+    sem_versao = oraculo_handler.construir_contexto(validos, cancelados)
+    assert oraculo_handler._chave_resposta("pergunta", [], com_versao)[1] == 'v1'
+    chave, versao = oraculo_handler._chave_resposta("pergunta", [], sem_versao)
+    assert versao is None and sem_versao.chave[0] in chave
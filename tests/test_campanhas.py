@@ -0,0 +1,39 @@
+# tests/test_campanhas.py
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from modules import campanhas, data_handler
+
+CAMPANHA = campanhas.CAMPANHAS['sao_joao_2025']
+
+def _dados_dashboard(horas):
+    validos = pd.DataFrame({
+        'Pedido': [str(i) for i in range(len(horas))],
+        'Data': ['2025-06-10'] * len(horas),
+        'Hora': horas,
+        'Canal de venda': ['IFOOD'] * len(horas),
+        'Total': [10.0] * len(horas),
+    })
+    return data_handler.compactar_dados_dashboard(*data_handler.tipar_dados_dashboard(validos, pd.DataFrame()))
+
+def test_hora_desconhecida_continua_nula_na_tipagem():
+    validos, _ = _dados_dashboard(['1', '', None, '22'])
+    assert str(validos['Hora'].dtype) == 'Int8'
+    assert validos['Hora'].isna().sum() == 2
+
+def test_fatia_nao_poe_hora_desconhecida_na_madrugada():
+    validos, _ = _dados_dashboard(['1', '', None, '4', '5', '0'])
+    fatia = campanhas.fatiar(validos, CAMPANHA)
+    assert sorted(fatia['Hora'].tolist()) == [0, 1, 4]
+
+def test_rollups_usam_os_dataframes_recebidos(monkeypatch):
+    campanhas.materializar_rollups.clear()
+    monkeypatch.setattr(data_handler, 'obter_dados_dashboard', lambda: pytest.fail("não deve reler o snapshot"))
+    validos, cancelados = _dados_dashboard(['1', '2', ''])
+    rollups = campanhas.materializar_rollups('versao-teste', validos, cancelados)
+    assert rollups['validos']['Pedidos'].sum() == 2
+    kpis = campanhas.kpis(rollups, CAMPANHA)
+    assert kpis['pedidos'] == 2 and kpis['faturamento'] == 20.0
+    assert kpis['dias_com_venda'] == 1 and date(2025, 6, 10) in set(rollups['validos']['Data'])
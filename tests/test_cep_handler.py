@@ -0,0 +1,28 @@
+# tests/test_cep_handler.py
+import os
+
+import pandas as pd
+import pytest
+
+from modules import cep_handler
+
+def test_salvar_coordenadas_mantem_a_ultima_de_cada_cep(pasta_temporaria):
+    assert cep_handler.salvar_coordenadas([]) == 0
+    assert cep_handler.salvar_coordenadas([{'cep': '59000000', 'lat': -5.79, 'lon': -35.2}, {'cep': '59010000', 'lat': -5.8, 'lon': -35.21}]) == 2
+    assert cep_handler.salvar_coordenadas([{'cep': '59000000', 'lat': -5.7, 'lon': -35.1}]) == 1
+    cache = cep_handler.carregar_cache_cep().set_index('cep')
+    assert sorted(cache.index) == ['59000000', '59010000']
+    assert cache.loc['59000000', 'lat'] == -5.7
+    assert os.listdir(pasta_temporaria / 'data') == ['cep_cache.csv']
+
+def test_gravacao_interrompida_preserva_o_cache(pasta_temporaria, monkeypatch):
+    cep_handler.salvar_coordenadas([{'cep': '59000000', 'lat': -5.79, 'lon': -35.2}])
+    to_csv = pd.DataFrame.to_csv
+
+    def cair_no_meio(df, caminho, **kwargs):
+        to_csv(df.head(0), caminho, **kwargs)
+        raise OSError('disco cheio')
+    monkeypatch.setattr(pd.DataFrame, 'to_csv', cair_no_meio)
+    with pytest.raises(OSError):
+        cep_handler.salvar_coordenadas([{'cep': '59010000', 'lat': -5.8, 'lon': -35.21}])
+    assert list(cep_handler.carregar_cache_cep()['cep']) == ['59000000']
@@ -0,0 +1,131 @@
+# tests/test_escrita_sheets.py
+import os
+
+import gspread
+import pandas as pd
+import pytest
+
+from modules import escrita_sheets, telemetria
+from planilha_falsa import PlanilhaFalsa, preencher
+
+@pytest.fixture
+def escrita(tmp_path, monkeypatch):
+    """Blocos de 3 linhas, sem esperas e com telemetria própria; checkpoints em tmp_path."""
+    monkeypatch.setattr(escrita_sheets, 'MAX_LINHAS_POR_BLOCO', 3)
+    monkeypatch.setattr(escrita_sheets.time, 'sleep', lambda _s: None)
+    registro = telemetria.Telemetria()
+    monkeypatch.setattr(telemetria, 'obter_telemetria', lambda: registro)
+    return {'balde': escrita_sheets.BaldeTokens(1000, 1000), 'dir_checkpoints': str(tmp_path), 'telemetria': registro}
+
+def _pedidos(n):
+    return pd.DataFrame({'Pedido': [str(i) for i in range(1, n + 1)], 'Total': [f"{i}.5" for i in range(1, n + 1)]})
+
+def _blocos_gravados(planilha):
+    return [p[1] for p in planilha.pedidos_de('update') if not p[1].endswith('!A1')]
+
+def _erro_429():
+    class Resposta:
+        status_code = 429
+        text = 'Quota exceeded'
+
+        def json(self):
+            return {'error': {'code': 429, 'message': 'Quota exceeded', 'status': 'RESOURCE_EXHAUSTED'}}
+    return gspread.exceptions.APIError(Resposta())
+
+def test_grava_em_blocos_e_troca_as_abas_num_unico_batch_update(escrita, monkeypatch):
+    planilha = PlanilhaFalsa()
+    preencher(planilha, 'Outra', [['x']])
+    antiga = preencher(planilha, 'Vendas', [['Pedido'], ['velho']])
+    corpos = []
+    original = planilha.batch_update
+    monkeypatch.setattr(planilha, 'batch_update', lambda body: (corpos.append(body), original(body))[1])
+    progressos = []
+    assert escrita_sheets.gravar_aba(planilha, 'Vendas', _pedidos(7), progresso=progressos.append, balde=escrita['balde'], dir_checkpoints=escrita['dir_checkpoints']) == 7
+
+    assert _blocos_gravados(planilha) == ["'Vendas__carga'!A2", "'Vendas__carga'!A5", "'Vendas__carga'!A8"]
+    assert [(p.linhas_gravadas, p.blocos_gravados, p.total_blocos) for p in progressos] == [(3, 1, 3), (6, 2, 3), (7, 3, 3)]
+    # A troca é um só pedido (apagar a antiga + renomear a temporária) e mantém a posição da aba.
+    temporaria = planilha.worksheet('Vendas')
+    assert corpos == [{'requests': [
+        {'deleteSheet': {'sheetId': antiga.id}},
+        {'updateSheetProperties': {'properties': {'sheetId': temporaria.id, 'title': 'Vendas', 'index': 1}, 'fields': 'title,index'}},
+    ]}]
+    assert list(planilha.abas) == ['Outra', 'Vendas']
+    assert planilha.worksheet('Vendas').linhas() == [['Pedido', 'Total']] + [[i, i + 0.5] for i in range(1, 8)]
+    assert os.listdir(escrita['dir_checkpoints']) == []
+
+def test_carga_interrompida_continua_do_ultimo_bloco(escrita, monkeypatch):
+    planilha = PlanilhaFalsa()
+    original = planilha.values_update
+
+    def cai_no_terceiro_bloco(intervalo, params=None, body=None):
+        if intervalo.endswith('!A8'):
+            raise ConnectionError('conexão perdida')
+        return original(intervalo, params=params, body=body)
+    monkeypatch.setattr(planilha, 'values_update', cai_no_terceiro_bloco)
+    with pytest.raises(ConnectionError):
+        escrita_sheets.gravar_aba(planilha, 'Vendas', _pedidos(7), balde=escrita['balde'], dir_checkpoints=escrita['dir_checkpoints'])
+    assert 'Vendas' not in planilha.abas and 'Vendas__carga' in planilha.abas
+
+    monkeypatch.setattr(planilha, 'values_update', original)
+    planilha.pedidos.clear()
+    progressos = []
+    escrita_sheets.gravar_aba(planilha, 'Vendas', _pedidos(7), progresso=progressos.append, balde=escrita['balde'], dir_checkpoints=escrita['dir_checkpoints'])
+    # Só o bloco que faltava: nem a aba temporária nem o cabeçalho são refeitos.
+    assert _blocos_gravados(planilha) == ["'Vendas__carga'!A8"]
+    assert not planilha.pedidos_de('add') and not planilha.pedidos_de('del')
+    assert [(p.linhas_gravadas, p.retomada) for p in progressos] == [(7, True)]
+    assert len(planilha.worksheet('Vendas').linhas()) == 8
+
+def test_checkpoint_de_outros_dados_descarta_a_aba_temporaria(escrita):
+    planilha = PlanilhaFalsa()
+    escrita_sheets._salvar_checkpoint(
+        escrita_sheets._caminho_checkpoint('Vendas', escrita['dir_checkpoints']),
+        {'aba': 'Vendas', 'impressao': 'outra-carga', 'total_linhas': 7, 'linhas_gravadas': 6},
+    )
+    preencher(planilha, 'Vendas__carga', [['Pedido', 'Total'], ['99', '1']])
+    progressos = []
+    escrita_sheets.gravar_aba(planilha, 'Vendas', _pedidos(4), progresso=progressos.append, balde=escrita['balde'], dir_checkpoints=escrita['dir_checkpoints'])
+    assert planilha.pedidos_de('del') == [('del', 'Vendas__carga')]
+    assert planilha.pedidos_de('add') == [('add', 'Vendas__carga')]
+    assert not any(p.retomada for p in progressos)
+    assert [linha[0] for linha in planilha.worksheet('Vendas').linhas()] == ['Pedido', 1, 2, 3, 4]
+
+def test_tamanho_do_bloco_respeita_linhas_celulas_e_bytes(monkeypatch):
+    monkeypatch.setattr(escrita_sheets, 'MAX_LINHAS_POR_BLOCO', 100)
+    monkeypatch.setattr(escrita_sheets, 'MAX_CELULAS_POR_BLOCO', 50)
+    monkeypatch.setattr(escrita_sheets, 'MAX_BYTES_POR_BLOCO', 1_000)
+    assert escrita_sheets._linhas_por_bloco(['a'], [['1']] * 10) == 50
+    assert escrita_sheets._linhas_por_bloco(['a'] * 10, [['1'] * 10] * 10) == 5
+    # 2 células de 46 caracteres (+4 de separadores cada): 100 bytes por linha.
+    assert escrita_sheets._linhas_por_bloco(['a', 'b'], [['x' * 46] * 2] * 10) == 10
+    assert escrita_sheets._linhas_por_bloco(['a'], [['x' * 5_000]]) == 1
+    assert escrita_sheets._linhas_por_bloco([], []) == 50
+
+def test_429_e_repetido_e_fica_na_telemetria(escrita):
+    respostas = [_erro_429(), _erro_429()]
+
+    def pedido():
+        if respostas:
+            raise respostas.pop()
+        return 'ok'
+    assert escrita_sheets._executar(escrita['balde'], pedido) == 'ok'
+    assert escrita['telemetria'].resumo()['sheets.escrita']['chamadas'] == 3
+    assert escrita['telemetria'].resumo()['sheets.escrita']['erros'] == 2
+    assert escrita['telemetria'].anotacoes()['sheets.escrita.repeticao'] == {'status': 429, 'tentativa': 2, 'espera_s': 4}
+
+def test_erro_que_nao_e_de_cota_nao_e_repetido(escrita):
+    class Resposta:
+        status_code = 400
+        text = 'Bad request'
+
+        def json(self):
+            return {'error': {'code': 400, 'message': 'Bad request', 'status': 'INVALID_ARGUMENT'}}
+    chamadas = []
+
+    def pedido():
+        chamadas.append(1)
+        raise gspread.exceptions.APIError(Resposta())
+    with pytest.raises(gspread.exceptions.APIError):
+        escrita_sheets._executar(escrita['balde'], pedido)
+    assert len(chamadas) == 1
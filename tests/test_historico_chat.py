@@ -0,0 +1,65 @@
+# tests/test_historico_chat.py
+from modules import oraculo_handler
+from modules.historico_chat import ORCAMENTO_TOKENS_HISTORICO, TURNOS_LITERAIS, compactar_historico, estimar_tokens
+from modules.modelo_falso import ModeloFalso
+
+CONTEXTO = "Geral: faturamento R$ 100,00; pedidos 2"
+
+class ModeloQueGuardaHistoricos(ModeloFalso):
+    """ModeloFalso que guarda o histórico recebido em cada start_chat."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.historicos = []
+
+    def start_chat(self, history=None):
+        self.historicos.append(list(history or []))
+        return super().start_chat(history)
+
+def _conversa(turnos):
+    """Perguntas como a página as guarda (às vezes com o prompt completo) e respostas longas."""
+    historico = []
+    for i in range(turnos):
+        pergunta = f"Quanto vendemos no dia {i + 1}?"
+        if i % 2:
+            pergunta = oraculo_handler._montar_prompt(pergunta, CONTEXTO * 20)
+        historico.append({'role': 'user', 'content': pergunta})
+        historico.append({'role': 'assistant', 'content': f"No dia {i + 1} o faturamento foi R$ {1000 + i},00. " + "Detalhe do canal. " * 30})
+    return historico
+
+def _tokens_enviados(modelo):
+    historico = sum(estimar_tokens(parte) for m in modelo.historicos[-1] for parte in m['parts'])
+    resumo = modelo.prompts[-1].split("Resumo da conversa até aqui:\n", 1)[1].split('\n        ---', 1)[0]
+    return historico + estimar_tokens(resumo), resumo
+
+def test_historico_enviado_ao_modelo_respeita_o_orcamento():
+    for turnos in (30, 300):
+        modelo = ModeloQueGuardaHistoricos("Resposta.")
+        metricas = oraculo_handler.MetricasResposta()
+        assert oraculo_handler.obter_resposta_ia(modelo, "E hoje?", _conversa(turnos), CONTEXTO, metricas=metricas) == "Resposta."
+        tokens, _ = _tokens_enviados(modelo)
+        assert tokens <= ORCAMENTO_TOKENS_HISTORICO
+        assert metricas.tokens_prompt['turnos_resumidos'] == turnos - TURNOS_LITERAIS
+        # Só os últimos turnos vão literais, e nunca com o bloco de contexto dos dados.
+        assert len(modelo.historicos[-1]) == 2 * TURNOS_LITERAIS
+        assert not any('Use os seguintes dados' in parte for m in modelo.historicos[-1] for parte in m['parts'])
+
+def test_turnos_dobrados_entram_no_resumo():
+    modelo = ModeloQueGuardaHistoricos("Resposta.")
+    oraculo_handler.obter_resposta_ia(modelo, "E hoje?", _conversa(30), CONTEXTO)
+    _, resumo = _tokens_enviados(modelo)
+    ultimo_dobrado = 30 - TURNOS_LITERAIS
+    assert f"- Perguntou: Quanto vendemos no dia {ultimo_dobrado}? | Resposta: No dia {ultimo_dobrado} o faturamento foi R$ {999 + ultimo_dobrado},00." in resumo
+    # O resumo guarda a primeira frase; o detalhe e o contexto dos dados ficam de fora.
+    assert 'Detalhe do canal' not in resumo and CONTEXTO not in resumo
+    # Sem espaço para tudo, as linhas mais antigas são as descartadas.
+    linhas = resumo.splitlines()
+    assert 'dia 1?' not in resumo and linhas[-1].startswith(f"- Perguntou: Quanto vendemos no dia {ultimo_dobrado}?")
+    assert f"dia {30 - TURNOS_LITERAIS + 1}?" not in resumo
+
+def test_turno_literal_grande_demais_vira_resumo():
+    historico = _conversa(2) + [{'role': 'user', 'content': 'Resuma tudo.'}, {'role': 'assistant', 'content': 'Longo. ' + 'x' * 3600}]
+    compactado = compactar_historico(historico, orcamento_tokens=1000)
+    assert compactado.turnos_literais == 1 and compactado.turnos_resumidos == 2
+    assert compactado.mensagens[0]['content'] == 'Resuma tudo.'
+    assert 'Quanto vendemos no dia 2?' in compactado.resumo
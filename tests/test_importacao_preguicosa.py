@@ -0,0 +1,42 @@
+# tests/test_importacao_preguicosa.py
+import sys
+import threading
+
+from modules import importacao_preguicosa
+from modules.importacao_preguicosa import _CronometroImportacao
+
+def test_imports_em_threads_diferentes_nao_misturam_as_pilhas():
+    cronometro = _CronometroImportacao()
+    dentro, continuar = threading.Event(), threading.Event()
+
+    def importar_em_outra_thread():
+        cronometro.entrar()
+        dentro.set()
+        continuar.wait(5)
+        cronometro.sair('outro', 5.0)
+    thread = threading.Thread(target=importar_em_outra_thread)
+    thread.start()
+    dentro.wait(5)
+    # Enquanto a outra thread importa 'outro', esta importa 'pai' com um submódulo.
+    cronometro.entrar()
+    cronometro.entrar()
+    cronometro.sair('pai.filho', 1.0)
+    continuar.set()
+    thread.join(5)
+    cronometro.sair('pai', 3.0)
+    assert cronometro.tempos == {
+        'pai.filho': {'acumulado_s': 1.0, 'proprio_s': 1.0},
+        'outro': {'acumulado_s': 5.0, 'proprio_s': 5.0},
+        'pai': {'acumulado_s': 3.0, 'proprio_s': 2.0},
+    }
+
+def test_perfil_sem_o_modulo_resource(monkeypatch, capsys):
+    monkeypatch.setattr(importacao_preguicosa, 'resource', None)
+    monkeypatch.setattr(importacao_preguicosa, '_PERFIS', {})
+    monkeypatch.delitem(sys.modules, 'colorsys', raising=False)
+    with importacao_preguicosa.perfil_importacoes('pagina_teste', ativo=True):
+        import colorsys  # noqa: F401
+    perfil = importacao_preguicosa.relatorio()['paginas']['pagina_teste']
+    assert perfil['memoria_residente_mb'] == {'antes': None, 'depois': None}
+    assert 'colorsys' in perfil['modulos']
+    assert 'memória' not in capsys.readouterr().out
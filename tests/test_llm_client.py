@@ -0,0 +1,29 @@
+# tests/test_llm_client.py
+import pytest
+
+from modules import llm_client
+
+def consultar_vendas():
+    """Ferramenta de teste."""
+
+def consultar_clientes():
+    """Ferramenta de teste."""
+
+@pytest.fixture(autouse=True)
+def modelo_local(monkeypatch):
+    monkeypatch.setenv('DASHBRASA_MODELO_FALSO', '1')
+    llm_client.obter_cliente.clear()
+    yield
+    llm_client.obter_cliente.clear()
+
+def test_cliente_e_separado_por_conjunto_de_ferramentas():
+    sem_ferramentas = llm_client.obter_cliente("instrução")
+    vendas = llm_client.obter_cliente("instrução", ferramentas_chave=('consultar_vendas',), _ferramentas=(consultar_vendas,))
+    clientes = llm_client.obter_cliente("instrução", ferramentas_chave=('consultar_clientes',), _ferramentas=(consultar_clientes,))
+    assert len({id(sem_ferramentas), id(vendas), id(clientes)}) == 3
+    assert llm_client.obter_cliente("instrução", ferramentas_chave=('consultar_vendas',), _ferramentas=(consultar_vendas,)) is vendas
+    assert llm_client.obter_cliente("instrução") is sem_ferramentas
+
+def test_nomes_das_ferramentas_precisam_bater():
+    with pytest.raises(ValueError):
+        llm_client.obter_cliente("instrução", _ferramentas=(consultar_vendas,))
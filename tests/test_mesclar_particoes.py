@@ -0,0 +1,86 @@
+# tests/test_mesclar_particoes.py
+import os
+
+import pandas as pd
+import pytest
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+from modules import data_handler, particoes, registro_uploads
+
+PAGINA_UPLOAD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pages', '3_🔄_Atualizar Relatório.py')
+
+def _relatorio(pedidos, totais=None):
+    """Como sai de tratar_dados_saipos: Pedido em texto, datas como Timestamp, valores numéricos."""
+    return pd.DataFrame({
+        'Pedido': [str(p) for p in pedidos],
+        'Data da venda': pd.to_datetime([f"2025-06-{p % 28 + 1:02d} 20:{p % 60:02d}:00" for p in pedidos]),
+        'Canal de venda': ['IFOOD'] * len(pedidos),
+        'Total': totais or [10.0 + p for p in pedidos],
+        'Itens': [2] * len(pedidos),
+        'Data': pd.to_datetime([f"2025-06-{p % 28 + 1:02d}" for p in pedidos]).date,
+        'Observação': ['sem cebola'] * len(pedidos),
+    })
+
+def _linhas_da_aba(planilha, aba):
+    return planilha.worksheet(aba).linhas()
+
+def test_mesclar_substitui_pedidos_repetidos(planilha):
+    data_handler.gravar_particoes({'validos': _relatorio([1, 2, 3])}, modo='mesclar')
+    data_handler.gravar_particoes({'validos': _relatorio([3, 4], totais=[99.5, 14.0])}, modo='mesclar')
+    linhas = _linhas_da_aba(planilha, particoes.nome_aba('validos', '2025-06'))
+    assert [linha[0] for linha in linhas[1:]] == [1, 2, 3, 4]
+    assert [linha[3] for linha in linhas[1:]] == [11, 12, 99.5, 14]
+    assert linhas[1][1] == '2025-06-02 20:01:00' and linhas[1][5] == '2025-06-02'
+
+def test_mesmo_relatorio_de_novo_nao_regrava(planilha):
+    data_handler.gravar_particoes({'validos': _relatorio([1, 2, 3])}, modo='mesclar')
+    planilha.pedidos.clear()
+    data_handler.gravar_particoes({'validos': _relatorio([2, 3])}, modo='mesclar')
+    # A partição lida da planilha e o relatório, tipados do mesmo jeito, dão a mesma versão.
+    assert not planilha.pedidos_de('add') and not planilha.pedidos_de('update')
+
+def test_pedido_que_virou_cancelado_sai_das_vendas(planilha):
+    data_handler.gravar_particoes({'validos': _relatorio([1, 2, 3])}, modo='mesclar')
+    data_handler.gravar_particoes({'validos': _relatorio([1]), 'cancelados': _relatorio([2])}, modo='mesclar')
+    assert [linha[0] for linha in _linhas_da_aba(planilha, particoes.nome_aba('validos', '2025-06'))[1:]] == [1, 3]
+    assert [linha[0] for linha in _linhas_da_aba(planilha, particoes.nome_aba('cancelados', '2025-06'))[1:]] == [2]
+
+# --- PÁGINA DE UPLOAD ---
+
+class _ArquivoEnviado:
+    def __init__(self, nome, conteudo):
+        self.name = nome
+        self._conteudo = conteudo
+
+    def getvalue(self):
+        return self._conteudo
+
+@pytest.fixture
+def envio(monkeypatch, pasta_temporaria):
+    arquivos = [_ArquivoEnviado('junho.csv', b'relatorio de junho'), _ArquivoEnviado('julho.csv', b'relatorio de julho')]
+    chamadas = []
+
+    def tratar(chaves, _conteudos):
+        chamadas.append(chaves)
+        return _relatorio([1]), pd.DataFrame(), {sha256: (1, 0) for sha256, _ in chaves}
+    selecionados = list(arquivos)
+    monkeypatch.setattr(streamlit, 'file_uploader', lambda *a, **k: list(selecionados))
+    monkeypatch.setattr(data_handler, 'tratar_relatorios_enviados', tratar)
+    at = AppTest.from_file(PAGINA_UPLOAD, default_timeout=30)
+    at.session_state['password_correct'] = True
+    at.session_state['relatorio_enviado'] = {
+        'arquivos': tuple((registro_uploads.sha256_conteudo(a.getvalue()), a.name) for a in arquivos),
+        'validos': 1,
+        'cancelados': 0,
+    }
+    return at, selecionados, chamadas
+
+def test_remover_um_arquivo_descarta_o_processamento(envio):
+    at, selecionados, chamadas = envio
+    at.run()
+    assert not at.exception and at.session_state['relatorio_enviado'] is not None and len(chamadas) == 1
+    selecionados.pop()
+    at.run()
+    assert not at.exception
+    assert at.session_state['relatorio_enviado'] is None and len(chamadas) == 1
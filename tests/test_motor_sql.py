@@ -0,0 +1,23 @@
+# tests/test_motor_sql.py
+from datetime import date
+
+import pytest
+
+from modules import data_handler, gerador_saipos, motor_sql
+
+duckdb = pytest.importorskip('duckdb')
+
+@pytest.fixture(scope='module')
+def dados():
+    validos, cancelados = data_handler.tratar_dados_saipos(gerador_saipos.gerar_relatorio(6_000, semente=5, dias=60))
+    return data_handler.compactar_dados_dashboard(*data_handler.tipar_dados_dashboard(validos, cancelados))
+
+@pytest.mark.parametrize('filtros', [
+    {},
+    {'data_inicial': date(2025, 1, 10), 'data_final': date(2025, 2, 5)},
+    {'data_inicial': date(2025, 1, 1), 'data_final': date(2025, 3, 1), 'canais': ('IFOOD', 'BALCÃO')},
+])
+def test_duckdb_e_pandas_dao_as_mesmas_tabelas(dados, filtros):
+    diferencas = motor_sql.verificar_equivalencia(*dados, **filtros)
+    assert diferencas
+    assert {chave: erro for chave, erro in diferencas.items() if erro is not None} == {}
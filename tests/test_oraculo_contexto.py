@@ -0,0 +1,28 @@
+# tests/test_oraculo_contexto.py
+import pandas as pd
+import pytest
+
+from modules import oraculo_handler
+
+def _vendas(canal, total):
+    return pd.DataFrame({'Pedido': ['1', '2'], 'Data': ['2025-06-01', '2025-06-02'], 'Canal de venda': [canal, canal], 'Total': [total, total]})
+
+@pytest.fixture(autouse=True)
+def cache_vazio():
+    oraculo_handler._cache_contextos.clear()
+
+def test_versao_sem_filtros_e_recusada():
+    with pytest.raises(ValueError):
+        oraculo_handler.construir_contexto(_vendas('IFOOD', 10.0), pd.DataFrame(), versao_dados='v1')
+
+def test_filtros_diferentes_na_mesma_versao_nao_compartilham_contexto():
+    ifood = oraculo_handler.construir_contexto(_vendas('IFOOD', 10.0), pd.DataFrame(), versao_dados='v1', filtros=('IFOOD',))
+    balcao = oraculo_handler.construir_contexto(_vendas('BALCÃO', 30.0), pd.DataFrame(), versao_dados='v1', filtros=('BALCÃO',))
+    assert 'IFOOD' in ifood.texto and 'BALCÃO' in balcao.texto and 'IFOOD' not in balcao.texto
+    repetido = oraculo_handler.construir_contexto(_vendas('IFOOD', 10.0), pd.DataFrame(), versao_dados='v1', filtros=('IFOOD',))
+    assert repetido.em_cache and repetido.texto == ifood.texto
+
+def test_sem_versao_a_chave_e_a_impressao_digital_do_recorte():
+    ifood = oraculo_handler.construir_contexto(_vendas('IFOOD', 10.0), pd.DataFrame())
+    balcao = oraculo_handler.construir_contexto(_vendas('BALCÃO', 30.0), pd.DataFrame())
+    assert ifood.chave != balcao.chave and not balcao.em_cache
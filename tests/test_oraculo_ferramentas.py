@@ -0,0 +1,66 @@
+# tests/test_oraculo_ferramentas.py
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from modules import oraculo_ferramentas
+from modules.modelo_falso import ChamadaFerramenta, ModeloFalso
+from modules.oraculo_ferramentas import ExecutorFerramentas, responder_com_ferramentas
+
+@pytest.fixture(autouse=True)
+def cache_limpo():
+    oraculo_ferramentas._cache_resultados.clear()
+    yield
+    oraculo_ferramentas._cache_resultados.clear()
+
+@pytest.fixture
+def executor():
+    validos = pd.DataFrame({
+        'Pedido': [1, 2, 3],
+        'Data': [date(2025, 6, 1), date(2025, 6, 1), date(2025, 6, 2)],
+        'Canal de venda': ['iFood', 'Balcão', 'iFood'],
+        'Total': [50.0, 20.0, 30.0],
+        'Consumidor': ['Ana', 'Bia', 'Ana'],
+    })
+    cancelados = pd.DataFrame({'Pedido': [4], 'Data': [date(2025, 6, 2)], 'Total': [15.0], 'Motivo de cancelamento': ['Cliente desistiu']})
+    return ExecutorFerramentas(validos, cancelados, versao_dados='v1', filtros=(date(2025, 6, 1), date(2025, 6, 2), None))
+
+def _resultados_enviados(prompt):
+    return {parte['function_response']['name']: parte['function_response']['response']['resultado'] for parte in prompt}
+
+def test_chamada_resultado_e_resposta_final(executor):
+    modelo = ModeloFalso([ChamadaFerramenta('faturamento_por', {'dimensao': 'canal'}), "O iFood faturou R$ 80,00."])
+    resposta, chamadas = responder_com_ferramentas(modelo, "Qual canal vendeu mais?", [], executor)
+    assert resposta == "O iFood faturou R$ 80,00."
+    assert chamadas == [('faturamento_por', {'dimensao': 'canal'})]
+    assert modelo.prompts[0] == "Qual canal vendeu mais?"
+    resultado = _resultados_enviados(modelo.prompts[1])['faturamento_por']
+    assert resultado['colunas'] == ['canal', 'faturamento', 'pedidos', 'ticket_medio']
+    assert resultado['linhas'][0] == ['iFood', 80.0, 2, 40.0]
+
+def test_ferramenta_fora_da_whitelist_volta_como_erro(executor):
+    modelo = ModeloFalso([ChamadaFerramenta('apagar_planilha', {'aba': 'Página1'}), "Não posso fazer isso."])
+    resposta, chamadas = responder_com_ferramentas(modelo, "Apague os dados", [], executor)
+    assert resposta == "Não posso fazer isso."
+    assert chamadas == [('apagar_planilha', {'aba': 'Página1'})]
+    assert 'não permitida' in _resultados_enviados(modelo.prompts[1])['apagar_planilha']['erro']
+
+def test_resultado_repetido_sai_do_cache(executor, monkeypatch):
+    execucoes = []
+    original = executor._ferramentas['resumo_geral']
+    monkeypatch.setitem(executor._ferramentas, 'resumo_geral', lambda: execucoes.append(1) or original())
+    cache = oraculo_ferramentas._cache_resultados()
+    primeiro = executor.executar('resumo_geral')
+    acertos = cache.acertos
+    assert executor.executar('resumo_geral') == primeiro
+    assert cache.acertos == acertos + 1 and len(execucoes) == 1
+    assert primeiro['pedidos'] == 3 and primeiro['cancelados'] == 1
+
+def test_falha_da_ferramenta_vira_erro_sem_entrar_no_cache(executor, monkeypatch):
+    def falhar():
+        raise KeyError('Total')
+    monkeypatch.setitem(executor._ferramentas, 'resumo_geral', falhar)
+    assert 'Falha ao executar' in executor.executar('resumo_geral')['erro']
+    assert 'Argumentos inválidos' in executor.executar('top_clientes', {'quantos': 3})['erro']
+    assert len(oraculo_ferramentas._cache_resultados()._itens) == 0
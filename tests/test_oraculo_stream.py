@@ -0,0 +1,72 @@
+# tests/test_oraculo_stream.py
+import threading
+
+import pytest
+
+from modules import llm_client, oraculo_handler
+from modules.modelo_falso import ModeloFalso
+
+TEXTO = "O iFood teve o maior faturamento do período, seguido do balcão e do site."
+CONTEXTO = "Geral: faturamento R$ 100,00; pedidos 2"
+
+class ModeloQueGuardaStreams(ModeloFalso):
+    """ModeloFalso que guarda as respostas em streaming, para conferir o fechamento."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.streams = []
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        resposta = super().generate_content(prompt, stream=stream, **kwargs)
+        if stream:
+            self.streams.append(resposta)
+        return resposta
+
+def _pedacos(texto, tamanho):
+    return [texto[i:i + tamanho] for i in range(0, len(texto), tamanho)]
+
+def _em_andamento():
+    return llm_client._metricas_globais()['falso'].em_andamento
+
+def test_pedacos_chegam_na_ordem():
+    metricas = oraculo_handler.MetricasResposta()
+    recebidos = list(oraculo_handler.obter_resposta_ia_stream(ModeloFalso(TEXTO, tamanho_pedaco=7), "Qual canal vendeu mais?", [], CONTEXTO, metricas=metricas))
+    assert recebidos == _pedacos(TEXTO, 7)
+    assert metricas.pedacos == len(recebidos) and metricas.caracteres == len(TEXTO)
+    assert not metricas.cancelada
+
+def test_tempo_ate_o_primeiro_pedaco_e_total_seguem_os_atrasos():
+    atraso_inicial, atraso_entre = 0.2, 0.05
+    modelo = ModeloFalso("a" * 40, atraso_inicial=atraso_inicial, atraso_entre_pedacos=atraso_entre, tamanho_pedaco=10)
+    metricas = oraculo_handler.MetricasResposta()
+    instantes = []
+    for _ in oraculo_handler.obter_resposta_ia_stream(modelo, "Pergunta", [], CONTEXTO, metricas=metricas):
+        instantes.append(metricas.primeiro_pedaco_s)
+    assert len(instantes) == 4
+    assert atraso_inicial <= metricas.primeiro_pedaco_s < atraso_inicial + 0.15
+    assert atraso_inicial + 3 * atraso_entre <= metricas.total_s < atraso_inicial + 3 * atraso_entre + 0.3
+    assert metricas.primeiro_pedaco_s < metricas.total_s
+
+@pytest.mark.parametrize('como_funcao', [False, True])
+def test_cancelamento_no_meio_do_stream(como_funcao):
+    evento = threading.Event()
+    cancelar = evento.is_set if como_funcao else evento
+    modelo = ModeloQueGuardaStreams(TEXTO, tamanho_pedaco=5)
+    metricas = oraculo_handler.MetricasResposta()
+    recebidos = []
+    for pedaco in oraculo_handler.obter_resposta_ia_stream(modelo, "Pergunta", [], CONTEXTO, cancelar=cancelar, metricas=metricas):
+        recebidos.append(pedaco)
+        if len(recebidos) == 2:
+            evento.set()
+    assert recebidos == _pedacos(TEXTO, 5)[:2]
+    assert metricas.cancelada and metricas.total_s is not None
+    stream = modelo.streams[-1]
+    assert stream.fechada and stream.entregues == 3
+    # A vaga no limite de chamadas simultâneas foi devolvida.
+    assert _em_andamento() == 0
+
+def test_erro_do_modelo_vira_mensagem():
+    def falhar(_prompt):
+        raise RuntimeError("sem conexão")
+    recebidos = list(oraculo_handler.obter_resposta_ia_stream(ModeloFalso(falhar), "Pergunta", [], CONTEXTO))
+    assert len(recebidos) == 1 and "sem conexão" in recebidos[0]
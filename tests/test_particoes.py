@@ -0,0 +1,107 @@
+# tests/test_particoes.py
+import pandas as pd
+
+from modules import data_handler, particoes
+from planilha_falsa import _indice_coluna, preencher
+
+def _relatorio(pedidos):
+    """Linhas como o robô as grava: tudo texto, datas ISO."""
+    return pd.DataFrame({
+        'Pedido': [str(p) for p in pedidos],
+        'Data da venda': [f"2025-06-{p % 28 + 1:02d} 20:00:00" for p in pedidos],
+        'Data': [f"2025-06-{p % 28 + 1:02d}" for p in pedidos],
+        'Canal de venda': ['iFood'] * len(pedidos),
+        'Total': [f"{10 + p}.5" for p in pedidos],
+    })
+
+def _escritas(planilha):
+    return [p for p in planilha.pedidos if p[0] in ('add', 'update', 'append', 'batchUpdate')]
+
+def test_robo_sem_pedidos_novos_nao_grava_nada(planilha):
+    data_handler.gravar_particoes({'validos': _relatorio([1, 2, 3])}, modo='acrescentar')
+    antes = len(_escritas(planilha))
+    manifesto = data_handler.gravar_particoes({'validos': _relatorio([2, 3])}, modo='acrescentar')
+    assert len(_escritas(planilha)) == antes
+    assert [p.linhas for p in manifesto] == [3]
+
+def test_robo_acrescenta_so_as_linhas_novas(planilha):
+    data_handler.gravar_particoes({'validos': _relatorio([1, 2, 3])}, modo='acrescentar')
+    versao = particoes.ler_manifesto(data_handler.sheets_gateway.obter_gateway())[0].versao
+    planilha.pedidos.clear()
+    data_handler.gravar_particoes({'validos': _relatorio([3, 4, 5])}, modo='acrescentar')
+    aba = particoes.nome_aba('validos', '2025-06')
+    assert planilha.pedidos_de('append') == [('append', aba, 2)]
+    # O mês não é regravado: nada além do append e da troca do manifesto.
+    assert {p[1] for p in planilha.pedidos_de('add')} == {f"{particoes.ABA_MANIFESTO}__carga"}
+    assert [linha[0] for linha in planilha.worksheet(aba).linhas()] == ['Pedido', 1, 2, 3, 4, 5]
+
+    (descricao,) = particoes.ler_manifesto(data_handler.sheets_gateway.obter_gateway())
+    assert descricao.linhas == 5 and descricao.versao != versao
+    assert (descricao.data_inicial, descricao.data_final) == ('2025-06-02', '2025-06-06')
+    validos, _ = data_handler.ler_dados_do_gsheets()
+    assert sorted(validos['Pedido']) == ['1', '2', '3', '4', '5']
+    assert validos.loc[validos['Pedido'] == '5', 'Total'].item() == 15.5
+
+def test_coluna_nova_no_relatorio_regrava_o_mes(planilha):
+    data_handler.gravar_particoes({'validos': _relatorio([1])}, modo='acrescentar')
+    planilha.pedidos.clear()
+    data_handler.gravar_particoes({'validos': _relatorio([2]).assign(Bairro='Centro')}, modo='acrescentar')
+    aba = particoes.nome_aba('validos', '2025-06')
+    assert not planilha.pedidos_de('append')
+    assert planilha.worksheet(aba).linhas()[0] == ['Pedido', 'Data da venda', 'Data', 'Canal de venda', 'Total', 'Bairro']
+    assert len(planilha.worksheet(aba).linhas()) == 3
+
+def _colunas_baixadas(planilha, aba):
+    """Nomes das colunas pedidas nos intervalos de dados (ex.: 'A2:C') da aba."""
+    cabecalho = planilha.worksheet(aba).linhas()[0]
+    nomes = set()
+    for pedido in planilha.pedidos_de('batchGet'):
+        for intervalo in pedido[1]:
+            if intervalo.startswith(f"'{aba}'!") and '2:' in intervalo:
+                primeira, ultima = intervalo.split('!')[1].replace('2', '').split(':')
+                nomes.update(cabecalho[_indice_coluna(primeira):_indice_coluna(ultima) + 1])
+    return nomes
+
+def test_dashboard_baixa_so_as_colunas_que_guarda(planilha):
+    relatorio = _relatorio([1, 2]).assign(Hora=['20', '20'], Itens=['2', '3'], Desconto=['0', '1.5'], Observação='sem cebola')
+    data_handler.gravar_particoes({'validos': relatorio}, modo='mesclar')
+    planilha.pedidos.clear()
+    validos, _ = data_handler.ler_dados_do_gsheets()
+    aba = particoes.nome_aba('validos', '2025-06')
+    assert _colunas_baixadas(planilha, aba) == {'Pedido', 'Data', 'Hora', 'Canal de venda', 'Total'}
+    assert set(validos.columns) <= set(data_handler.COLUNAS_DASHBOARD)
+    assert list(validos['Hora']) == [20, 20]
+
+def test_aba_sem_data_e_hora_deriva_da_data_da_venda(planilha):
+    preencher(planilha, data_handler.ABA_VALIDOS, [['Pedido', 'Data da venda', 'Itens', 'Total'], ['7', '2025-06-03 21:15:00', '2', '30.5']])
+    preencher(planilha, data_handler.ABA_CANCELADOS, [['Pedido', 'Data', 'Hora', 'Data da venda', 'Total'], ['8', '2025-06-04', '12', '2025-06-04 12:00:00', '9']])
+    validos, cancelados = data_handler.ler_dados_do_gsheets()
+    assert 'Data da venda' in _colunas_baixadas(planilha, data_handler.ABA_VALIDOS)
+    assert 'Data da venda' not in _colunas_baixadas(planilha, data_handler.ABA_CANCELADOS)
+    assert 'Data da venda' not in validos.columns and 'Itens' not in validos.columns
+    linha = validos.iloc[0]
+    assert (linha['Data'], linha['Hora'], linha['Mês'], linha['Dia da Semana']) == (pd.Timestamp('2025-06-03'), 21, 6, '2. Terça')
+    assert list(cancelados['Hora']) == [12]
+
+def test_meses_recentes_leem_so_as_ultimas_particoes(planilha):
+    relatorio = pd.DataFrame({
+        'Pedido': ['1', '2', '3', '4'],
+        'Data': ['2025-04-10', '2025-05-10', '2025-06-10', '2025-06-11'],
+        'Hora': ['20'] * 4,
+        'Total': ['10', '20', '30', '40'],
+    })
+    data_handler.gravar_particoes({'validos': relatorio}, modo='mesclar')
+    manifesto = particoes.ler_manifesto(data_handler.sheets_gateway.obter_gateway())
+    assert particoes.inicio_meses_recentes(manifesto, 2) == '2025-05-01'
+    assert particoes.inicio_meses_recentes([], 2) is None
+
+    planilha.pedidos.clear()
+    validos, _ = data_handler.ler_dados_do_gsheets(meses_recentes=1)
+    assert sorted(validos['Pedido']) == ['3', '4']
+    assert _colunas_baixadas(planilha, particoes.nome_aba('validos', '2025-05')) == set()
+
+    # A carga completa em seguida só baixa os meses que faltam.
+    planilha.pedidos.clear()
+    validos, _ = data_handler.ler_dados_do_gsheets()
+    assert sorted(validos['Pedido']) == ['1', '2', '3', '4']
+    assert _colunas_baixadas(planilha, particoes.nome_aba('validos', '2025-06')) == set()
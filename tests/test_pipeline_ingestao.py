@@ -0,0 +1,75 @@
+# tests/test_pipeline_ingestao.py
+import threading
+
+import pandas as pd
+import pytest
+
+from modules import data_handler, particoes, pipeline_ingestao
+
+def _tabela(pedidos, mes='06'):
+    return pd.DataFrame({
+        'Pedido': [str(p) for p in pedidos],
+        'Data da venda': [f"2025-{mes}-{p % 28 + 1:02d} 20:00:00" for p in pedidos],
+        'Data': [f"2025-{mes}-{p % 28 + 1:02d}" for p in pedidos],
+        'Canal de venda': ['iFood'] * len(pedidos),
+        'Total': [f"{10 + p}.5" for p in pedidos],
+    })
+
+@pytest.fixture
+def escritas_na_pagina(monkeypatch):
+    """Threads que chamaram st.write/st.success em data_handler."""
+    threads = []
+    monkeypatch.setattr(data_handler.st, 'write', lambda *a, **k: threads.append(threading.current_thread().name))
+    monkeypatch.setattr(data_handler.st, 'success', lambda *a, **k: threads.append(threading.current_thread().name))
+    return threads
+
+def test_carga_grava_particoes_e_manifesto(planilha):
+    eventos = []
+    resultado = pipeline_ingestao.PipelineIngestao(_tabela([1, 2, 3]), _tabela([4], mes='07'), modo='substituir').executar(eventos.append, intervalo_s=0.01)
+    assert {nome: r['estado'] for nome, r in resultado.items()} == dict.fromkeys(resultado, 'concluida')
+    assert resultado['gravacao_validos']['feitos'] == 3 and resultado['gravacao_cancelados']['feitos'] == 1
+    manifesto = particoes.ler_manifesto(data_handler.sheets_gateway.obter_gateway())
+    assert sorted(p.aba for p in manifesto) == ['Cancelados 2025-07', 'Vendas 2025-06']
+    assert eventos[-1].estado == 'concluida'
+
+def test_migracao_das_abas_antigas_roda_na_thread_da_pagina(planilha, escritas_na_pagina):
+    from planilha_falsa import preencher
+    tabela = _tabela([1, 2])
+    preencher(planilha, data_handler.ABA_VALIDOS, [list(tabela.columns)] + tabela.values.tolist())
+    resultado = pipeline_ingestao.PipelineIngestao(_tabela([3]), pd.DataFrame()).executar(intervalo_s=0.01)
+    assert resultado['gravacao_validos']['estado'] == 'concluida'
+    assert escritas_na_pagina and set(escritas_na_pagina) == {threading.main_thread().name}
+    (particao,) = particoes.ler_manifesto(data_handler.sheets_gateway.obter_gateway())
+    assert particao.linhas == 3
+
+def test_falha_no_particionamento_pula_as_gravacoes(planilha, monkeypatch):
+    def falhar(_df):
+        raise ValueError("coluna de data ilegível")
+    monkeypatch.setattr(particoes, 'dividir_por_mes', falhar)
+    eventos = []
+    resultado = pipeline_ingestao.PipelineIngestao(_tabela([1]), _tabela([2])).executar(eventos.append, intervalo_s=0.01)
+    assert resultado['particionamento']['estado'] == 'falhou'
+    assert "ilegível" in resultado['particionamento']['erro']
+    for etapa in ('gravacao_validos', 'gravacao_cancelados', 'geocodificacao'):
+        assert resultado[etapa]['estado'] == 'pulada'
+        assert [e.estado for e in eventos if e.etapa == etapa][-1] == 'pulada'
+    # Só o manifesto (vazio, primeira carga) é criado: nenhuma partição.
+    assert [p[1] for p in planilha.pedidos_de('add')] == [f"{particoes.ABA_MANIFESTO}__carga"]
+
+def test_falha_ao_abrir_o_manifesto_nao_inicia_as_etapas(planilha, monkeypatch):
+    def falhar(_gateway, _progresso=None):
+        raise ConnectionError("sem rede")
+    monkeypatch.setattr(data_handler, 'abrir_manifesto_para_escrita', falhar)
+    resultado = pipeline_ingestao.PipelineIngestao(_tabela([1]), pd.DataFrame()).executar()
+    assert resultado['particionamento'] == {'estado': 'falhou', 'feitos': 0, 'total': 0, 'erro': 'sem rede'}
+    assert {resultado[e]['estado'] for e in ('gravacao_validos', 'gravacao_cancelados', 'geocodificacao')} == {'pulada'}
+
+def test_manifesto_regravado_em_lotes(planilha):
+    validos = pd.concat([_tabela([m], mes=f"{m:02d}") for m in range(1, 13)], ignore_index=True)
+    resultado = pipeline_ingestao.PipelineIngestao(validos, _tabela([20], mes='07'), modo='substituir').executar(intervalo_s=0.01)
+    assert {r['estado'] for r in resultado.values()} == {'concluida'}
+    manifesto = particoes.ler_manifesto(data_handler.sheets_gateway.obter_gateway())
+    assert len(manifesto) == 13
+    regravacoes = [p for p in planilha.pedidos_de('add') if p[1] == f"{particoes.ABA_MANIFESTO}__carga"]
+    # Manifesto vazio da primeira carga + um a cada PARTICOES_POR_MANIFESTO + o fim de cada etapa de gravação.
+    assert len(regravacoes) <= 1 + 13 // pipeline_ingestao.PARTICOES_POR_MANIFESTO + 2
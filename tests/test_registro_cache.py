@@ -0,0 +1,115 @@
+# tests/test_registro_cache.py
+import threading
+import time
+
+from modules.registro_cache import RegistroCache
+
+def _esperar_reconstrucao(registro, nome, limite_s=5):
+    fim = time.monotonic() + limite_s
+    while registro.estatisticas()[nome]['reconstruindo']:
+        assert time.monotonic() < fim, "a reconstrução não terminou"
+        time.sleep(0.01)
+
+def test_carga_parcial_responde_antes_e_completa_em_segundo_plano():
+    liberar = threading.Event()
+    persistidos = []
+
+    def completo():
+        liberar.wait(5)
+        return 'tudo'
+    registro = RegistroCache()
+    registro.registrar('vendas', completo, sonda=lambda: 'v1', carregador_inicial=lambda: 'recentes', persistir=lambda valor, versao: persistidos.append(valor))
+    assert registro.obter('vendas') == 'recentes'
+    assert registro.parcial('vendas') and registro.estatisticas()['vendas']['origem'] == 'fonte (parcial)'
+    liberar.set()
+    _esperar_reconstrucao(registro, 'vendas')
+    assert registro.obter('vendas') == 'tudo' and not registro.parcial('vendas')
+    time.sleep(0.05)
+    # Só a versão completa vai para o disco.
+    assert persistidos == ['tudo']
+
+def test_carga_completa_que_falha_e_refeita_no_proximo_acesso():
+    tentativas = []
+
+    def completo():
+        tentativas.append(1)
+        if len(tentativas) == 1:
+            raise RuntimeError("cota esgotada")
+        return 'tudo'
+    registro = RegistroCache()
+    registro.registrar('vendas', completo, sonda=lambda: 'v1', carregador_inicial=lambda: 'recentes')
+    assert registro.obter('vendas') == 'recentes'
+    _esperar_reconstrucao(registro, 'vendas')
+    assert registro.parcial('vendas') and 'cota esgotada' in registro.estatisticas()['vendas']['ultimo_erro']
+    registro.obter('vendas')
+    _esperar_reconstrucao(registro, 'vendas')
+    assert registro.obter('vendas') == 'tudo' and len(tentativas) == 2
+
+def test_copia_em_disco_dispensa_a_carga_parcial():
+    iniciais = []
+    registro = RegistroCache()
+    registro.registrar('vendas', lambda: 'tudo', sonda=lambda: 'v1', restaurar=lambda: ('do disco', 'v1'), carregador_inicial=lambda: iniciais.append(1))
+    assert registro.obter('vendas') == 'do disco'
+    _esperar_reconstrucao(registro, 'vendas')
+    assert not iniciais and not registro.parcial('vendas')
+
+# --- INVALIDAÇÃO ---
+
+def _contador(prefixo):
+    cargas = []
+
+    def carregar():
+        cargas.append(1)
+        return f"{prefixo}{len(cargas)}"
+    return carregar, cargas
+
+def test_invalidar_reconstroi_so_os_espacos_com_a_tag():
+    vendas, cargas_vendas = _contador('vendas-')
+    cep, cargas_cep = _contador('cep-')
+    metas, cargas_metas = _contador('metas-')
+    registro = RegistroCache()
+    registro.registrar('vendas', vendas, tags=('planilha', 'relatorios'))
+    registro.registrar('cep', cep, tags=('cep',))
+    registro.registrar('metas', metas, tags=('planilha',))
+    assert (registro.obter('vendas'), registro.obter('cep')) == ('vendas-1', 'cep-1')
+
+    assert sorted(registro.invalidar('relatorios', 'inexistente')) == ['vendas']
+    _esperar_reconstrucao(registro, 'vendas')
+    assert (registro.obter('vendas'), registro.obter('cep')) == ('vendas-2', 'cep-1')
+    # 'metas' nunca foi lido: a tag o alcança, mas a carga fica para o primeiro acesso.
+    assert sorted(registro.invalidar('planilha')) == ['metas', 'vendas']
+    _esperar_reconstrucao(registro, 'vendas')
+    assert (len(cargas_vendas), len(cargas_cep), len(cargas_metas)) == (3, 1, 0)
+    assert registro.obter('metas') == 'metas-1'
+
+def test_leitores_veem_o_snapshot_anterior_durante_a_reconstrucao():
+    liberar = threading.Event()
+    cargas = []
+
+    def carregar():
+        cargas.append(1)
+        if len(cargas) > 1:
+            liberar.wait(5)
+        return len(cargas)
+    registro = RegistroCache()
+    registro.registrar('vendas', carregar, tags=('planilha',))
+    assert registro.obter('vendas') == 1
+    registro.invalidar('planilha')
+    assert registro.obter('vendas') == 1 and registro.estatisticas()['vendas']['reconstruindo']
+    # Invalidar de novo durante a reconstrução agenda mais uma rodada, não uma segunda thread.
+    registro.invalidar('planilha')
+    liberar.set()
+    _esperar_reconstrucao(registro, 'vendas')
+    assert registro.obter('vendas') == 3 and len(cargas) == 3
+
+def test_sonda_com_versao_nova_reconstroi_o_espaco():
+    versao = ['v1']
+    vendas, cargas = _contador('vendas-')
+    registro = RegistroCache()
+    registro.registrar('vendas', vendas, sonda=lambda: versao[0])
+    assert registro.obter('vendas') == 'vendas-1'
+    assert registro.obter('vendas') == 'vendas-1' and len(cargas) == 1
+    versao[0] = 'v2'
+    registro.obter('vendas')
+    _esperar_reconstrucao(registro, 'vendas')
+    assert registro.obter('vendas') == 'vendas-2' and registro.estatisticas()['vendas']['versao'] == 'v2'
@@ -0,0 +1,75 @@
+# tests/test_sheets_gateway.py
+import threading
+import time
+
+import pytest
+
+from modules import sheets_gateway
+from modules.sheets_gateway import GatewaySheets
+from planilha_falsa import ClienteFalso, preencher
+
+@pytest.fixture
+def cliente():
+    cliente = ClienteFalso()
+    for i in range(23):
+        preencher(cliente.planilha, f"aba {i}", [['Pedido', 'Total'], [str(i), 10.5 * i]])
+    preencher(cliente.planilha, "d'Ávila", [['Pedido'], ['99']])
+    return cliente
+
+def test_leitura_em_lotes_na_ordem_pedida(cliente):
+    gateway = GatewaySheets(cliente=cliente, chave='planilha-falsa')
+    nomes = [f"aba {i}" for i in reversed(range(23))]
+    valores = gateway.ler_abas(*nomes)
+    assert list(valores) == nomes
+    assert [valores[f"aba {i}"][1][0] for i in range(23)] == [str(i) for i in range(23)]
+    lotes = sorted(len(p[1]) for p in cliente.planilha.pedidos_de('batchGet'))
+    assert lotes == [3, sheets_gateway.INTERVALOS_POR_LOTE, sheets_gateway.INTERVALOS_POR_LOTE]
+
+def test_renderizacao_sempre_explicita(cliente):
+    gateway = GatewaySheets(cliente=cliente, chave='planilha-falsa')
+    assert gateway.ler_abas('aba 3')['aba 3'][1] == ['3', '31.5']
+    assert gateway.ler_abas('aba 3', valueRenderOption='UNFORMATTED_VALUE')['aba 3'][1] == [3, 31.5]
+    assert gateway.ler_abas("d'Ávila")["d'Ávila"] == [['Pedido'], ['99']]
+    parametros = [p[2] for p in cliente.planilha.pedidos_de('batchGet')]
+    assert [p['valueRenderOption'] for p in parametros] == ['FORMATTED_VALUE', 'UNFORMATTED_VALUE', 'FORMATTED_VALUE']
+
+def test_ler_colunas_so_as_pedidas(cliente):
+    preencher(cliente.planilha, 'larga', [['Pedido', 'Consumidor', 'Total', 'Bairro'], ['1', 'Ana', 20, 'Centro'], ['2', 'Bia', 30, '']])
+    gateway = GatewaySheets(cliente=cliente, chave='planilha-falsa')
+    colunas = gateway.ler_colunas(['larga'], {'Pedido', 'Total', 'Bairro'}, valueRenderOption='UNFORMATTED_VALUE')
+    assert colunas == {'larga': {'Pedido': [1, 2], 'Total': [20, 30], 'Bairro': ['Centro']}}
+    assert cliente.planilha.pedidos_de('batchGet')[-1][1] == ("'larga'!A2:A", "'larga'!C2:D")
+
+def test_planilha_pela_chave_e_pelo_nome(cliente):
+    pela_chave = GatewaySheets(cliente=cliente, chave='planilha-falsa', nome='Vendas')
+    assert pela_chave.planilha() is cliente.planilha
+    pelo_nome = GatewaySheets(cliente=cliente, nome='Vendas')
+    assert pelo_nome.planilha() is cliente.planilha and pelo_nome.chave == 'planilha-falsa'
+    pelo_nome.planilha()
+    assert cliente.aberturas == [('chave', 'planilha-falsa'), ('titulo', 'Vendas')]
+    with pytest.raises(RuntimeError):
+        GatewaySheets(cliente=cliente).planilha()
+
+def test_autenticacao_preguicosa_e_unica_entre_threads(cliente, monkeypatch):
+    autenticacoes = []
+
+    def autenticar():
+        autenticacoes.append(threading.get_ident())
+        time.sleep(0.05)
+        return cliente
+    monkeypatch.setattr(sheets_gateway, '_autenticar', autenticar)
+    gateway = GatewaySheets(chave='planilha-falsa')
+    assert autenticacoes == []
+    barreira = threading.Barrier(8)
+    planilhas = []
+
+    def abrir():
+        barreira.wait()
+        planilhas.append(gateway.planilha())
+    threads = [threading.Thread(target=abrir) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(autenticacoes) == 1 and len(cliente.aberturas) == 1
+    assert len(planilhas) == 8 and all(p is cliente.planilha for p in planilhas)
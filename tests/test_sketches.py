@@ -0,0 +1,95 @@
+# tests/test_sketches.py
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.sketches import ERRO_RELATIVO, IndiceSketches, SketchQuantis, tabela_sketches
+
+QS = [0, 0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1]
+PRIMEIRO_DIA = date(2025, 6, 1)
+
+def _distribuicoes():
+    rng = np.random.default_rng(7)
+    return {
+        'lognormal': rng.lognormal(mean=3.8, sigma=0.6, size=5000),
+        'uniforme': rng.uniform(5, 400, size=5000),
+        'exponencial': rng.exponential(scale=60, size=5000) + 0.5,
+        'cardapio': rng.choice([19.9, 29.9, 34.5, 42.0, 59.9, 89.9], size=3000),
+        'poucos_pedidos': rng.uniform(10, 120, size=7),
+    }
+
+@pytest.mark.parametrize('nome', list(_distribuicoes()))
+def test_quantis_dentro_do_erro_relativo(nome):
+    valores = _distribuicoes()[nome]
+    estimados = SketchQuantis.de_valores(valores).quantis(QS)
+    exatos = np.quantile(valores, QS, method='inverted_cdf')
+    assert np.all(np.abs(estimados - exatos) <= ERRO_RELATIVO * exatos + 1e-9)
+
+def test_sketch_vazio_nao_tem_quantis():
+    assert SketchQuantis.de_valores([]).quantis(QS) is None
+    assert SketchQuantis.de_valores([None, 'x']).quantil(0.5) is None
+
+# --- ÍNDICE POR DIA E CANAL ---
+
+@pytest.fixture
+def pedidos():
+    rng = np.random.default_rng(11)
+    n = 2000
+    df = pd.DataFrame({
+        'Data': [PRIMEIRO_DIA + timedelta(days=int(d)) for d in rng.integers(0, 30, size=n)],
+        'Canal de venda': rng.choice(['IFOOD', 'BALCÃO', 'DELIVERY'], size=n),
+        'Total': rng.lognormal(mean=3.8, sigma=0.6, size=n).round(2),
+    })
+    # Pedidos sem Total numérico ou sem data ficam fora dos dois caminhos.
+    df.loc[::97, 'Total'] = np.nan
+    df.loc[5::211, 'Data'] = None
+    return df
+
+def _esperado(df, data_inicial=None, data_final=None, canais=None):
+    selecionados = df['Data'].notna()
+    if data_inicial is not None:
+        selecionados &= df['Data'].map(lambda d: d is not None and d >= data_inicial)
+    if data_final is not None:
+        selecionados &= df['Data'].map(lambda d: d is not None and d <= data_final)
+    if canais is not None:
+        selecionados &= df['Canal de venda'].isin(canais)
+    return SketchQuantis.de_valores(df.loc[selecionados, 'Total'])
+
+def _contagens(sketch):
+    return {sketch.inicio + i: int(c) for i, c in enumerate(sketch.contagens) if c}
+
+@pytest.mark.parametrize('data_inicial, data_final, canais', [
+    (None, None, None),
+    (date(2025, 6, 5), date(2025, 6, 12), None),
+    (date(2025, 6, 10), date(2025, 6, 10), ['IFOOD']),
+    (None, date(2025, 6, 20), ['BALCÃO', 'DELIVERY']),
+    (date(2025, 6, 25), date(2025, 8, 31), None),  # termina depois do último dia
+    (date(2025, 5, 1), date(2025, 6, 3), None),    # começa antes do primeiro dia
+    (date(2025, 5, 1), date(2025, 12, 31), ['IFOOD']),
+])
+def test_mesclar_igual_ao_sketch_dos_pedidos_filtrados(pedidos, data_inicial, data_final, canais):
+    indice = IndiceSketches(tabela_sketches(pedidos))
+    obtido = indice.mesclar(data_inicial, data_final, canais)
+    esperado = _esperado(pedidos, data_inicial, data_final, canais)
+    assert obtido.total == esperado.total > 0
+    assert _contagens(obtido) == _contagens(esperado)
+
+@pytest.mark.parametrize('data_inicial, data_final, canais', [
+    (date(2025, 6, 12), date(2025, 6, 5), None),   # período invertido
+    (date(2025, 7, 15), date(2025, 7, 31), None),  # todo depois do último dia
+    (date(2025, 4, 1), date(2025, 5, 31), None),   # todo antes do primeiro dia
+    (date(2025, 7, 15), None, None),
+    (None, None, ['APP']),                          # canal sem pedidos
+])
+def test_mesclar_periodo_sem_pedidos_devolve_sketch_vazio(pedidos, data_inicial, data_final, canais):
+    indice = IndiceSketches(tabela_sketches(pedidos))
+    obtido = indice.mesclar(data_inicial, data_final, canais)
+    assert obtido.total == _esperado(pedidos, data_inicial, data_final, canais).total == 0
+    assert obtido.quantis(QS) is None
+
+def test_indice_vazio():
+    indice = IndiceSketches(tabela_sketches(pd.DataFrame(columns=['Data', 'Canal de venda', 'Total'])))
+    assert indice.mesclar().total == 0
+    assert indice.mesclar(date(2025, 6, 1), date(2025, 6, 30)).total == 0
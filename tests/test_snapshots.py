@@ -0,0 +1,118 @@
+# tests/test_snapshots.py
+import os
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from modules import data_handler, gerador_saipos, sketches, snapshots, telemetria
+from modules.registro_cache import RegistroCache
+
+@pytest.fixture
+def pasta_snapshots(tmp_path, monkeypatch):
+    """Snapshots em tmp_path, com ids em ordem de gravação (o relógio real repete o segundo)."""
+    monkeypatch.setattr(snapshots, 'SNAPSHOT_DIR', str(tmp_path))
+    instantes = iter(range(20250601000000, 20250601000100))
+    monkeypatch.setattr(snapshots.time, 'strftime', lambda _formato: str(next(instantes)))
+    return tmp_path
+
+def _versoes(pasta, nome='vendas'):
+    return sorted(d.name for d in (pasta / nome).iterdir() if d.is_dir())
+
+def test_ida_e_volta_preserva_tabelas_e_metadados(pasta_snapshots):
+    validos = pd.DataFrame({'Pedido': ['1', '2', None], 'CEP': [59000000, '59010-000', None], 'Total': [10.5, 20.0, 3.0]})
+    manifesto = snapshots.salvar_snapshot('vendas', {'validos': validos, 'vazia': pd.DataFrame({'x': []})}, {'versao_dados': 'v1'})
+    dfs, lido = snapshots.carregar_snapshot('vendas')
+    assert lido == manifesto and lido['versao_dados'] == 'v1'
+    assert lido['tabelas']['validos'] == {'arquivo': 'validos.parquet', 'linhas': 3, 'colunas': ['Pedido', 'CEP', 'Total']}
+    # Coluna com número e texto misturados volta como texto; nulos continuam nulos.
+    assert list(dfs['validos']['CEP'][:2]) == ['59000000', '59010-000'] and pd.isna(dfs['validos']['CEP'][2])
+    pd.testing.assert_series_equal(dfs['validos']['Total'], validos['Total'])
+    assert dfs['vazia'].empty
+    assert set(snapshots.carregar_snapshot('vendas', tabelas=['validos'])[0]) == {'validos'}
+
+def test_ponteiro_atual_trocado_com_os_replace_e_duas_versoes_mantidas(pasta_snapshots, monkeypatch):
+    trocas = []
+    replace = os.replace
+
+    def registrar_troca(origem, destino):
+        trocas.append((os.path.basename(origem), os.path.basename(destino)))
+        replace(origem, destino)
+    monkeypatch.setattr(snapshots.os, 'replace', registrar_troca)
+    ids = [snapshots.salvar_snapshot('vendas', {'validos': pd.DataFrame({'Pedido': [str(i)]})})['id'] for i in range(3)]
+
+    assert trocas == [(f"ATUAL.{i}.tmp", 'ATUAL') for i in ids]
+    assert (pasta_snapshots / 'vendas' / 'ATUAL').read_text() == ids[-1]
+    assert _versoes(pasta_snapshots) == ids[1:]
+    assert not [f for f in os.listdir(pasta_snapshots / 'vendas') if f.endswith('.tmp')]
+    assert list(snapshots.carregar_snapshot('vendas')[0]['validos']['Pedido']) == ['2']
+
+def test_gravacao_interrompida_nao_troca_o_snapshot_atual(pasta_snapshots, monkeypatch):
+    snapshots.salvar_snapshot('vendas', {'validos': pd.DataFrame({'Pedido': ['1']})}, {'versao_dados': 'v1'})
+
+    def falhar(_origem, _destino):
+        raise OSError('disco cheio')
+    monkeypatch.setattr(snapshots.os, 'replace', falhar)
+    with pytest.raises(OSError):
+        snapshots.salvar_snapshot('vendas', {'validos': pd.DataFrame({'Pedido': ['2']})}, {'versao_dados': 'v2'})
+    dfs, manifesto = snapshots.carregar_snapshot('vendas')
+    assert manifesto['versao_dados'] == 'v1' and list(dfs['validos']['Pedido']) == ['1']
+
+def test_sem_snapshot_ou_com_manifesto_corrompido(pasta_snapshots):
+    assert snapshots.carregar_snapshot('vendas') == (None, None)
+    assert snapshots.caminho_tabela('vendas', 'validos') == (None, None)
+    manifesto = snapshots.salvar_snapshot('vendas', {'validos': pd.DataFrame({'Pedido': ['1']})})
+    (pasta_snapshots / 'vendas' / manifesto['id'] / snapshots.MANIFESTO).write_text('{corrompido')
+    assert snapshots.carregar_snapshot('vendas') == (None, None)
+
+# --- DADOS DO DASHBOARD ---
+
+@pytest.fixture(scope='module')
+def dados():
+    validos, cancelados = data_handler.tratar_dados_saipos(gerador_saipos.gerar_relatorio(500, semente=3, dias=20))
+    return data_handler.compactar_dados_dashboard(*data_handler.tipar_dados_dashboard(validos, cancelados))
+
+def test_dashboard_restaura_o_que_persistiu(pasta_snapshots, dados):
+    versao_dados = data_handler.calcular_versao_dados(*dados)
+    data_handler._persistir_dados_dashboard((*dados, versao_dados), 'fonte-1')
+    (validos, cancelados, versao_restaurada), versao_fonte = data_handler._restaurar_dados_dashboard()
+    assert (versao_restaurada, versao_fonte) == (versao_dados, 'fonte-1')
+    pd.testing.assert_frame_equal(validos, dados[0])
+    pd.testing.assert_frame_equal(cancelados, dados[1])
+    assert {'agg_diario_canal', 'agg_sketch_total'} <= set(data_handler.carregar_agregados())
+
+def test_copia_em_disco_de_outra_versao_da_fonte_e_substituida(pasta_snapshots):
+    snapshots.salvar_snapshot('vendas', {'validos': pd.DataFrame({'Pedido': ['velho']})}, {'versao_fonte': 'fonte-1'})
+
+    def restaurar():
+        dfs, manifesto = snapshots.carregar_snapshot('vendas')
+        return list(dfs['validos']['Pedido']), manifesto['versao_fonte']
+    liberar = threading.Event()
+    registro = RegistroCache()
+    registro.registrar('vendas', lambda: liberar.wait(5) and ['novo'], sonda=lambda: 'fonte-2', restaurar=restaurar)
+    # A cópia em disco responde na hora; a validação contra a fonte roda em segundo plano.
+    assert registro.obter('vendas') == ['velho'] and registro.estatisticas()['vendas']['origem'] == 'disco'
+    liberar.set()
+    fim = time.monotonic() + 5
+    while registro.estatisticas()['vendas']['reconstruindo']:
+        assert time.monotonic() < fim
+        time.sleep(0.01)
+    assert registro.obter('vendas') == ['novo'] and registro.estatisticas()['vendas']['versao'] == 'fonte-2'
+
+def test_agregado_de_outra_versao_dos_dados_nao_e_usado(pasta_snapshots, monkeypatch):
+    registro = telemetria.Telemetria()
+    monkeypatch.setattr(telemetria, 'obter_telemetria', lambda: registro)
+    no_disco = pd.DataFrame({'Data': [date(2025, 6, 1)], 'Canal de venda': ['IFOOD'], 'Total': [30.0]})
+    atuais = pd.DataFrame({'Data': [date(2025, 6, 2)] * 2, 'Canal de venda': ['BALCÃO'] * 2, 'Total': [10.0, 12.0]})
+    snapshots.salvar_snapshot('vendas', {'agg_sketch_total': sketches.tabela_sketches(no_disco)}, {'versao_dados': 'v1'})
+    sketches.obter_indice.clear()
+    try:
+        assert sketches.obter_indice('v1', atuais).mesclar().total == 1
+        assert registro.anotacoes()['sketches_total']['origem'] == 'snapshot'
+        # Versão diferente da gravada: o índice é recalculado com os dados atuais.
+        assert sketches.obter_indice('v2', atuais).mesclar().total == 2
+        assert registro.anotacoes()['sketches_total']['origem'] == 'calculado'
+    finally:
+        sketches.obter_indice.clear()
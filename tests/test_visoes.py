@@ -0,0 +1,45 @@
+# tests/test_visoes.py
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from modules import data_handler, gerador_saipos, visoes
+
+@pytest.fixture(scope='module')
+def dados():
+    """Dados compactados (ordenados por Data) com alguns pedidos sem data, que vão para o fim."""
+    validos, cancelados = data_handler.tipar_dados_dashboard(*data_handler.tratar_dados_saipos(gerador_saipos.gerar_relatorio(3_000, semente=9, dias=30)))
+    validos.loc[validos.index[::41], 'Data'] = None
+    return data_handler.compactar_dados_dashboard(validos, cancelados)
+
+def _pela_mascara(df, data_inicial, data_final):
+    return df[df['Data'].map(lambda d: pd.notna(d) and data_inicial <= d <= data_final)]
+
+@pytest.mark.parametrize('data_inicial, data_final', [
+    (date(2025, 1, 1), date(2025, 1, 30)),     # primeiro e último dia: limites inclusivos
+    (date(2025, 1, 10), date(2025, 1, 10)),    # um dia só
+    (date(2025, 1, 5), date(2025, 1, 17)),
+    (date(2024, 12, 1), date(2025, 1, 3)),     # começa antes dos dados
+    (date(2025, 1, 28), date(2025, 3, 31)),    # termina depois dos dados
+    (date(2024, 1, 1), date(2026, 1, 1)),      # cobre tudo
+    (date(2024, 12, 1), date(2024, 12, 31)),   # todo antes dos dados
+    (date(2025, 2, 1), date(2025, 2, 28)),     # todo depois dos dados
+    (date(2025, 1, 17), date(2025, 1, 5)),     # período invertido
+])
+def test_fatia_igual_a_mascara(dados, data_inicial, data_final):
+    for df in dados:
+        assert df.attrs.get('ordenado_por') == 'Data'
+        fatia = visoes.fatia_por_data(df, data_inicial, data_final)
+        pd.testing.assert_frame_equal(fatia, _pela_mascara(df, data_inicial, data_final))
+
+def test_sem_ordenacao_cai_na_mascara(dados):
+    embaralhado = dados[0].sample(frac=1, random_state=1)
+    embaralhado = embaralhado[embaralhado['Data'].notna()]
+    embaralhado.attrs.clear()
+    fatia = visoes.fatia_por_data(embaralhado, date(2025, 1, 5), date(2025, 1, 17))
+    pd.testing.assert_frame_equal(fatia, _pela_mascara(embaralhado, date(2025, 1, 5), date(2025, 1, 17)))
+
+def test_dataframe_vazio_volta_como_esta():
+    vazio = pd.DataFrame(columns=['Data', 'Total'])
+    assert visoes.fatia_por_data(vazio, date(2025, 1, 1), date(2025, 1, 31)) is vazio